@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from .models import Account, ClientProfile, Transaction
+from .models import (
+    Account,
+    BalanceCheckpoint,
+    ClientProfile,
+    LedgerEntry,
+    Transaction,
+    resolve_counterparties,
+)
 
 
 @admin.register(ClientProfile)
@@ -50,7 +57,44 @@ class TransactionAdmin(admin.ModelAdmin):
         "related_transaction__account",
     )
 
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # Счета получателей страницы списка — пачкой, а не по строке.
+        resolve_counterparties(changelist.result_list)
+        return changelist
+
     @admin.display(description="Счет получателя")
     def counterparty_display(self, obj: Transaction) -> str:
         counterparty = obj.counterparty_account
         return counterparty.account_number if counterparty else "—"
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "account",
+        "transaction",
+        "amount",
+        "balance_after",
+        "created_at",
+    )
+    search_fields = ("account__account_number", "transaction__reference")
+    list_select_related = ("account", "account__client", "transaction")
+
+    # Журнал только дополняется сервисами проведения.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("account", "balance", "last_entry", "created_at")
+    search_fields = ("account__account_number",)
+    list_select_related = ("account", "account__client")
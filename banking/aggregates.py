@@ -0,0 +1,193 @@
+"""
+Итоги админ-панели без пересчёта по всем строкам.
+
+DashboardCounter хранит счётчики: сумму балансов, число счетов, клиентов
+и операций в каждом статусе. Счётчик разбит на BANKING_AGGREGATE_SHARDS
+частей: изменение прибавляется к части, выбранной по потоку, поэтому
+параллельные проведения редко ждут блокировку одной строки, а чтение
+итогов — один запрос по нескольким десяткам строк, независимо от числа
+счетов и операций.
+
+Счётчики меняются в той же транзакции БД, что и данные:
+- создание и удаление клиентов, счетов и операций — сигналами
+  (banking/signals.py);
+- проведение и отмена операций — по сигналу ledger_flushed леджера
+  services.py;
+- массовое создание операций (bulk_create) — явным вызовом
+  count_created().
+
+Изменения в обход этих путей (правка баланса в админке Django, загрузка
+демонстрационных данных) исправляет команда rebuild_dashboard_counters.
+"""
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Sum
+
+from .models import Account, ClientProfile, DashboardCounter, Transaction
+
+DEFAULT_SHARDS = 8
+
+BALANCE = "balance"
+ACCOUNTS = "accounts"
+CLIENTS = "clients"
+
+
+def status_counter(status: str) -> str:
+    return f"transactions:{status}"
+
+
+def shard_count() -> int:
+    return max(
+        1, getattr(settings, "BANKING_AGGREGATE_SHARDS", DEFAULT_SHARDS)
+    )
+
+
+def _current_shard() -> int:
+    # Номер потока ОС уникален в системе, так что потоки и процессы
+    # распределяются по частям, а один поток всегда пишет в одну часть.
+    return threading.get_native_id() % shard_count()
+
+
+@dataclass(frozen=True)
+class DashboardTotals:
+    balance: Decimal
+    accounts: int
+    clients: int
+    transactions_by_status: dict
+
+    @property
+    def transactions(self) -> int:
+        return sum(self.transactions_by_status.values())
+
+
+def apply(deltas) -> None:
+    """
+    Прибавляет изменения {счётчик: приращение} к частям текущего потока.
+    Вызывается внутри транзакции, меняющей данные. Счётчики обновляются
+    в порядке имён, чтобы параллельные транзакции не блокировали друг
+    друга взаимно.
+    """
+    shard = _current_shard()
+    to_value = DashboardCounter._meta.get_field("value").to_python
+    for name in sorted(deltas):
+        delta = to_value(deltas[name])
+        if not delta:
+            continue
+        updated = DashboardCounter.objects.filter(
+            name=name, shard=shard
+        ).update(value=F("value") + delta)
+        if not updated:
+            _create(name, shard, delta)
+
+
+def _create(name: str, shard: int, delta) -> None:
+    try:
+        with db_transaction.atomic():
+            DashboardCounter.objects.create(
+                name=name, shard=shard, value=delta
+            )
+    except IntegrityError:
+        # Часть создал параллельный запрос.
+        DashboardCounter.objects.filter(name=name, shard=shard).update(
+            value=F("value") + delta
+        )
+
+
+def count_created(transactions) -> None:
+    """Учитывает операции, созданные bulk_create (без сигналов)."""
+    apply(
+        Counter(
+            status_counter(transaction.status)
+            for transaction in transactions
+        )
+    )
+
+
+def settlement_deltas(entries, watched) -> Counter:
+    """
+    Изменения счётчиков по итогам леджера: entries — записи журнала
+    (счёт, сумма, операция), watched — пары (операция, прежний статус).
+    """
+    deltas = Counter()
+    deltas[BALANCE] = sum(
+        (amount for _, amount, _ in entries), Decimal("0.00")
+    )
+    for transaction, previous in watched:
+        if transaction.status != previous:
+            deltas[status_counter(previous)] -= 1
+            deltas[status_counter(transaction.status)] += 1
+    return deltas
+
+
+def stored_values() -> dict:
+    """Значения счётчиков: сумма частей по каждому имени."""
+    return dict(
+        DashboardCounter.objects.values("name")
+        .annotate(total=Sum("value"))
+        .order_by()
+        .values_list("name", "total")
+    )
+
+
+def read_totals() -> DashboardTotals:
+    values = stored_values()
+    return DashboardTotals(
+        balance=values.get(BALANCE, Decimal("0.00")),
+        accounts=int(values.get(ACCOUNTS, 0)),
+        clients=int(values.get(CLIENTS, 0)),
+        transactions_by_status={
+            status: int(values.get(status_counter(status), 0))
+            for status in Transaction.Status.values
+        },
+    )
+
+
+def compute_totals() -> dict:
+    """Точные значения счётчиков полным проходом по таблицам."""
+    accounts = Account.objects.aggregate(
+        balance=Sum("balance"), count=Count("id")
+    )
+    values = {
+        BALANCE: accounts["balance"] or Decimal("0.00"),
+        ACCOUNTS: accounts["count"],
+        CLIENTS: ClientProfile.objects.count(),
+    }
+    values.update(
+        (status_counter(status), 0) for status in Transaction.Status.values
+    )
+    values.update(
+        (status_counter(status), count)
+        for status, count in Transaction.objects.values_list("status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return values
+
+
+def rebuild() -> DashboardTotals:
+    """
+    Пересчитывает счётчики по таблицам. Части счётчиков блокируются
+    до подсчёта: транзакции, уже изменившие счётчики, успевают
+    зафиксироваться и попадают в подсчёт, а новые ждут окончания
+    пересчёта и прибавляют свои изменения к новым значениям.
+    """
+    with db_transaction.atomic():
+        list(DashboardCounter.objects.select_for_update().values("id"))
+        values = compute_totals()
+        DashboardCounter.objects.all().delete()
+        DashboardCounter.objects.bulk_create(
+            DashboardCounter(
+                name=name, shard=shard, value=value if shard == 0 else 0
+            )
+            for name, value in values.items()
+            for shard in range(shard_count())
+        )
+    return read_totals()
@@ -0,0 +1,227 @@
+"""
+Асинхронные варианты сервисов для ASGI.
+
+Работа с базой выполняется в ограниченном пуле потоков
+(BANKING_ASYNC_DB_WORKERS), а выдержка перед проведением операции —
+через asyncio.sleep, поэтому ожидающая операция не занимает поток и
+один ASGI-воркер может держать тысячи операций «в полёте».
+
+При BANKING_ASYNC_DB_WORKERS = 0 запросы к базе выполняются через
+sync_to_async в общем потоке Django (thread_sensitive) — так же, как
+это делает сам Django для синхронного кода в асинхронных представлениях.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import idempotency
+from .models import Account, Transaction
+from .services import (
+    PROCESSING_DELAY_SECONDS,
+    TransactionResult,
+    begin_transaction,
+    begin_transfer,
+    cancel_transaction,
+    complete_transaction,
+    complete_transfer,
+    finalize_transaction,
+    finalize_transfer,
+    remember_result,
+    replay_result,
+    toggle_account_block,
+)
+
+DEFAULT_DB_WORKERS = 16
+
+_executor = None
+_executor_size = None
+_executor_lock = threading.Lock()
+# Проведения, которые должны завершиться и после отмены запроса: ссылка
+# не даёт сборщику мусора удалить задачу раньше времени.
+_detached_tasks = set()
+
+
+def db_workers() -> int:
+    return getattr(settings, "BANKING_ASYNC_DB_WORKERS", DEFAULT_DB_WORKERS)
+
+
+def _get_executor(size: int) -> ThreadPoolExecutor:
+    global _executor, _executor_size
+    with _executor_lock:
+        if _executor is None or _executor_size != size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix="banking-db"
+            )
+            _executor_size = size
+        return _executor
+
+
+def _call_with_fresh_connection(func, *args, **kwargs):
+    # Потоки пула живут долго: как и обработчик запросов Django, закрываем
+    # устаревшие и сломанные соединения до и после работы.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """Выполняет синхронную функцию, работающую с базой, вне event loop."""
+    size = db_workers()
+    if not size:
+        return await sync_to_async(func)(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(size),
+        functools.partial(_call_with_fresh_connection, func, *args, **kwargs),
+    )
+
+
+async def _run_idempotent(idempotency_key, begin, complete, **kwargs):
+    request_fingerprint = ""
+    if idempotency_key:
+        request_fingerprint = idempotency.fingerprint(kwargs)
+        result = await run_db(
+            replay_result, idempotency_key, request_fingerprint
+        )
+        if result is not None:
+            return result
+    try:
+        opened = await run_db(
+            begin,
+            idempotency_key=idempotency_key,
+            idempotency_fingerprint=request_fingerprint,
+            **kwargs,
+        )
+    except idempotency.DuplicateRequest:
+        return await run_db(
+            replay_result, idempotency_key, request_fingerprint
+        )
+
+    if isinstance(opened, TransactionResult):
+        if idempotency_key:
+            await run_db(
+                remember_result, idempotency_key, opened, request_fingerprint
+            )
+        return opened
+
+    if not isinstance(opened, tuple):
+        opened = (opened,)
+    # Если клиент отключится во время выдержки, ASGI-обработчик отменит
+    # задачу представления. Операция уже создана, а в режиме inline
+    # проводить её больше некому, поэтому выдержка и проведение идут
+    # в отдельной задаче, которую отмена запроса не прерывает.
+    task = asyncio.ensure_future(
+        _complete_opened(
+            opened,
+            complete,
+            kwargs.get("processed_by"),
+            idempotency_key,
+            request_fingerprint,
+        )
+    )
+    _detached_tasks.add(task)
+    task.add_done_callback(_detached_tasks.discard)
+    return await asyncio.shield(task)
+
+
+async def _complete_opened(
+    opened, complete, processed_by, idempotency_key, request_fingerprint
+):
+    await asyncio.sleep(PROCESSING_DELAY_SECONDS)
+    result = await run_db(complete, *opened, processed_by=processed_by)
+    if idempotency_key:
+        await run_db(
+            remember_result, idempotency_key, result, request_fingerprint
+        )
+    return result
+
+
+async def acreate_and_process_transaction(
+    *,
+    account: Account,
+    transaction_type: str,
+    amount,
+    note: str = "",
+    performed_by=None,
+    processed_by=None,
+    idempotency_key: str | None = None,
+) -> TransactionResult:
+    return await _run_idempotent(
+        idempotency_key,
+        begin_transaction,
+        complete_transaction,
+        account=account,
+        transaction_type=transaction_type,
+        amount=amount,
+        note=note,
+        performed_by=performed_by,
+        processed_by=processed_by,
+    )
+
+
+async def acreate_and_process_transfer(
+    *,
+    source_account: Account,
+    target_account: Account,
+    amount,
+    note: str = "",
+    performed_by=None,
+    processed_by=None,
+    idempotency_key: str | None = None,
+) -> TransactionResult:
+    return await _run_idempotent(
+        idempotency_key,
+        begin_transfer,
+        complete_transfer,
+        source_account=source_account,
+        target_account=target_account,
+        amount=amount,
+        note=note,
+        performed_by=performed_by,
+        processed_by=processed_by,
+    )
+
+
+async def afinalize_transaction(
+    transaction_id: int, *, processed_by=None
+) -> Transaction:
+    return await run_db(
+        finalize_transaction, transaction_id, processed_by=processed_by
+    )
+
+
+async def afinalize_transfer(
+    outgoing_id: int, incoming_id: int, *, processed_by=None
+) -> tuple[Transaction, Transaction]:
+    return await run_db(
+        finalize_transfer,
+        outgoing_id,
+        incoming_id,
+        processed_by=processed_by,
+    )
+
+
+async def acancel_transaction(
+    transaction_id: int, *, cancelled_by=None, reason: str = ""
+) -> Transaction:
+    return await run_db(
+        cancel_transaction,
+        transaction_id,
+        cancelled_by=cancelled_by,
+        reason=reason,
+    )
+
+
+async def atoggle_account_block(account: Account, *, blocked: bool) -> Account:
+    return await run_db(toggle_account_block, account, blocked=blocked)
@@ -0,0 +1,101 @@
+"""
+Кэш карточек клиентов админ-панели.
+
+HTML карточки (имя, статус, счета с балансами и кнопками блокировки)
+хранится в кэше BANKING_CARD_CACHE под ключом с ClientProfile.card_version.
+Версия меняется (bump) при каждом изменении, которое видно в карточке:
+- проведение и отмена операций — по сигналу ledger_flushed леджера
+  services.py (балансы меняются через bulk_update, без сигналов
+  сохранения);
+- блокировка счёта (toggle_account_block), создание и удаление счетов,
+  правка клиента, его логина и счетов — сигналами сохранения
+  (banking/signals.py).
+Версия меняется после фиксации транзакции: до этого параллельный
+просмотр видит и старые данные, и старую версию. Поэтому после
+изменения выдаётся новая карточка, а явно удалять записи
+из кэша не нужно: старые версии вытесняются по TIMEOUT и MAX_ENTRIES.
+Версия хранится в базе, так что кэш может быть и общим для нескольких
+процессов, и своим у каждого.
+
+Токен CSRF у каждого пользователя свой, поэтому в кэше вместо него —
+заглушка, которая подставляется при выдаче.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.db.models import prefetch_related_objects
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .models import ClientProfile, new_cache_version
+
+CARD_TEMPLATE = "banking/admin/sections/client_card.html"
+# Меняйте при изменении шаблона карточки, если кэш общий для процессов
+# разных версий приложения.
+CARD_TEMPLATE_VERSION = 1
+DEFAULT_CACHE_ALIAS = "default"
+CSRF_PLACEHOLDER = mark_safe("<!--banking:csrf-->")
+
+
+def card_cache():
+    return caches[
+        getattr(settings, "BANKING_CARD_CACHE", DEFAULT_CACHE_ALIAS)
+    ]
+
+
+def card_key(client: ClientProfile) -> str:
+    return (
+        f"banking:client-card:{CARD_TEMPLATE_VERSION}:"
+        f"{client.pk}:{client.card_version}"
+    )
+
+
+def bump(client_ids) -> None:
+    """
+    Меняет версию карточек клиентов client_ids после фиксации текущей
+    транзакции БД: строка клиента не блокируется до конца проведения.
+    """
+    client_ids = set(client_ids)
+    if client_ids:
+        db_transaction.on_commit(
+            lambda: ClientProfile.objects.filter(id__in=client_ids).update(
+                card_version=new_cache_version()
+            )
+        )
+
+
+def attach_cards(request, clients) -> None:
+    """
+    Записывает HTML карточки в client.card_html для каждого клиента.
+    Счета загружаются одним запросом только для карточек, которых нет
+    в кэше.
+    """
+    cache = card_cache()
+    keys = {client.pk: card_key(client) for client in clients}
+    cached = cache.get_many(keys.values())
+
+    missing = [client for client in clients if keys[client.pk] not in cached]
+    if missing:
+        prefetch_related_objects(missing, "accounts")
+        rendered = {
+            keys[client.pk]: render_to_string(
+                CARD_TEMPLATE,
+                {"client": client, "csrf_input": CSRF_PLACEHOLDER},
+            )
+            for client in missing
+        }
+        cache.set_many(rendered)
+        cached.update(rendered)
+
+    csrf_input = format_html(
+        '<input type="hidden" name="csrfmiddlewaretoken" value="{}">',
+        get_token(request),
+    )
+    for client in clients:
+        client.card_html = mark_safe(
+            cached[keys[client.pk]].replace(CSRF_PLACEHOLDER, csrf_input)
+        )
@@ -0,0 +1,33 @@
+"""
+Проверки настроек приложения (manage.py check).
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+
+from .references import configured_node_id
+
+
+@checks.register()
+def check_reference_node(app_configs, **kwargs):
+    """Узел номеров операций: диапазон и явное значение для развёртывания."""
+    try:
+        configured_node_id()
+    except ImproperlyConfigured as exc:
+        return [checks.Error(str(exc), id="banking.E001")]
+    return []
+
+
+@checks.register(deploy=True)
+def check_reference_node_is_set(app_configs, **kwargs):
+    if getattr(settings, "BANKING_REFERENCE_NODE_ID", None) is not None:
+        return []
+    return [
+        checks.Warning(
+            "BANKING_REFERENCE_NODE_ID не задан: узел номеров операций "
+            "вычисляется по имени хоста, и у нескольких серверов или "
+            "контейнеров номера могут совпасть.",
+            hint="Задайте каждому серверу или контейнеру свой узел 0–1295.",
+            id="banking.W001",
+        )
+    ]
@@ -0,0 +1,276 @@
+"""
+Лента операций для сотрудников (server-sent events).
+
+Сервисы записывают созданные операции и смену их статуса в таблицу
+TransactionEvent после фиксации транзакции БД; представление
+admin_events читает новые строки по возрастанию id раз
+в BANKING_EVENTS_POLL_SECONDS и передаёт их потоком text/event-stream.
+Таблица общая для всех процессов, поэтому в ленту попадают и операции,
+проведённые воркерами run_settlement_worker или другим экземпляром
+сервера.
+
+- id события — первичный ключ строки. Таблица хранит последние
+  BANKING_EVENTS_HISTORY событий, поэтому переподключившийся клиент
+  (Last-Event-ID или ?last_id=) получает пропущенное. Если пропущенных
+  событий уже нет или id не выдан этой базой, клиент получает resync —
+  перечитать список целиком.
+- Если с прошлого опроса накопилось больше BANKING_EVENTS_BUFFER
+  событий, вместо них подписчик тоже получает resync.
+- Параллельные транзакции фиксируются не в порядке id: строка
+  с меньшим id может стать видна позже большей. Такие пропуски
+  перечитываются ещё GAP_SECONDS секунд.
+
+Под ASGI поток — асинхронный генератор astream(): между опросами он
+ждёт в asyncio.sleep и не занимает поток. Под WSGI поток stream()
+занимает поток обработки запросов до BANKING_EVENTS_STREAM_SECONDS.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Max, Min, Q
+
+from .models import TransactionEvent
+
+DEFAULT_HISTORY_SIZE = 1000
+DEFAULT_BUFFER_SIZE = 100
+DEFAULT_STREAM_SECONDS = 300
+DEFAULT_HEARTBEAT_SECONDS = 15
+DEFAULT_POLL_SECONDS = 1
+RETRY_MILLISECONDS = 3000
+GAP_SECONDS = 10
+
+TRANSACTION_CREATED = "created"
+TRANSACTION_UPDATED = "updated"
+
+EVENT_TRANSACTION = "transaction"
+EVENT_RESYNC = "resync"
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    name: str
+    data: dict
+
+    def encode(self) -> str:
+        """Событие в формате text/event-stream."""
+        data = json.dumps(self.data, ensure_ascii=False)
+        return f"id: {self.id}\nevent: {self.name}\ndata: {data}\n\n"
+
+
+def history_size() -> int:
+    return getattr(settings, "BANKING_EVENTS_HISTORY", DEFAULT_HISTORY_SIZE)
+
+
+def buffer_size() -> int:
+    return getattr(settings, "BANKING_EVENTS_BUFFER", DEFAULT_BUFFER_SIZE)
+
+
+def latest_id() -> int:
+    return TransactionEvent.objects.aggregate(last=Max("id"))["last"] or 0
+
+
+def publish(name: str, payloads) -> None:
+    """
+    Записывает события сразу. Раз в history_size() событий удаляет
+    события старше последних history_size().
+    """
+    rows = TransactionEvent.objects.bulk_create(
+        TransactionEvent(name=name, data=data) for data in payloads
+    )
+    if not rows or rows[-1].id is None:
+        return
+    size = history_size()
+    last = rows[-1].id
+    if last // size != (last - len(rows)) // size:
+        TransactionEvent.objects.filter(id__lte=last - size).delete()
+
+
+class EventFeed:
+    """Чтение событий одного подписчика из таблицы после last_id."""
+
+    def __init__(self, last_id: int | None = None):
+        self.last_id = last_id
+        self._anchored = False
+        # Пропущенные id -> момент, до которого их ещё ждать.
+        self._gaps = {}
+
+    def _anchor(self) -> list[Event]:
+        self._anchored = True
+        bounds = TransactionEvent.objects.aggregate(
+            first=Min("id"), last=Max("id")
+        )
+        last = bounds["last"] or 0
+        if self.last_id is None or self.last_id == last:
+            self.last_id = last
+            return []
+        first = bounds["first"] or last + 1
+        # id новее последнего выдан не этой базой.
+        if not first - 1 <= self.last_id < last:
+            return self._resync(last)
+        return []
+
+    def _resync(self, last: int) -> list[Event]:
+        self.last_id = last
+        self._gaps.clear()
+        return [Event(last, EVENT_RESYNC, {"reason": "lag"})]
+
+    def poll(self) -> list[Event]:
+        """События, появившиеся с прошлого вызова (или resync)."""
+        if not self._anchored:
+            resync = self._anchor()
+            if resync:
+                return resync
+        now = time.monotonic()
+        self._gaps = {
+            event_id: until
+            for event_id, until in self._gaps.items()
+            if until > now
+        }
+        condition = Q(id__gt=self.last_id)
+        if self._gaps:
+            condition |= Q(id__in=list(self._gaps))
+        limit = buffer_size()
+        rows = list(
+            TransactionEvent.objects.filter(condition)
+            .order_by("id")
+            .values_list("id", "name", "data")[:limit + len(self._gaps) + 1]
+        )
+        late = [row for row in rows if row[0] <= self.last_id]
+        new = rows[len(late):]
+        if len(new) > limit:
+            return self._resync(latest_id())
+
+        events = []
+        for event_id, name, data in late:
+            del self._gaps[event_id]
+            # Браузер продолжит с наибольшего уже полученного id.
+            events.append(Event(self.last_id, name, data))
+        previous = self.last_id
+        for event_id, name, data in new:
+            missing = range(previous + 1, event_id)
+            if len(missing) <= limit:
+                self._gaps.update(dict.fromkeys(missing, now + GAP_SECONDS))
+            events.append(Event(event_id, name, data))
+            previous = event_id
+        self.last_id = previous
+        return events
+
+
+def transaction_payload(transaction, change: str) -> dict:
+    return {
+        "change": change,
+        "id": transaction.id,
+        "reference": transaction.reference,
+        "account_id": transaction.account_id,
+        "transaction_type": transaction.transaction_type,
+        "status": transaction.status,
+        "amount": str(transaction.amount),
+        "created_at": (
+            transaction.created_at.isoformat()
+            if transaction.created_at
+            else None
+        ),
+        "processed_at": (
+            transaction.processed_at.isoformat()
+            if transaction.processed_at
+            else None
+        ),
+    }
+
+
+def publish_transactions(transactions, change: str) -> None:
+    """
+    Публикует операции после фиксации текущей транзакции БД (при откате
+    событий не будет). Данные снимаются сразу, в момент вызова.
+    """
+    payloads = [
+        transaction_payload(transaction, change)
+        for transaction in transactions
+    ]
+    if payloads:
+        db_transaction.on_commit(
+            lambda: publish(EVENT_TRANSACTION, payloads)
+        )
+
+
+class StreamClock:
+    """Сроки потока: закрытие, keep-alive и пауза между опросами."""
+
+    def __init__(self):
+        now = time.monotonic()
+        self.deadline = now + getattr(
+            settings, "BANKING_EVENTS_STREAM_SECONDS", DEFAULT_STREAM_SECONDS
+        )
+        self.heartbeat = getattr(
+            settings,
+            "BANKING_EVENTS_HEARTBEAT_SECONDS",
+            DEFAULT_HEARTBEAT_SECONDS,
+        )
+        self.poll_interval = getattr(
+            settings, "BANKING_EVENTS_POLL_SECONDS", DEFAULT_POLL_SECONDS
+        )
+        self.quiet_since = now
+
+    def frame(self, batch: list[Event]) -> str | None:
+        """Текст для клиента по результату опроса."""
+        now = time.monotonic()
+        if batch:
+            self.quiet_since = now
+            return "".join(event.encode() for event in batch)
+        if now - self.quiet_since >= self.heartbeat:
+            self.quiet_since = now
+            # Комментарий не даёт прокси закрыть простаивающее
+            # соединение.
+            return ": keep-alive\n\n"
+        return None
+
+    @property
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def pause(self) -> float:
+        return max(0.0, min(self.poll_interval, self.remaining))
+
+
+def stream(last_id: int | None = None):
+    """
+    Поток text/event-stream для WSGI. Поток закрывается через
+    BANKING_EVENTS_STREAM_SECONDS: браузер переподключается сам
+    с Last-Event-ID, а поток не занимает обработчик запросов бессрочно.
+    """
+    feed = EventFeed(last_id)
+    clock = StreamClock()
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    while True:
+        frame = clock.frame(feed.poll())
+        if frame:
+            yield frame
+        if clock.remaining <= 0:
+            return
+        time.sleep(clock.pause())
+
+
+async def astream(last_id: int | None = None):
+    """
+    Тот же поток для ASGI: опрос таблицы — в потоке Django через
+    sync_to_async, ожидание между опросами не занимает поток.
+    """
+    feed = EventFeed(last_id)
+    clock = StreamClock()
+    poll = sync_to_async(feed.poll)
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    while True:
+        frame = clock.frame(await poll())
+        if frame:
+            yield frame
+        if clock.remaining <= 0:
+            return
+        await asyncio.sleep(clock.pause())
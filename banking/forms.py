@@ -1,8 +1,16 @@
 from decimal import Decimal
 
 from django import forms
+from django.urls import reverse_lazy
 
+from .analytics import (
+    MAX_TOP_COUNTERPARTIES,
+    TOP_COUNTERPARTIES,
+    InvalidPeriod,
+    period,
+)
 from .models import Account, ClientProfile, Transaction
+from .statements import FORMAT_CHOICES, FORMAT_CSV
 from .utils import normalize_text
 
 
@@ -163,6 +171,51 @@ class TransferForm(forms.Form):
         }
 
 
+class ClientChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        return client_label(obj)
+
+
+def client_label(client: ClientProfile) -> str:
+    return f"{client.full_name} (ID {client.pk})"
+
+
+class ClientAutocompleteSelect(forms.Select):
+    """
+    Список клиентов, который не выводит всю таблицу: в HTML попадает
+    только выбранный клиент, остальные варианты подгружаются скриптом
+    страницы из JSON-эндпоинта data-autocomplete-url.
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs["data-autocomplete-url"] = str(self.url)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [
+            v for v in value if v and str(v).isascii() and str(v).isdecimal()
+        ]
+        options = [self.create_option(name, "", "Все", not selected, 0)]
+        if selected:
+            clients = self.choices.queryset.filter(pk__in=selected)
+            for index, client in enumerate(clients, start=1):
+                options.append(
+                    self.create_option(
+                        name,
+                        client.pk,
+                        self.choices.field.label_from_instance(client),
+                        True,
+                        index,
+                    )
+                )
+        return [(None, options, 0)]
+
+
 class TransactionFilterForm(forms.Form):
     date_from = forms.DateField(
         required=False,
@@ -184,12 +237,71 @@ class TransactionFilterForm(forms.Form):
         label="Статус",
         choices=[("", "Все")] + list(Transaction.Status.choices),
     )
-    client = forms.ModelChoiceField(
+    client = ClientChoiceField(
         required=False,
         label="Клиент",
         queryset=ClientProfile.objects.all(),
+        widget=ClientAutocompleteSelect(
+            reverse_lazy("banking:admin_client_autocomplete")
+        ),
+    )
+
+
+class StatementForm(forms.Form):
+    """Параметры выписки: период, счёт и формат файла."""
+
+    date_from = forms.DateField(required=False, label="Дата с")
+    date_to = forms.DateField(required=False, label="Дата по")
+    account = forms.IntegerField(required=False, min_value=1, label="Счёт")
+    format = forms.ChoiceField(
+        required=False, label="Формат", choices=FORMAT_CHOICES
     )
 
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError(
+                "Дата начала периода позже даты окончания."
+            )
+        cleaned_data["format"] = cleaned_data.get("format") or FORMAT_CSV
+        return cleaned_data
+
+
+class AdminStatementForm(StatementForm, TransactionFilterForm):
+    """Выписка сотрудника: любые счета и фильтры списка операций."""
+
+
+class AnalyticsForm(forms.Form):
+    """Параметры аналитики трат: период, счёт или клиент, число получателей."""
+
+    date_from = forms.DateField(required=False, label="Дата с")
+    date_to = forms.DateField(required=False, label="Дата по")
+    account = forms.IntegerField(required=False, min_value=1, label="Счёт")
+    client = forms.IntegerField(required=False, min_value=1, label="Клиент")
+    top = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_TOP_COUNTERPARTIES,
+        label="Получателей",
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        # Порядок дат и длина периода проверяются после подстановки
+        # значений по умолчанию.
+        try:
+            cleaned_data["date_from"], cleaned_data["date_to"] = period(
+                cleaned_data.get("date_from"), cleaned_data.get("date_to")
+            )
+        except InvalidPeriod as exc:
+            raise forms.ValidationError(str(exc)) from exc
+        cleaned_data["top"] = cleaned_data.get("top") or TOP_COUNTERPARTIES
+        return cleaned_data
+
 
 class ClientFilterForm(forms.Form):
     search = forms.CharField(
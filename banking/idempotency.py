@@ -0,0 +1,190 @@
+"""
+Идемпотентность клиентских операций.
+
+Ключ резервируется в той же транзакции БД, что и создаваемая операция,
+поэтому повтор запроса (в том числе параллельный) не создаёт вторую
+операцию. Источник истины — таблица IdempotencyKey; недавние итоговые
+результаты дополнительно держатся в памяти процесса в LRU-кэше
+с ограниченным временем жизни, чтобы повторы не обращались к базе.
+Результат «в обработке» не кэшируется: повтор узнаёт итог из базы.
+
+Вместе с ключом хранится отпечаток параметров запроса (fingerprint):
+тот же ключ с другими параметрами — ошибка клиента (KeyReused), а не
+повтор. Ключи старше BANKING_IDEMPOTENCY_TTL_SECONDS удаляются
+(purge_expired) после каждого PURGE_INTERVAL-го резервирования.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, models
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+KEY_MAX_LENGTH = 64
+PURGE_INTERVAL = 1000
+
+
+class DuplicateRequest(Exception):
+    """Ключ уже зарезервирован другим запросом."""
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self.key = key
+
+
+class KeyReused(Exception):
+    """Ключ уже использован запросом с другими параметрами."""
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self.key = key
+
+
+class ReplayCache:
+    """Потокобезопасный LRU-кэш с вытеснением по времени жизни."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def ttl_seconds() -> int:
+    return getattr(
+        settings, "BANKING_IDEMPOTENCY_TTL_SECONDS", DEFAULT_TTL_SECONDS
+    )
+
+
+replay_cache = ReplayCache(
+    max_size=getattr(
+        settings, "BANKING_IDEMPOTENCY_CACHE_SIZE", DEFAULT_CACHE_SIZE
+    ),
+    ttl_seconds=ttl_seconds(),
+)
+
+
+def make_key(scope, raw_key: str | None) -> str | None:
+    """
+    Ключ клиента ограничивается областью (пользователь и тип операции),
+    чтобы ключи разных клиентов и форм не пересекались.
+    """
+    raw_key = (raw_key or "").strip()[:KEY_MAX_LENGTH]
+    if not raw_key:
+        return None
+    return f"{scope}:{raw_key}"
+
+
+def _canonical(value):
+    if isinstance(value, models.Model):
+        return value.pk
+    if isinstance(value, Decimal):
+        # 250, 250.0 и 250.00 — одна и та же сумма.
+        return str(value.normalize())
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return str(value)
+
+
+def fingerprint(params: dict) -> str:
+    """
+    Отпечаток параметров операции: объекты моделей — по первичному
+    ключу, суммы — без незначащих нулей. Пустые параметры (None, "")
+    не отличаются от пропущенных.
+    """
+    data = json.dumps(
+        sorted(
+            (name, _canonical(value))
+            for name, value in params.items()
+            if value is not None and value != ""
+        ),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def check_fingerprint(key: str, stored: str, expected: str) -> None:
+    # Ключи, записанные до появления отпечатков, не проверяются.
+    if stored and stored != expected:
+        raise KeyReused(key)
+
+
+def reserve(key: str, transaction, request_fingerprint: str = "") -> None:
+    """
+    Резервирует ключ за операцией. Вызывается внутри atomic-блока,
+    создающего операцию: DuplicateRequest откатывает её создание.
+    """
+    try:
+        with db_transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                key=key,
+                transaction=transaction,
+                fingerprint=request_fingerprint,
+            )
+    except IntegrityError as exc:
+        raise DuplicateRequest(key) from exc
+    if record.id % PURGE_INTERVAL == 0:
+        db_transaction.on_commit(purge_expired)
+
+
+def purge_expired() -> int:
+    """Удаляет ключи старше BANKING_IDEMPOTENCY_TTL_SECONDS."""
+    cutoff = timezone.now() - timedelta(seconds=ttl_seconds())
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def load(key: str) -> IdempotencyKey | None:
+    return (
+        IdempotencyKey.objects.select_related(
+            "transaction__account__client"
+        )
+        .filter(key=key)
+        .first()
+    )
+
+
+def store(key: str, *, completed: bool, pending: bool, message: str):
+    IdempotencyKey.objects.filter(key=key).update(
+        completed=completed, pending=pending, message=message[:255]
+    )
@@ -0,0 +1,179 @@
+"""
+Журнал изменений балансов и контрольные точки.
+
+Каждое изменение Account.balance, проходящее через леджеры services.py
+(RowLockLedger, ConditionalLedger), добавляет в LedgerEntry запись
+с суммой со знаком и балансом после неё. Записи только добавляются,
+поэтому по журналу можно восстановить баланс на любой момент: это один
+поиск по индексу (account, created_at, id) — последняя запись до момента
+уже хранит баланс.
+
+BalanceCheckpoint периодически (команда create_balance_checkpoints)
+фиксирует проверенный баланс счёта. Проверка корректности Account.balance
+начинается с последней точки и просматривает только записи после неё.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Account, BalanceCheckpoint, LedgerEntry
+
+ENTRY_BATCH_SIZE = 1000
+
+
+def append_entries(changes, *, now=None) -> list[LedgerEntry]:
+    """
+    Записывает изменения балансов одним bulk_create. changes — список
+    (счёт, сумма со знаком, операция) в порядке применения; баланс счёта
+    в памяти должен быть итоговым, промежуточные балансы считаются
+    от него в обратном порядке.
+    """
+    if not changes:
+        return []
+    now = now or timezone.now()
+    running = {}
+    entries = []
+    for account, amount, transaction in reversed(changes):
+        balance = running.get(account.id, account.balance)
+        entries.append(
+            LedgerEntry(
+                account_id=account.id,
+                transaction_id=transaction.id if transaction else None,
+                amount=amount,
+                balance_after=balance,
+                created_at=now,
+            )
+        )
+        running[account.id] = balance - amount
+    entries.reverse()
+    return LedgerEntry.objects.bulk_create(
+        entries, batch_size=ENTRY_BATCH_SIZE
+    )
+
+
+def _latest_checkpoint(account: Account, at=None):
+    checkpoints = BalanceCheckpoint.objects.filter(account=account)
+    if at is not None:
+        checkpoints = checkpoints.filter(created_at__lte=at)
+    return checkpoints.order_by("-created_at", "-id").first()
+
+
+def balance_as_of(account: Account, at) -> Decimal:
+    """Баланс счёта на момент at по журналу."""
+    balance = (
+        LedgerEntry.objects.filter(account=account, created_at__lte=at)
+        .order_by("-created_at", "-id")
+        .values_list("balance_after", flat=True)
+        .first()
+    )
+    if balance is not None:
+        return balance
+
+    # До первой записи журнала баланс был начальным.
+    checkpoint = _latest_checkpoint(account, at)
+    if checkpoint is not None:
+        return checkpoint.balance
+    first = (
+        LedgerEntry.objects.filter(account=account)
+        .order_by("created_at", "id")
+        .first()
+    )
+    if first is not None:
+        return first.balance_after - first.amount
+    return account.balance
+
+
+def verify_account(account: Account) -> list[str]:
+    """
+    Сверяет журнал с Account.balance, начиная с последней контрольной
+    точки. Возвращает список расхождений (пустой, если всё сходится).
+    """
+    entries = LedgerEntry.objects.filter(account=account)
+    checkpoint = _latest_checkpoint(account)
+    if checkpoint is not None:
+        expected = checkpoint.balance
+        if checkpoint.last_entry_id:
+            entries = entries.filter(id__gt=checkpoint.last_entry_id)
+    else:
+        first = entries.order_by("id").first()
+        expected = (
+            first.balance_after - first.amount
+            if first is not None
+            else account.balance
+        )
+
+    problems = []
+    for entry_id, amount, balance_after in (
+        entries.order_by("id")
+        .values_list("id", "amount", "balance_after")
+        .iterator()
+    ):
+        expected += amount
+        if expected != balance_after:
+            problems.append(
+                f"Запись {entry_id}: ожидался баланс {expected}, "
+                f"в журнале {balance_after}"
+            )
+            expected = balance_after
+    if expected != account.balance:
+        problems.append(
+            f"Баланс счёта {account.balance}, по журналу {expected}"
+        )
+    return problems
+
+
+def create_checkpoint(account: Account) -> BalanceCheckpoint | None:
+    """
+    Фиксирует баланс счёта, если он сходится с журналом. Счёт
+    блокируется, чтобы баланс и последняя запись журнала читались
+    согласованно. Возвращает None при расхождении.
+    """
+    with db_transaction.atomic():
+        account = Account.objects.select_for_update().get(pk=account.pk)
+        if verify_account(account):
+            return None
+        last_entry = (
+            LedgerEntry.objects.filter(account=account).order_by("-id").first()
+        )
+        return BalanceCheckpoint.objects.create(
+            account=account,
+            last_entry=last_entry,
+            balance=account.balance,
+        )
+
+
+def clear_journal(account_ids) -> None:
+    """
+    Удаляет записи журнала и контрольные точки счетов account_ids.
+    Только для команд загрузки демонстрационных данных, которые
+    пересоздают операции счетов: записи ссылаются на операции.
+    """
+    BalanceCheckpoint.objects.filter(account_id__in=account_ids).delete()
+    LedgerEntry.objects.filter(account_id__in=account_ids).delete()
+
+
+def reset_journal(account_ids=None) -> int:
+    """
+    Начинает журнал счетов (всех или account_ids) заново: удаляет их
+    записи и контрольные точки и фиксирует текущие балансы начальными
+    точками, как миграция 0006_ledger. Команды загрузки демонстрационных
+    данных пишут операции и балансы напрямую и вызывают её в конце.
+    Возвращает число счетов.
+    """
+    with db_transaction.atomic():
+        accounts = Account.objects.all()
+        if account_ids is not None:
+            accounts = accounts.filter(id__in=account_ids)
+        balances = list(accounts.values_list("id", "balance"))
+        clear_journal([account_id for account_id, _ in balances])
+        BalanceCheckpoint.objects.bulk_create(
+            (
+                BalanceCheckpoint(account_id=account_id, balance=balance)
+                for account_id, balance in balances
+            ),
+            batch_size=ENTRY_BATCH_SIZE,
+        )
+    return len(balances)
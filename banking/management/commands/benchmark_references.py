@@ -0,0 +1,79 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from banking.references import ReferenceAllocator
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет скорость выдачи номеров операций (без обращений к базе) '
+        'и проверяет их уникальность'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=1_000_000,
+            help='Сколько номеров выдать в каждом замере (по умолчанию: 1e6)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Потоков в многопоточном замере (по умолчанию: 4)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        allocator = ReferenceAllocator()
+
+        started = time.perf_counter()
+        single = [allocator.next() for _ in range(count)]
+        self._report('next()', count, started)
+
+        started = time.perf_counter()
+        batch = allocator.allocate(count)
+        self._report('allocate()', count, started)
+
+        threads = options['threads']
+        per_thread = count // threads
+        results = [None] * threads
+
+        def worker(index):
+            results[index] = [allocator.next() for _ in range(per_thread)]
+
+        workers = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self._report(
+            f'next() в {threads} потоках', per_thread * threads, started
+        )
+
+        issued = single + batch
+        for chunk in results:
+            issued.extend(chunk)
+        duplicates = len(issued) - len(set(issued))
+        longest = max(len(reference) for reference in issued)
+        self.stdout.write(f'Пример: {issued[-1]}')
+        self.stdout.write(
+            f'Выдано: {len(issued)}, повторов: {duplicates}, '
+            f'максимальная длина: {longest}'
+        )
+        if duplicates:
+            self.stderr.write(self.style.ERROR('Найдены повторы номеров!'))
+
+    def _report(self, label, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label}: {count} номеров за {elapsed:.2f} с '
+            f'({count / elapsed:,.0f} в секунду)'
+        )
@@ -0,0 +1,67 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.models import Account
+from banking.services import create_and_process_transfers_bulk, payout_items
+
+
+class Command(BaseCommand):
+    help = (
+        'Выплаты с одного счёта на многие (зарплата, кешбэк) из CSV-файла '
+        'со столбцами: номер счёта, сумма, комментарий'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='Номер счёта, с которого выполняются выплаты',
+        )
+        parser.add_argument(
+            'csv_file',
+            help='Путь к CSV-файлу или «-» для чтения из stdin',
+        )
+        parser.add_argument(
+            '--delimiter',
+            default=',',
+            help='Разделитель столбцов CSV (по умолчанию: «,»)',
+        )
+        parser.add_argument(
+            '--skip-header',
+            action='store_true',
+            help='Пропустить первую строку файла',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            source = Account.objects.get(account_number=options['source'])
+        except Account.DoesNotExist:
+            raise CommandError(f'Счёт {options["source"]} не найден.')
+
+        if options['csv_file'] == '-':
+            rows = self._read_rows(sys.stdin, options)
+        else:
+            with open(options['csv_file'], newline='', encoding='utf-8') as f:
+                rows = self._read_rows(f, options)
+
+        try:
+            items = payout_items(rows)
+            result = create_and_process_transfers_bulk(source, items)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        style = self.style.SUCCESS if result.completed else self.style.WARNING
+        self.stdout.write(style(result.message))
+        self.stdout.write(
+            f'Проведено: {result.completed_count}, '
+            f'отменено: {result.cancelled_count}, '
+            f'всего: {len(result.transactions)}'
+        )
+
+    @staticmethod
+    def _read_rows(stream, options):
+        reader = csv.reader(stream, delimiter=options['delimiter'])
+        if options['skip_header']:
+            next(reader, None)
+        return [row for row in reader if any(cell.strip() for cell in row)]
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.ledger import create_checkpoint, verify_account
+from banking.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет балансы счетов с журналом операций и фиксирует '
+        'контрольные точки (запускать периодически, например из cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            action='append',
+            dest='accounts',
+            help='Номер счёта (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Только проверить балансы, не создавая контрольных точек',
+        )
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.order_by('id')
+        if options['accounts']:
+            accounts = accounts.filter(account_number__in=options['accounts'])
+
+        checked = 0
+        mismatched = 0
+        for account in accounts.iterator():
+            checked += 1
+            if not options['verify_only'] and create_checkpoint(account):
+                continue
+            problems = verify_account(account)
+            if not problems:
+                continue
+            mismatched += 1
+            self.stderr.write(
+                self.style.ERROR(f'Счёт {account.account_number}:')
+            )
+            for problem in problems:
+                self.stderr.write(f'  {problem}')
+
+        self.stdout.write(
+            f'Проверено счетов: {checked}, с расхождениями: {mismatched}'
+        )
+        if mismatched:
+            raise CommandError('Балансы не сходятся с журналом.')
@@ -0,0 +1,205 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from banking.models import Account, ClientProfile, Transaction
+from banking.references import allocate_references
+from banking.utils import day_range
+
+SEED_BATCH_SIZE = 5000
+PAGE_SIZE = 26
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы и время запросов списков операций с индексами '
+        'Transaction и без них. С --seed заполняет таблицу синтетическими '
+        'операциями; по умолчанию все изменения откатываются. Удаление '
+        'индексов блокирует таблицу — не запускайте на рабочей базе; '
+        'команда требует --i-know и базы с транзакционным DDL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Сколько синтетических операций добавить перед замером',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько дней распределить добавленные операции',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Сохранить добавленные операции (по умолчанию — откат)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Сколько раз выполнять запрос для замера (берётся лучший)',
+        )
+        parser.add_argument(
+            '--i-know',
+            action='store_true',
+            help=(
+                'Подтвердить, что база не рабочая: индексы Transaction '
+                'удаляются на время замера'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        # Индексы удаляются в самой базе и возвращаются только откатом
+        # транзакции: без транзакционного DDL удаление было бы
+        # необратимым.
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(
+                f'База {connection.vendor} не откатывает DDL: индексы '
+                'Transaction нельзя временно удалить.'
+            )
+        if not options['i_know']:
+            raise CommandError(
+                'Команда удаляет индексы Transaction и блокирует таблицу '
+                'до конца замера. Запускайте её только на копии базы '
+                'с флагом --i-know.'
+            )
+        with db_transaction.atomic():
+            if options['seed']:
+                self._seed(options['seed'], options['days'])
+            self._analyze()
+            self.stdout.write(
+                f'Операций в таблице: {Transaction.objects.count()}'
+            )
+
+            queries = self._queries()
+            with_indexes = self._measure(queries, options['repeat'])
+            with db_transaction.atomic():
+                self._drop_indexes()
+                without_indexes = self._measure(queries, options['repeat'])
+                db_transaction.set_rollback(True)
+
+            for name in queries:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+                for title, results in (
+                    ('без индексов', without_indexes),
+                    ('с индексами', with_indexes),
+                ):
+                    plan, seconds = results[name]
+                    self.stdout.write(f'  {title}: {seconds * 1000:.1f} мс')
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
+
+            if not options['keep']:
+                db_transaction.set_rollback(True)
+
+    def _queries(self):
+        transactions = Transaction.objects.order_by('-created_at', '-id')
+        account_id = (
+            Transaction.objects.values_list('account_id', flat=True)
+            .order_by('-id')
+            .first()
+        )
+        today = timezone.localdate()
+        week_ago = today - timedelta(days=7)
+        return {
+            'Последние операции': transactions,
+            'Статус «В обработке»': transactions.filter(
+                status=Transaction.Status.PENDING
+            ),
+            'Тип «Пополнение»': transactions.filter(
+                transaction_type=Transaction.TransactionType.DEPOSIT
+            ),
+            'История счёта': transactions.filter(account_id=account_id),
+            'За неделю (created_at__date)': transactions.filter(
+                created_at__date__gte=week_ago,
+                created_at__date__lte=today,
+            ),
+            'За неделю (полуоткрытый интервал)': transactions.filter(
+                **day_range(week_ago, today)
+            ),
+        }
+
+    def _measure(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            queryset = queryset[:PAGE_SIZE]
+            plan = queryset.explain()
+            best = None
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                list(queryset.values_list('id', flat=True))
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = (plan, best)
+        return results
+
+    def _drop_indexes(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for index in Transaction._meta.indexes:
+                cursor.execute(f'DROP INDEX {quote(index.name)}')
+        self._analyze()
+
+    def _analyze(self):
+        table = connection.ops.quote_name(Transaction._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {table}')
+
+    def _seed(self, count, days):
+        account_ids = list(Account.objects.values_list('id', flat=True))
+        if not account_ids:
+            user = get_user_model().objects.create(username='explain-seed')
+            profile = ClientProfile.objects.create(
+                user=user, full_name='Синтетический клиент'
+            )
+            account_ids = [
+                Account.objects.create(
+                    client=profile, account_number='40817810999999999999'
+                ).id
+            ]
+
+        now = timezone.now()
+        statuses = [
+            Transaction.Status.COMPLETED,
+            Transaction.Status.CANCELLED,
+            Transaction.Status.PENDING,
+        ]
+        weights = [90, 9, 1]
+        types = Transaction.TransactionType.values
+        batches = (count + SEED_BATCH_SIZE - 1) // SEED_BATCH_SIZE
+        created = 0
+        for batch in range(batches):
+            size = min(SEED_BATCH_SIZE, count - created)
+            created_at = (
+                now - timedelta(days=days) * (batches - 1 - batch) / batches
+            )
+            rows = Transaction.objects.bulk_create(
+                Transaction(
+                    reference=reference,
+                    account_id=random.choice(account_ids),
+                    transaction_type=random.choice(types),
+                    amount=Decimal(random.randint(100, 100000)),
+                    status=random.choices(statuses, weights)[0],
+                )
+                for reference in allocate_references(size, at=created_at)
+            )
+            # created_at заполняется при вставке (auto_now_add), поэтому
+            # время распределяется по пачкам отдельным UPDATE: от старых
+            # пачек к новым.
+            Transaction.objects.filter(
+                id__gte=rows[0].id, id__lte=rows[-1].id
+            ).update(created_at=created_at)
+            created += size
+            if (batch + 1) % 100 == 0:
+                self.stdout.write(f'Добавлено операций: {created}')
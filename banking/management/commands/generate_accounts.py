@@ -6,9 +6,10 @@ from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from banking import aggregates, ledger, rollups
 from banking.models import Account, ClientProfile, Transaction
+from banking.references import next_reference
 from banking.utils import normalize_text, biased_random_amount
-from django.utils.crypto import get_random_string
 
 RUSSIAN_MALE_FIRST_NAMES = [
     'Александр',
@@ -296,6 +297,8 @@ class Command(BaseCommand):
             Account.objects.values_list('account_number', flat=True)
         )
 
+        # Счета, чьи балансы команда меняет напрямую.
+        self.touched_account_ids = set()
         created_count = 0
         for i in range(count):
             is_male = random.choice([True, False])
@@ -382,6 +385,12 @@ class Command(BaseCommand):
                     f'Создано {i + 1}/{count} учетных записей...'
                 )
 
+        # Балансы и операции записаны напрямую, минуя журнал, счётчики
+        # итогов и итоги по месяцам.
+        ledger.reset_journal(self.touched_account_ids)
+        aggregates.rebuild()
+        rollups.rebuild()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Успешно создано {created_count} учетных записей '
@@ -392,8 +401,10 @@ class Command(BaseCommand):
     def _generate_transaction_history(
         self, account: Account, profile: ClientProfile, seed: int
     ) -> None:
+        ledger.clear_journal([account.id])
         Transaction.objects.filter(account=account).delete()
         account.balance = Decimal('0.00')
+        self.touched_account_ids.add(account.id)
 
         now = timezone.now()
         months_back = random.randint(6, 12)
@@ -458,11 +469,8 @@ class Command(BaseCommand):
                     amount = None
 
                 if amount and balance >= amount:
-                    base_reference = self._generate_reference(created_at)
-                    outgoing_reference = base_reference
-                    incoming_reference = base_reference.replace(
-                        'TRX-', 'TRX-IN-'
-                    )
+                    outgoing_reference = next_reference(created_at)
+                    incoming_reference = next_reference(created_at)
 
                     outgoing = Transaction(
                         account=account,
@@ -520,7 +528,7 @@ class Command(BaseCommand):
                     balance -= amount
             elif balance < Decimal('10000') or random.random() < 0.6:
                 amount = biased_random_amount(MIN_AMOUNT, MAX_AMOUNT)
-                reference = self._generate_reference(created_at)
+                reference = next_reference(created_at)
                 transaction = Transaction(
                     account=account,
                     transaction_type=Transaction.TransactionType.DEPOSIT,
@@ -545,7 +553,7 @@ class Command(BaseCommand):
                 max_withdrawal = min(balance, MAX_AMOUNT)
                 if max_withdrawal >= MIN_AMOUNT:
                     amount = biased_random_amount(MIN_AMOUNT, max_withdrawal)
-                    reference = self._generate_reference(created_at)
+                    reference = next_reference(created_at)
                     transaction = Transaction(
                         account=account,
                         transaction_type=(
@@ -595,6 +603,7 @@ class Command(BaseCommand):
 
             target_account.balance += incoming.amount
             target_account.save(update_fields=['balance'])
+            self.touched_account_ids.add(target_account.id)
 
         account.balance = balance
 
@@ -610,16 +619,3 @@ class Command(BaseCommand):
         else:
             account.created_at = start_date
         account.save(update_fields=['balance', 'created_at'])
-
-    def _generate_reference(self, created_at) -> str:
-        timestamp = created_at.strftime('%Y%m%d%H%M%S')
-        random_suffix = get_random_string(6, allowed_chars='0123456789ABCDEF')
-        reference = f'TRX-{timestamp}-{random_suffix}'
-
-        while Transaction.objects.filter(reference=reference).exists():
-            random_suffix = get_random_string(
-                6, allowed_chars='0123456789ABCDEF'
-            )
-            reference = f'TRX-{timestamp}-{random_suffix}'
-
-        return reference
@@ -5,9 +5,10 @@ from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.utils.crypto import get_random_string
 
+from banking import aggregates, ledger, rollups
 from banking.models import Account, ClientProfile, Transaction
+from banking.references import next_reference
 from banking.utils import (
     normalize_text,
     biased_random_amount,
@@ -376,6 +377,12 @@ class Command(BaseCommand):
         self.stdout.write("Корректирую балансы счетов...")
         self._adjust_account_balances()
 
+        # Балансы и операции записаны напрямую, минуя журнал, счётчики
+        # итогов и итоги по месяцам. Балансы меняются у всех счетов.
+        ledger.reset_journal()
+        aggregates.rebuild()
+        rollups.rebuild()
+
         self.stdout.write(
             self.style.SUCCESS("Тестовые данные успешно загружены.")
         )
@@ -383,6 +390,7 @@ class Command(BaseCommand):
     def _seed_transactions(
         self, account: Account, profile: ClientProfile, seed_index: int
     ) -> None:
+        ledger.clear_journal([account.id])
         Transaction.objects.filter(account=account).delete()
         account.balance = Decimal("0.00")
         account.save(update_fields=["balance"])
@@ -575,6 +583,7 @@ class Command(BaseCommand):
     def _generate_transaction_history(
         self, account: Account, profile: ClientProfile, seed: int
     ) -> None:
+        ledger.clear_journal([account.id])
         Transaction.objects.filter(account=account).delete()
         account.balance = Decimal("0.00")
 
@@ -636,11 +645,8 @@ class Command(BaseCommand):
                     amount = None
 
                 if amount and balance >= amount:
-                    base_reference = self._generate_reference(created_at)
-                    outgoing_reference = base_reference
-                    incoming_reference = base_reference.replace(
-                        "TRX-", "TRX-IN-"
-                    )
+                    outgoing_reference = next_reference(created_at)
+                    incoming_reference = next_reference(created_at)
 
                     outgoing = Transaction(
                         account=account,
@@ -698,7 +704,7 @@ class Command(BaseCommand):
                     balance -= amount
             elif balance < Decimal("10000") or random.random() < 0.6:
                 amount = biased_random_amount(MIN_AMOUNT, MAX_AMOUNT)
-                reference = self._generate_reference(created_at)
+                reference = next_reference(created_at)
                 transaction = Transaction(
                     account=account,
                     transaction_type=Transaction.TransactionType.DEPOSIT,
@@ -723,7 +729,7 @@ class Command(BaseCommand):
                 max_withdrawal = min(balance, MAX_AMOUNT)
                 if max_withdrawal >= MIN_AMOUNT:
                     amount = biased_random_amount(MIN_AMOUNT, max_withdrawal)
-                    reference = self._generate_reference(created_at)
+                    reference = next_reference(created_at)
                     transaction = Transaction(
                         account=account,
                         transaction_type=(
@@ -791,19 +797,6 @@ class Command(BaseCommand):
             account.created_at = start_date
         account.save(update_fields=["balance", "created_at"])
 
-    def _generate_reference(self, created_at) -> str:
-        timestamp = created_at.strftime("%Y%m%d%H%M%S")
-        random_suffix = get_random_string(6, allowed_chars="0123456789ABCDEF")
-        reference = f"TRX-{timestamp}-{random_suffix}"
-
-        while Transaction.objects.filter(reference=reference).exists():
-            random_suffix = get_random_string(
-                6, allowed_chars="0123456789ABCDEF"
-            )
-            reference = f"TRX-{timestamp}-{random_suffix}"
-
-        return reference
-
     def _randomize_all_transaction_dates(self, months_back: int = 12) -> None:
         now = timezone.now()
         start_date = now - timedelta(days=months_back * 30)
@@ -852,8 +845,12 @@ class Command(BaseCommand):
                     minutes=random.randint(1, 10)
                 )
 
+                # Номер выдаётся заново, чтобы его метка совпала с новой
+                # датой операции.
                 Transaction.objects.filter(pk=transaction.pk).update(
-                    created_at=new_date, processed_at=processed_at
+                    created_at=new_date,
+                    processed_at=processed_at,
+                    reference=next_reference(new_date),
                 )
                 total_updated += 1
 
@@ -901,7 +898,7 @@ class Command(BaseCommand):
                         transaction_type=Transaction.TransactionType.DEPOSIT,
                         amount=deposit_amount,
                         status=Transaction.Status.COMPLETED,
-                        reference=self._generate_reference(transaction_date),
+                        reference=next_reference(transaction_date),
                         note=normalize_text(
                             random.choice(
                                 TRANSACTION_NOTES[
@@ -933,7 +930,7 @@ class Command(BaseCommand):
                         ),
                         amount=withdrawal_amount,
                         status=Transaction.Status.COMPLETED,
-                        reference=self._generate_reference(transaction_date),
+                        reference=next_reference(transaction_date),
                         note=normalize_text(
                             random.choice(
                                 TRANSACTION_NOTES[
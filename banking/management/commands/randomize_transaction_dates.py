@@ -4,6 +4,7 @@ from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from banking import rollups
 from banking.models import Account, Transaction
 
 
@@ -79,6 +80,9 @@ class Command(BaseCommand):
                 )
                 total_updated += 1
 
+        # Операции переехали в другие месяцы.
+        rollups.rebuild()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Успешно обновлено {total_updated} транзакций. "
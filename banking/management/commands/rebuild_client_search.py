@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from banking.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает индекс поиска клиентов (префиксы имён, логинов '
+        'и номеров счетов)'
+    )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано клиентов: {indexed}')
+        )
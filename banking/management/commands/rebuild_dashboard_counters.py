@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking import aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики итогов админ-панели (сумма балансов, '
+        'число счетов, клиентов и операций по статусам) по таблицам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сравнить счётчики с таблицами, не изменяя их',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self._check()
+            return
+
+        totals = aggregates.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Счётчики пересчитаны: клиентов {totals.clients}, '
+                f'счетов {totals.accounts}, '
+                f'операций {totals.transactions}, '
+                f'сумма балансов {totals.balance:,.2f} ₽'
+            )
+        )
+
+    def _check(self):
+        stored = aggregates.stored_values()
+        drifted = 0
+        for name, expected in aggregates.compute_totals().items():
+            actual = stored.get(name, 0)
+            if actual != expected:
+                drifted += 1
+                self.stderr.write(
+                    f'{name}: в счётчике {actual}, по таблицам {expected}'
+                )
+        if drifted:
+            raise CommandError(
+                'Счётчики расходятся с таблицами, запустите команду '
+                'без --check.'
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики сходятся с таблицами.'))
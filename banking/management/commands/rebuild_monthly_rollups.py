@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает итоги операций счетов по месяцам (число и сумма '
+        'по типу и статусу) по таблице операций'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            type=int,
+            action='append',
+            dest='accounts',
+            help='id счёта; можно указать несколько раз (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сравнить итоги с операциями, не изменяя их',
+        )
+
+    def handle(self, *args, **options):
+        accounts = options['accounts']
+        if options['check']:
+            self._check(accounts)
+            return
+
+        rows = rollups.rebuild(accounts)
+        self.stdout.write(
+            self.style.SUCCESS(f'Итоги по месяцам пересчитаны: строк {rows}')
+        )
+
+    def _check(self, accounts):
+        zero = (0, 0)
+        stored = rollups.stored_rows(accounts)
+        expected = rollups.compute_rows(accounts)
+        drifted = 0
+        for key in sorted(stored.keys() | expected.keys()):
+            actual = stored.get(key, zero)
+            correct = expected.get(key, zero)
+            if actual != correct:
+                drifted += 1
+                account_id, month, transaction_type, status = key
+                self.stderr.write(
+                    f'счёт {account_id}, {month:%Y-%m}, {transaction_type}/'
+                    f'{status}: в итогах {actual[0]} на {actual[1]}, '
+                    f'по операциям {correct[0]} на {correct[1]}'
+                )
+        if drifted:
+            raise CommandError(
+                'Итоги расходятся с операциями, запустите команду '
+                'без --check.'
+            )
+        self.stdout.write(self.style.SUCCESS('Итоги сходятся с операциями.'))
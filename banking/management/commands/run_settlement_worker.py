@@ -0,0 +1,138 @@
+import signal
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from banking.settlement import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_POLL_INTERVAL,
+    SettlementWorker,
+    make_worker_id,
+    release_stale_claims,
+)
+
+RESTART_DELAY_SECONDS = 2
+SHUTDOWN_TIMEOUT_SECONDS = 30
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает воркеры фонового проведения операций "
+        "(BANKING_SETTLEMENT_MODE = \"background\")"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Количество процессов-воркеров (по умолчанию: 1)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=(
+                "Сколько операций воркер арендует за один раз "
+                f"(по умолчанию: {DEFAULT_BATCH_SIZE})"
+            ),
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=DEFAULT_POLL_INTERVAL,
+            help=(
+                "Пауза между опросами пустой очереди, секунд "
+                f"(по умолчанию: {DEFAULT_POLL_INTERVAL})"
+            ),
+        )
+        parser.add_argument(
+            "--worker-index",
+            type=int,
+            default=0,
+            help="Номер воркера; задаётся супервизором для дочерних процессов",
+        )
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+
+        if options["concurrency"] <= 1:
+            self._run_worker(options)
+        else:
+            self._supervise(options)
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+        worker = getattr(self, "_worker", None)
+        if worker is not None:
+            worker.stop()
+
+    def _run_worker(self, options):
+        worker_id = make_worker_id(options["worker_index"])
+        self._worker = SettlementWorker(
+            worker_id,
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+        )
+        self.stdout.write(f"Воркер {worker_id} запущен.")
+        self._worker.run()
+        self.stdout.write(f"Воркер {worker_id} остановлен.")
+
+    def _spawn(self, index, options):
+        return subprocess.Popen(
+            [
+                sys.executable,
+                sys.argv[0],
+                "run_settlement_worker",
+                "--concurrency=1",
+                f"--worker-index={index}",
+                f"--batch-size={options['batch_size']}",
+                f"--poll-interval={options['poll_interval']}",
+            ]
+        )
+
+    def _supervise(self, options):
+        concurrency = options["concurrency"]
+        released = release_stale_claims()
+        if released:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Снято просроченных аренд: {released}."
+                )
+            )
+
+        processes = {
+            index: self._spawn(index, options) for index in range(concurrency)
+        }
+        self.stdout.write(f"Запущено воркеров: {concurrency}.")
+
+        while not self._stopping:
+            time.sleep(RESTART_DELAY_SECONDS)
+            for index, process in list(processes.items()):
+                if process.poll() is None or self._stopping:
+                    continue
+                # Перезапущенный воркер с тем же номером сам вернёт
+                # в очередь операции, арендованные упавшим процессом.
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Воркер {index} завершился с кодом "
+                        f"{process.returncode}, перезапускаю..."
+                    )
+                )
+                processes[index] = self._spawn(index, options)
+
+        self.stdout.write("Останавливаю воркеры...")
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS
+        for process in processes.values():
+            try:
+                process.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.stdout.write(self.style.SUCCESS("Все воркеры остановлены."))
@@ -0,0 +1,118 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking import analytics
+from banking.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Аналитика трат по проведённым операциям: поступления и списания, '
+        'средний чек, главные получатели и чистый поток за 30 дней'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, help='id счёта')
+        parser.add_argument('--client', type=int, help='id клиента')
+        parser.add_argument(
+            '--date-from',
+            type=date.fromisoformat,
+            help='Начало периода, ГГГГ-ММ-ДД (по умолчанию 90 дней назад)',
+        )
+        parser.add_argument(
+            '--date-to',
+            type=date.fromisoformat,
+            help='Конец периода, ГГГГ-ММ-ДД (по умолчанию сегодня)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=analytics.TOP_COUNTERPARTIES,
+            help='Сколько получателей показать (по умолчанию: 10)',
+        )
+        parser.add_argument(
+            '--daily',
+            action='store_true',
+            help='Показать поступления и списания по дням',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help=(
+                'Сравнить время и результат с перебором операций через ORM'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        transactions = Transaction.objects.all()
+        if options['account']:
+            transactions = transactions.filter(account_id=options['account'])
+        if options['client']:
+            transactions = transactions.filter(
+                account__client_id=options['client']
+            )
+        params = (
+            transactions,
+            options['date_from'],
+            options['date_to'],
+            options['top'],
+        )
+
+        started = time.perf_counter()
+        try:
+            result = analytics.spending_analytics(*params)
+        except (
+            analytics.AnalyticsUnavailable,
+            analytics.InvalidPeriod,
+        ) as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - started
+        self._report(result, options['daily'])
+
+        if options['benchmark']:
+            started = time.perf_counter()
+            baseline = analytics.compute_with_orm(*params)
+            baseline_elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'NumPy: {elapsed:.3f} с, перебор ORM: '
+                f'{baseline_elapsed:.3f} с '
+                f'(быстрее в {baseline_elapsed / max(elapsed, 1e-9):.1f} раза)'
+            )
+            if baseline != result:
+                raise CommandError('Результаты NumPy и ORM расходятся!')
+            self.stdout.write(self.style.SUCCESS('Результаты совпадают.'))
+
+    def _report(self, result, daily):
+        self.stdout.write(
+            f'Период: {result.date_from} — {result.date_to}, '
+            f'операций: {result.transaction_count}'
+        )
+        self.stdout.write(
+            f'Поступления: {result.inflow:,.2f} ₽, '
+            f'списания: {result.outflow:,.2f} ₽'
+        )
+        if result.average_ticket is not None:
+            self.stdout.write(
+                f'Средний чек списаний: {result.average_ticket:,.2f} ₽'
+            )
+        if result.daily:
+            self.stdout.write(
+                f'Чистый поток за {analytics.ROLLING_DAYS} дней: '
+                f'{result.daily[-1].rolling_net:,.2f} ₽'
+            )
+        if result.top_counterparties:
+            self.stdout.write('Получатели:')
+            for total in result.top_counterparties:
+                self.stdout.write(
+                    f'  {total.account_number}: {total.count} на '
+                    f'{total.amount:,.2f} ₽'
+                )
+        if daily:
+            for flow in result.daily:
+                self.stdout.write(
+                    f'{flow.day}: +{flow.inflow:.2f} −{flow.outflow:.2f} '
+                    f'= {flow.net:.2f}, за {analytics.ROLLING_DAYS} дней '
+                    f'{flow.rolling_net:.2f}'
+                )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0003_fix_mojibake_notes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="claimed_by",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_opening_checkpoints(apps, schema_editor):
+    """Текущие балансы становятся начальными точками журнала."""
+    Account = apps.get_model("banking", "Account")
+    BalanceCheckpoint = apps.get_model("banking", "BalanceCheckpoint")
+    BalanceCheckpoint.objects.bulk_create(
+        (
+            BalanceCheckpoint(account_id=account_id, balance=balance)
+            for account_id, balance in Account.objects.values_list(
+                "id", "balance"
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0005_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("balance_after", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("account", models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="ledger_entries", to="banking.account")),
+                ("transaction", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name="ledger_entries", to="banking.transaction")),
+            ],
+            options={
+                "verbose_name": "Запись журнала",
+                "verbose_name_plural": "Журнал операций",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="BalanceCheckpoint",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("account", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="balance_checkpoints", to="banking.account")),
+                ("last_entry", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name="+", to="banking.ledgerentry")),
+            ],
+            options={
+                "verbose_name": "Контрольная точка баланса",
+                "verbose_name_plural": "Контрольные точки балансов",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="ledgerentry",
+            index=models.Index(fields=["account", "created_at", "id"], name="ledger_account_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="balancecheckpoint",
+            index=models.Index(fields=["account", "created_at"], name="checkpoint_account_time_idx"),
+        ),
+        migrations.RunPython(
+            create_opening_checkpoints, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:38
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+# Значения по умолчанию на момент миграции: BANKING_AGGREGATE_SHARDS
+# и статусы Transaction.Status.
+SHARDS = 8
+STATUSES = ("pending", "completed", "cancelled")
+
+
+def fill_counters(apps, schema_editor):
+    """Счётчики заполняются по текущим данным, остальные части — нулями."""
+    Account = apps.get_model("banking", "Account")
+    ClientProfile = apps.get_model("banking", "ClientProfile")
+    DashboardCounter = apps.get_model("banking", "DashboardCounter")
+    Transaction = apps.get_model("banking", "Transaction")
+
+    accounts = Account.objects.aggregate(
+        balance=Sum("balance"), count=Count("id")
+    )
+    values = {
+        "balance": accounts["balance"] or 0,
+        "accounts": accounts["count"],
+        "clients": ClientProfile.objects.count(),
+    }
+    values.update((f"transactions:{status}", 0) for status in STATUSES)
+    values.update(
+        (f"transactions:{status}", count)
+        for status, count in Transaction.objects.values_list("status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    DashboardCounter.objects.bulk_create(
+        DashboardCounter(
+            name=name, shard=shard, value=value if shard == 0 else 0
+        )
+        for name, value in values.items()
+        for shard in range(SHARDS)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0006_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardCounter",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=32)),
+                ("shard", models.PositiveSmallIntegerField(default=0)),
+                ("value", models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+            options={
+                "verbose_name": "Счётчик итогов",
+                "verbose_name_plural": "Счётчики итогов",
+                "constraints": [models.UniqueConstraint(fields=("name", "shard"), name="dashboard_counter_shard_uniq")],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
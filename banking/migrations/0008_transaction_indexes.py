@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0007_dashboardcounter"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["created_at", "id"], name="transaction_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["account", "created_at", "id"], name="transaction_account_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["status", "created_at", "id"], name="transaction_status_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["transaction_type", "created_at", "id"], name="transaction_type_time_idx"),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from banking.search import build_tokens
+
+
+def index_existing_clients(apps, schema_editor):
+    ClientProfile = apps.get_model("banking", "ClientProfile")
+    Account = apps.get_model("banking", "Account")
+    ClientSearchToken = apps.get_model("banking", "ClientSearchToken")
+    numbers = {}
+    for client_id, number in Account.objects.values_list(
+        "client_id", "account_number"
+    ).iterator():
+        numbers.setdefault(client_id, []).append(number)
+    ClientSearchToken.objects.bulk_create(
+        (
+            ClientSearchToken(client_id=client_id, token=token, weight=weight)
+            for client_id, full_name, username in ClientProfile.objects
+            .values_list("id", "full_name", "user__username")
+            .iterator()
+            for token, weight in build_tokens(
+                client_id, full_name, username, numbers.get(client_id, [])
+            ).items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0008_transaction_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClientSearchToken",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("token", models.CharField(max_length=20)),
+                ("weight", models.PositiveSmallIntegerField(default=1)),
+                ("client", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="search_tokens", to="banking.clientprofile")),
+            ],
+            options={
+                "verbose_name": "Токен поиска клиентов",
+                "verbose_name_plural": "Индекс поиска клиентов",
+                "constraints": [models.UniqueConstraint(fields=("token", "client"), name="client_search_token_uniq")],
+            },
+        ),
+        migrations.RunPython(index_existing_clients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:20
+
+import banking.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0009_clientsearchtoken"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="clientprofile",
+            name="card_version",
+            field=models.BigIntegerField(default=banking.models.new_cache_version, editable=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0010_clientprofile_card_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyAccountRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("month", models.DateField()),
+                ("transaction_type", models.CharField(choices=[("deposit", "Пополнение"), ("withdrawal", "Снятие"), ("transfer_out", "Перевод (списание)"), ("transfer_in", "Перевод (зачисление)")], max_length=20)),
+                ("status", models.CharField(choices=[("pending", "В обработке"), ("completed", "Завершена"), ("cancelled", "Отменена")], max_length=20)),
+                ("count", models.BigIntegerField(default=0)),
+                ("amount", models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ("account", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="monthly_rollups", to="banking.account")),
+            ],
+            options={
+                "verbose_name": "Итог счёта за месяц",
+                "verbose_name_plural": "Итоги счетов по месяцам",
+                "indexes": [models.Index(fields=["month"], name="monthly_rollup_month_idx")],
+                "constraints": [models.UniqueConstraint(fields=("account", "month", "transaction_type", "status"), name="monthly_rollup_uniq")],
+            },
+        ),
+    ]
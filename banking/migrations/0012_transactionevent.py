@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0011_monthlyaccountrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=20)),
+                ("data", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Событие ленты операций",
+                "verbose_name_plural": "События ленты операций",
+            },
+        ),
+    ]
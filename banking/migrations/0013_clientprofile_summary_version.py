@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:34
+
+import banking.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0012_transactionevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="clientprofile",
+            name="summary_version",
+            field=models.BigIntegerField(default=banking.models.new_cache_version, editable=False),
+        ),
+    ]
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
+import secrets
+
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
-from django.utils.crypto import get_random_string
 
+from .references import next_reference
 from .utils import normalize_text
 
 
+def new_cache_version() -> int:
+    """
+    Новая версия карточки или сводки клиента (см. banking/cards.py
+    и banking/summaries.py). Случайное значение, а не счётчик: версия
+    не повторяется ни после отката или восстановления базы, ни после
+    сохранения устаревшего экземпляра.
+    """
+    return secrets.randbits(62)
+
+
 class ClientProfile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -17,6 +29,16 @@ class ClientProfile(models.Model):
     full_name = models.CharField(max_length=255)
     job_title = models.CharField(max_length=255, blank=True)
     is_blocked = models.BooleanField(default=False)
+    # Входит в ключ кэша карточки клиента в админ-панели; меняется при
+    # любом изменении, которое видно в карточке.
+    card_version = models.BigIntegerField(
+        default=new_cache_version, editable=False
+    )
+    # Входит в ключ кэша сводки кабинета клиента; меняется при любом
+    # изменении, которое видно в сводке.
+    summary_version = models.BigIntegerField(
+        default=new_cache_version, editable=False
+    )
 
     class Meta:
         verbose_name = 'Клиент'
@@ -48,6 +70,33 @@ class ClientProfile(models.Model):
         return self.is_blocked or self.has_blocked_accounts
 
 
+class ClientSearchToken(models.Model):
+    """
+    Элемент индекса поиска клиентов: префикс слова из имени, логина или
+    номера счёта клиента (см. banking/search.py).
+    """
+
+    client = models.ForeignKey(
+        ClientProfile,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+    )
+    token = models.CharField(max_length=20)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = 'Токен поиска клиентов'
+        verbose_name_plural = 'Индекс поиска клиентов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['token', 'client'], name='client_search_token_uniq'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.token} → {self.client_id}'
+
+
 class Account(models.Model):
     client = models.ForeignKey(
         ClientProfile,
@@ -67,6 +116,60 @@ class Account(models.Model):
         return f'{self.account_number} ({self.client.full_name})'
 
 
+def _related_account_cached(transaction) -> bool:
+    if not Transaction.related_transaction.is_cached(transaction):
+        return False
+    related = transaction.related_transaction
+    return related is None or Transaction.account.is_cached(related)
+
+
+def resolve_counterparties(transactions) -> None:
+    """
+    Находит счета контрагентов для списка операций пачкой: не более
+    одного запроса по номерам из metadata и одного — по связанным
+    операциям, которые не загружены через select_related. Результат
+    сохраняется в каждой операции и возвращается counterparty_account
+    без обращения к базе.
+    """
+    transactions = [
+        transaction
+        for transaction in transactions
+        if '_counterparty' not in transaction.__dict__
+    ]
+    related_ids = set()
+    numbers = set()
+    for transaction in transactions:
+        if transaction.related_transaction_id:
+            if not _related_account_cached(transaction):
+                related_ids.add(transaction.related_transaction_id)
+        elif transaction.counterparty_number:
+            numbers.add(transaction.counterparty_number)
+
+    related_accounts = {}
+    if related_ids:
+        related_accounts = {
+            related.id: related.account
+            for related in Transaction.objects.filter(
+                id__in=related_ids
+            ).select_related('account')
+        }
+    accounts = {}
+    if numbers:
+        accounts = {
+            account.account_number: account
+            for account in Account.objects.filter(account_number__in=numbers)
+        }
+
+    for transaction in transactions:
+        if transaction.related_transaction_id in related_ids:
+            account = related_accounts.get(transaction.related_transaction_id)
+        elif transaction.related_transaction_id:
+            account = transaction.related_transaction.account
+        else:
+            account = accounts.get(transaction.counterparty_number)
+        transaction._counterparty = account
+
+
 class Transaction(models.Model):
     class TransactionType(models.TextChoices):
         DEPOSIT = 'deposit', 'Пополнение'
@@ -124,11 +227,35 @@ class Transaction(models.Model):
         on_delete=models.SET_NULL,
         related_name='mirror_transactions',
     )
+    # Аренда операции воркером фонового проведения (см. settlement.py)
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = 'Транзакция'
         verbose_name_plural = 'Транзакции'
         ordering = ['-created_at']
+        # Списки операций сортируются по (created_at, id) и сужаются по
+        # счёту, статусу или типу: каждый такой запрос читает диапазон
+        # одного индекса (см. команду explain_transaction_queries).
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                name='transaction_time_idx',
+            ),
+            models.Index(
+                fields=['account', 'created_at', 'id'],
+                name='transaction_account_time_idx',
+            ),
+            models.Index(
+                fields=['status', 'created_at', 'id'],
+                name='transaction_status_time_idx',
+            ),
+            models.Index(
+                fields=['transaction_type', 'created_at', 'id'],
+                name='transaction_type_time_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.reference} — {self.get_transaction_type_display()}'
@@ -142,9 +269,7 @@ class Transaction(models.Model):
 
     @staticmethod
     def _generate_reference() -> str:
-        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-        random_suffix = get_random_string(4, allowed_chars='0123456789')
-        return f'TRX-{timestamp}-{random_suffix}'
+        return next_reference()
 
     @property
     def is_pending(self) -> bool:
@@ -158,12 +283,214 @@ class Transaction(models.Model):
     def is_cancelled(self) -> bool:
         return self.status == self.Status.CANCELLED
 
+    @property
+    def counterparty_number(self) -> str | None:
+        if self.metadata:
+            return self.metadata.get('counterparty_account_number') or None
+        return None
+
     @property
     def counterparty_account(self) -> Account | None:
+        if '_counterparty' in self.__dict__:
+            return self._counterparty
         if self.related_transaction_id:
             return self.related_transaction.account
-        if self.metadata and self.metadata.get('counterparty_account_number'):
+        if self.counterparty_number:
             return Account.objects.filter(
-                account_number=self.metadata['counterparty_account_number']
+                account_number=self.counterparty_number
             ).first()
         return None
+
+
+class IdempotencyKey(models.Model):
+    """
+    Ключ идемпотентности клиентской операции и сохранённый результат,
+    который возвращается при повторной отправке того же запроса.
+    """
+
+    key = models.CharField(max_length=100, unique=True)
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+    )
+    # Отпечаток параметров запроса (banking/idempotency.py): повтор
+    # ключа с другими параметрами отклоняется.
+    fingerprint = models.CharField(max_length=64, blank=True)
+    completed = models.BooleanField(default=False)
+    pending = models.BooleanField(default=True)
+    message = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self) -> str:
+        return self.key
+
+
+class LedgerEntry(models.Model):
+    """
+    Неизменяемая запись журнала: изменение баланса счёта со знаком и
+    баланс после него. Записи только добавляются — исправления делаются
+    новыми записями (например, при отмене операции).
+    """
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.PROTECT,
+        related_name='ledger_entries',
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='ledger_entries',
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Запись журнала'
+        verbose_name_plural = 'Журнал операций'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['account', 'created_at', 'id'],
+                name='ledger_account_time_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.account_id}: {self.amount:+.2f} → {self.balance_after}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Записи журнала нельзя изменять.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Записи журнала нельзя удалять.')
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Контрольная точка: баланс счёта после записи журнала last_entry
+    (или до первой записи, если last_entry пуст).
+    """
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='balance_checkpoints',
+    )
+    last_entry = models.ForeignKey(
+        LedgerEntry,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='+',
+    )
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Контрольная точка баланса'
+        verbose_name_plural = 'Контрольные точки балансов'
+        indexes = [
+            models.Index(
+                fields=['account', 'created_at'],
+                name='checkpoint_account_time_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.account_id}: {self.balance} ({self.created_at})'
+
+
+class DashboardCounter(models.Model):
+    """
+    Часть счётчика итогов админ-панели (сумма балансов, число счетов,
+    клиентов, операций по статусам). Значение счётчика — сумма его частей
+    (shard); см. banking/aggregates.py.
+    """
+
+    name = models.CharField(max_length=32)
+    shard = models.PositiveSmallIntegerField(default=0)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик итогов'
+        verbose_name_plural = 'Счётчики итогов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'shard'], name='dashboard_counter_shard_uniq'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name}[{self.shard}] = {self.value}'
+
+
+class MonthlyAccountRollup(models.Model):
+    """
+    Итог операций счёта за месяц по типу и статусу: число операций
+    и их сумма. month — первый день месяца создания операции в часовом
+    поясе TIME_ZONE; см. banking/rollups.py.
+    """
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='monthly_rollups',
+    )
+    month = models.DateField()
+    transaction_type = models.CharField(
+        max_length=20, choices=Transaction.TransactionType.choices
+    )
+    status = models.CharField(
+        max_length=20, choices=Transaction.Status.choices
+    )
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Итог счёта за месяц'
+        verbose_name_plural = 'Итоги счетов по месяцам'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account', 'month', 'transaction_type', 'status'],
+                name='monthly_rollup_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='monthly_rollup_month_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f'{self.account_id} {self.month:%Y-%m} {self.transaction_type}/'
+            f'{self.status}: {self.count}, {self.amount}'
+        )
+
+
+class TransactionEvent(models.Model):
+    """
+    Событие ленты операций для сотрудников. Таблица общая для всех
+    процессов: события воркеров run_settlement_worker видны потоку
+    веб-сервера; см. banking/events.py.
+    """
+
+    name = models.CharField(max_length=20)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Событие ленты операций'
+        verbose_name_plural = 'События ленты операций'
+
+    def __str__(self) -> str:
+        return f'{self.id}: {self.name}'
@@ -0,0 +1,220 @@
+"""
+Постраничный вывод по ключу (keyset) вместо OFFSET.
+
+Страница начинается сразу после строки (или заканчивается перед строкой),
+ключ сортировки которой записан в курсоре, поэтому на любой глубине
+запрос читает по индексу только per_page + 1 строк и не выполняет
+COUNT(*). Курсор — непрозрачная строка: base64 от JSON с направлением
+и значениями ключа. Последнее поле сортировки должно быть уникальным
+(обычно id), чтобы строки с одинаковым временем не терялись и не
+повторялись на соседних страницах.
+
+Общее число строк не нужно для навигации; при необходимости его
+передают в paginator (total) числом или функцией, например
+estimate_count().
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+# Предел подсчёта строк estimate_count() на СУБД кроме PostgreSQL.
+ESTIMATE_COUNT_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или выдан для другой сортировки."""
+
+
+@dataclass
+class CursorPage:
+    object_list: list
+    paginator: KeysetPaginator
+    has_next: bool
+    has_previous: bool
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+    cursor: str | None = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    @property
+    def total(self) -> int | None:
+        return self.paginator.total
+
+
+class KeysetPaginator:
+    """
+    Делит queryset на страницы по ключу ordering (по умолчанию —
+    от новых операций к старым по (created_at, id)).
+    """
+
+    def __init__(
+        self,
+        queryset,
+        per_page: int,
+        *,
+        ordering=("-created_at", "-id"),
+        total=None,
+    ):
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-")) for name in ordering
+        ]
+        self.queryset = queryset.order_by(*self.ordering)
+        self._total = total
+
+    @cached_property
+    def total(self) -> int | None:
+        """Общее число строк, если оно передано (вычисляется один раз)."""
+        if callable(self._total):
+            return self._total()
+        return self._total
+
+    def _key(self, obj) -> list:
+        values = []
+        for name, _ in self.fields:
+            value = getattr(obj, name)
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def encode_cursor(self, direction: str, obj) -> str:
+        payload = json.dumps(
+            [direction, *self._key(obj)], separators=(",", ":")
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, token: str) -> tuple[str, list]:
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            direction, *raw = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError, binascii.Error) as exc:
+            raise InvalidCursor(token) from exc
+        if (
+            direction not in (CURSOR_NEXT, CURSOR_PREVIOUS)
+            or len(raw) != len(self.fields)
+        ):
+            raise InvalidCursor(token)
+        model = self.queryset.model
+        try:
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, raw)
+            ]
+        except (FieldDoesNotExist, ValidationError) as exc:
+            raise InvalidCursor(token) from exc
+        return direction, values
+
+    def _beyond(self, values, *, backwards: bool) -> Q:
+        """
+        Строки после ключа values в порядке сортировки (или до него при
+        backwards): (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            lookup = "lt" if descending != backwards else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def page(self, cursor: str | None = None) -> CursorPage:
+        """Страница по курсору; InvalidCursor для негодного курсора."""
+        if not cursor:
+            return self._forward(self.queryset, cursor, has_previous=False)
+
+        direction, values = self.decode_cursor(cursor)
+        if direction == CURSOR_NEXT:
+            return self._forward(
+                self.queryset.filter(self._beyond(values, backwards=False)),
+                cursor,
+                has_previous=True,
+            )
+
+        reverse_ordering = [
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        ]
+        rows = list(
+            self.queryset.filter(self._beyond(values, backwards=True))
+            .order_by(*reverse_ordering)[: self.per_page + 1]
+        )
+        if not rows:
+            # Раньше курсора строк не осталось — это первая страница.
+            return self.page()
+        has_previous = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return self._make_page(
+            rows, cursor, has_next=True, has_previous=has_previous
+        )
+
+    def get_page(self, cursor: str | None = None) -> CursorPage:
+        """Как page(), но негодный курсор открывает первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    def _forward(self, queryset, cursor, *, has_previous: bool):
+        rows = list(queryset[: self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return self._make_page(
+            rows[: self.per_page],
+            cursor,
+            has_next=has_next,
+            has_previous=has_previous,
+        )
+
+    def _make_page(self, rows, cursor, *, has_next, has_previous):
+        page = CursorPage(
+            object_list=rows,
+            paginator=self,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            cursor=cursor,
+        )
+        if page.has_next:
+            page.next_cursor = self.encode_cursor(CURSOR_NEXT, rows[-1])
+        if page.has_previous:
+            page.previous_cursor = self.encode_cursor(
+                CURSOR_PREVIOUS, rows[0]
+            )
+        return page
+
+
+def estimate_count(queryset, limit: int = ESTIMATE_COUNT_LIMIT) -> int | None:
+    """
+    Приблизительное число строк: на PostgreSQL — оценка планировщика
+    (EXPLAIN без выполнения запроса). На остальных СУБД оценки нет:
+    COUNT считает не больше limit + 1 строк, и при большем числе
+    возвращается None (число неизвестно).
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor != "postgresql":
+        count = queryset.values("pk")[:limit + 1].count()
+        return count if count <= limit else None
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
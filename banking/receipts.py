@@ -0,0 +1,129 @@
+"""
+Кэш квитанций проведённых и отменённых операций.
+
+Квитанция завершённой или отменённой операции больше не меняется:
+баланс после операции берётся из журнала (LedgerEntry.balance_after),
+а не из текущего баланса счёта. Поэтому HTML реквизитов квитанции
+(шаблон RECEIPT_TEMPLATE) рисуется один раз и хранится в кэше
+BANKING_RECEIPT_CACHE под ключом (id и номер операции, статус): отмена
+завершённой операции меняет ключ, удалять записи не нужно. Номер
+в ключе защищает от чужой квитанции, если id будет выдан повторно
+(откат транзакции, восстановление базы из копии).
+
+Права на просмотр проверяются запросом статуса операции при каждом
+просмотре; в кэше лежит только общая для всех зрителей часть страницы
+(без пользователя и токена CSRF). Квитанции операций в обработке
+рисуются заново при каждом просмотре.
+"""
+from __future__ import annotations
+
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.http import quote_etag
+
+from .models import LedgerEntry, Transaction
+
+RECEIPT_TEMPLATE = "banking/receipt_details.html"
+# Меняйте при изменении шаблона квитанции: старые записи кэша и ETag
+# в браузерах перестанут совпадать.
+RECEIPT_TEMPLATE_VERSION = 1
+DEFAULT_CACHE_ALIAS = "default"
+FINAL_STATUSES = (
+    Transaction.Status.COMPLETED,
+    Transaction.Status.CANCELLED,
+)
+
+
+def receipt_cache():
+    return caches[
+        getattr(settings, "BANKING_RECEIPT_CACHE", DEFAULT_CACHE_ALIAS)
+    ]
+
+
+def receipt_key(pk: int, reference: str, status: str) -> str:
+    return (
+        f"banking:receipt:{RECEIPT_TEMPLATE_VERSION}:"
+        f"{pk}:{reference}:{status}"
+    )
+
+
+def is_final(status: str) -> bool:
+    return status in FINAL_STATUSES
+
+
+def receipt_etag(pk: int, reference: str, status: str, request) -> str:
+    """
+    ETag страницы квитанции. Кроме квитанции страница содержит имя
+    пользователя, кнопки по его роли и токен CSRF форм, поэтому в тег
+    входит отпечаток пользователя, is_staff и секрета CSRF: после
+    нового входа (секрет меняется) или смены роли страница отдаётся
+    целиком, а не ответом 304 со старыми формами.
+    """
+    # Секрет появится в request.META, даже если cookie ещё нет.
+    get_token(request)
+    user = request.user
+    viewer = hashlib.sha256(
+        "\0".join(
+            [
+                str(user.pk),
+                str(user.is_staff),
+                user.get_username(),
+                user.get_full_name(),
+                request.META["CSRF_COOKIE"],
+            ]
+        ).encode()
+    ).hexdigest()[:32]
+    return quote_etag(
+        f"receipt-{RECEIPT_TEMPLATE_VERSION}-{pk}-{reference}-{status}-"
+        f"{viewer}"
+    )
+
+
+def balance_after(transaction: Transaction) -> Decimal | None:
+    """
+    Баланс счёта после операции: последняя запись журнала по ней
+    (при отмене проведённой операции — после возврата). Для операции
+    в обработке — текущий баланс счёта.
+    """
+    if not is_final(transaction.status):
+        return transaction.account.balance
+    return (
+        LedgerEntry.objects.filter(
+            transaction_id=transaction.pk,
+            account_id=transaction.account_id,
+        )
+        .order_by("-id")
+        .values_list("balance_after", flat=True)
+        .first()
+    )
+
+
+def render_details(transaction: Transaction) -> str:
+    return render_to_string(
+        RECEIPT_TEMPLATE,
+        {
+            "transaction": transaction,
+            "balance_after": balance_after(transaction),
+        },
+    )
+
+
+def get_details(pk: int, reference: str, status: str, load) -> str:
+    """
+    HTML реквизитов завершённой или отменённой операции из кэша.
+    При промахе операция загружается вызовом load() и рисуется.
+    """
+    cache = receipt_cache()
+    key = receipt_key(pk, reference, status)
+    html = cache.get(key)
+    if html is None:
+        transaction = load()
+        html = render_details(transaction)
+        # Статус мог измениться после проверки: кладём под фактический.
+        cache.set(receipt_key(pk, reference, transaction.status), html)
+    return html
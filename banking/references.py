@@ -0,0 +1,264 @@
+"""
+Выдача номеров операций без обращений к базе.
+
+Формат: TRX-<ГГГГММДДччммсс>-<узел><pid>-<номер>, например
+TRX-20250101120000-4F000KX-1A. Метка времени — UTC-секунда выдачи,
+узел — два символа base36 из BANKING_REFERENCE_NODE_ID, pid — пять
+символов base36, номер — порядковый номер в пределах секунды
+(base36, до пяти символов). Длина не превышает 32 символов поля reference.
+
+Внутри процесса номер в пределах секунды уникален, а секунда метки
+не уменьшается, поэтому номера процесса не повторяются. Разные процессы
+одного узла различаются pid, а узлы — BANKING_REFERENCE_NODE_ID: при
+нескольких серверах или контейнерах его нужно задать каждому свой
+(0–1295, значение вне диапазона — ImproperlyConfigured). Без него узел
+вычисляется по имени хоста, что годится только для одного хоста:
+у разных хостов узлы могут совпасть, а pid в контейнерах часто
+одинаковы. Поэтому процесс пишет в лог предупреждение, а проверка
+manage.py check --deploy — banking.W001.
+
+Команды, которые заполняют базу операциями задним числом, передают
+момент операции (at): метка номера тогда совпадает с её created_at.
+Для секунд раньше запуска процесса номера считаются отдельно по каждой
+секунде; более поздние моменты получают обычную текущую метку.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NODE_WIDTH = 2
+PID_WIDTH = 5
+SEQUENCE_LIMIT = 36**5
+PREFIX = "TRX-"
+NODE_LIMIT = 36**NODE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+
+def to_base36(value: int, width: int = 0) -> str:
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(ALPHABET[remainder])
+    return "".join(reversed(digits)).rjust(width, "0") or "0"
+
+
+# Готовые строки для номеров: младшие три разряда base36 берутся из
+# таблицы, старшие (не более двух) — из неё же, без деления в цикле.
+_SMALL = [to_base36(value) for value in range(36**3)]
+_PADDED = [text.rjust(3, "0") for text in _SMALL]
+_SMALL_LIMIT = len(_SMALL)
+
+
+def _sequence_text(value: int) -> str:
+    if value < _SMALL_LIMIT:
+        return _SMALL[value]
+    high, low = divmod(value, _SMALL_LIMIT)
+    return _SMALL[high] + _PADDED[low]
+
+
+def _sequence_range(head: str, start: int, stop: int) -> list[str]:
+    """Номера start..stop-1 с общим началом, по срезам таблиц."""
+    references = []
+    while start < stop:
+        high, low = divmod(start, _SMALL_LIMIT)
+        size = min(stop - start, _SMALL_LIMIT - low)
+        if high:
+            prefix = head + _SMALL[high]
+            table = _PADDED
+        else:
+            prefix = head
+            table = _SMALL
+        references.extend([prefix + text for text in table[low:low + size]])
+        start += size
+    return references
+
+
+def configured_node_id() -> int | None:
+    """
+    BANKING_REFERENCE_NODE_ID или None, если он не задан;
+    ImproperlyConfigured, если это не целое число 0–1295.
+    """
+    configured = getattr(settings, "BANKING_REFERENCE_NODE_ID", None)
+    if configured is None:
+        return None
+    try:
+        node = int(configured)
+    except (TypeError, ValueError):
+        node = None
+    if node is None or not 0 <= node < NODE_LIMIT:
+        raise ImproperlyConfigured(
+            f"BANKING_REFERENCE_NODE_ID должен быть целым числом "
+            f"от 0 до {NODE_LIMIT - 1}, получено {configured!r}."
+        )
+    return node
+
+
+def node_id() -> int:
+    node = configured_node_id()
+    if node is not None:
+        return node
+    node = zlib.crc32(socket.gethostname().encode()) % NODE_LIMIT
+    logger.warning(
+        "BANKING_REFERENCE_NODE_ID не задан, узел %s вычислен по имени "
+        "хоста. При нескольких серверах или контейнерах номера операций "
+        "могут совпасть: задайте каждому свой узел.",
+        node,
+    )
+    return node
+
+
+class ReferenceAllocator:
+    """
+    Потокобезопасный генератор номеров одного процесса.
+
+    Состояние (секунда, начало номера, счётчик) заменяется целиком, а
+    номера берутся из itertools.count, выдача которого атомарна, поэтому
+    блокировка нужна только при смене секунды. Счётчик, который успели
+    прочитать до смены, продолжает выдавать уникальные номера со старой
+    меткой. Секунды раньше создания генератора обычная выдача не
+    использует, поэтому номера задним числом с ними не пересекаются.
+    """
+
+    def __init__(self, node: int | None = None, pid: int | None = None,
+                 clock=time.time):
+        node = node_id() if node is None else node
+        pid = os.getpid() if pid is None else pid
+        self._suffix = (
+            f"-{to_base36(node, NODE_WIDTH)}"
+            f"{to_base36(pid % 36**PID_WIDTH, PID_WIDTH)}-"
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = (0, "", itertools.count())
+        self._started = int(clock())
+        self._backdated = {}
+
+    def _head(self, second: int) -> str:
+        return (
+            PREFIX
+            + time.strftime("%Y%m%d%H%M%S", time.gmtime(second))
+            + self._suffix
+        )
+
+    def _past_second(self, at: datetime | None) -> int | None:
+        """Секунда момента at, если она раньше создания генератора."""
+        if at is None:
+            return None
+        second = int(at.timestamp())
+        return second if second < self._started else None
+
+    def _allocate_backdated(self, count: int, second: int) -> list[str]:
+        with self._lock:
+            start = self._backdated.get(second, 0)
+            stop = min(start + count, SEQUENCE_LIMIT)
+            self._backdated[second] = stop
+        references = _sequence_range(self._head(second), start, stop)
+        if stop - start < count:
+            # Номера секунды исчерпаны: остаток берётся из предыдущей.
+            references += self._allocate_backdated(
+                count - (stop - start), second - 1
+            )
+        return references
+
+    def _rollover(self, seen_second: int, second: int) -> None:
+        with self._lock:
+            if self._state[0] != seen_second:
+                return  # Секунду уже сменил другой поток.
+            # Метка не уменьшается даже при переводе часов назад, а при
+            # исчерпании номеров занимается следующая секунда.
+            second = max(second, seen_second + 1)
+            self._state = (second, self._head(second), itertools.count())
+
+    def next(self, at: datetime | None = None) -> str:
+        past = self._past_second(at)
+        if past is not None:
+            return self._allocate_backdated(1, past)[0]
+        while True:
+            second, head, counter = self._state
+            now = int(self._clock())
+            if now > second:
+                self._rollover(second, now)
+                continue
+            sequence = next(counter)
+            if sequence < SEQUENCE_LIMIT:
+                return head + _sequence_text(sequence)
+            self._rollover(second, now)
+
+    def allocate(
+        self, count: int, at: datetime | None = None
+    ) -> list[str]:
+        """Выдаёт count номеров за раз, например для bulk_create."""
+        past = self._past_second(at)
+        if past is not None:
+            return self._allocate_backdated(count, past)
+        references = []
+        while len(references) < count:
+            second, head, counter = self._state
+            now = int(self._clock())
+            if now > second:
+                self._rollover(second, now)
+                continue
+            sequences = list(
+                itertools.islice(counter, count - len(references))
+            )
+            first, last = sequences[0], sequences[-1]
+            if last - first == len(sequences) - 1 and last < SEQUENCE_LIMIT:
+                # Обычный случай: никто не брал номера параллельно.
+                references.extend(_sequence_range(head, first, last + 1))
+                continue
+            references.extend(
+                [
+                    head + _sequence_text(item)
+                    for item in sequences
+                    if item < SEQUENCE_LIMIT
+                ]
+            )
+            if last >= SEQUENCE_LIMIT:
+                self._rollover(second, now)
+        return references
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator() -> ReferenceAllocator:
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = ReferenceAllocator()
+    return _allocator
+
+
+def _reset_after_fork() -> None:
+    # У дочернего процесса другой pid и собственная последовательность.
+    global _allocator, _allocator_lock
+    _allocator = None
+    _allocator_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def next_reference(at: datetime | None = None) -> str:
+    return get_allocator().next(at)
+
+
+def allocate_references(
+    count: int, at: datetime | None = None
+) -> list[str]:
+    return get_allocator().allocate(count, at)
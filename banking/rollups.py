@@ -0,0 +1,271 @@
+"""
+Итоги операций счетов по месяцам без прохода по операциям.
+
+MonthlyAccountRollup хранит по каждому счёту, месяцу, типу и статусу
+операций их число и сумму. Месяц — первый день месяца создания операции
+в часовом поясе TIME_ZONE. Вопрос «сколько я пополнил в этом месяце»
+читает несколько строк итогов, сколько бы операций ни было у счёта.
+
+Итоги меняются в той же транзакции БД, что и операции, по тем же
+путям, что и счётчики админ-панели (banking/aggregates.py):
+- создание и удаление операций — сигналами (banking/signals.py);
+- проведение и отмена операций — по сигналу ledger_flushed леджера
+  services.py:
+  операция переходит из строки прежнего статуса в строку нового;
+- массовое создание операций (bulk_create) — явным вызовом
+  count_created().
+
+Изменения в обход этих путей исправляет rebuild() (команда
+rebuild_monthly_rollups); команды загрузки демонстрационных данных
+и переноса дат операций вызывают его сами.
+"""
+from __future__ import annotations
+
+import functools
+import operator
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import (
+    BigIntegerField,
+    Case,
+    Count,
+    DateField,
+    F,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import MonthlyAccountRollup, Transaction
+
+KEY_FIELDS = ("account_id", "month", "transaction_type", "status")
+# Ключей на запрос: у каждого ключа по 14 параметров в UPDATE.
+BATCH_SIZE = 200
+
+
+@dataclass(frozen=True)
+class MonthTotal:
+    transaction_type: str
+    label: str
+    count: int
+    amount: Decimal
+
+
+def month_of(moment) -> date:
+    """Первый день месяца момента moment в часовом поясе TIME_ZONE."""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def current_month() -> date:
+    return timezone.localdate().replace(day=1)
+
+
+def rollup_key(transaction: Transaction, status: str | None = None):
+    return (
+        transaction.account_id,
+        month_of(transaction.created_at),
+        transaction.transaction_type,
+        status or transaction.status,
+    )
+
+
+def _add(deltas: dict, key, count: int, amount) -> None:
+    total_count, total_amount = deltas.get(key, (0, Decimal("0.00")))
+    deltas[key] = (total_count + count, total_amount + amount)
+
+
+def apply(deltas: dict) -> None:
+    """
+    Прибавляет изменения {(счёт, месяц, тип, статус): (число, сумма)}
+    к строкам итогов. Вызывается внутри транзакции, меняющей операции.
+    Число запросов не зависит от числа счетов: на каждые BATCH_SIZE
+    ключей недостающие строки создаются одним INSERT ... ON CONFLICT DO
+    NOTHING (строку мог создать параллельный запрос), а приращения
+    прибавляются одним UPDATE с CASE по ключам.
+    """
+    keys = sorted(
+        key for key, (count, amount) in deltas.items() if count or amount
+    )
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        MonthlyAccountRollup.objects.bulk_create(
+            (
+                MonthlyAccountRollup(**dict(zip(KEY_FIELDS, key)))
+                for key in batch
+            ),
+            ignore_conflicts=True,
+        )
+        _increment(batch, deltas)
+
+
+def _increment(keys, deltas: dict) -> None:
+    conditions = [Q(**dict(zip(KEY_FIELDS, key))) for key in keys]
+    amount_field = MonthlyAccountRollup._meta.get_field("amount")
+    MonthlyAccountRollup.objects.filter(
+        functools.reduce(operator.or_, conditions)
+    ).update(
+        count=F("count")
+        + Case(
+            *(
+                When(condition, then=Value(deltas[key][0]))
+                for condition, key in zip(conditions, keys)
+            ),
+            default=Value(0),
+            output_field=BigIntegerField(),
+        ),
+        amount=F("amount")
+        + Case(
+            *(
+                When(condition, then=Value(deltas[key][1]))
+                for condition, key in zip(conditions, keys)
+            ),
+            default=Value(Decimal("0.00")),
+            output_field=amount_field,
+        ),
+    )
+
+
+def created_deltas(transactions, sign: int = 1) -> dict:
+    """Изменения итогов при создании (sign=-1 — удалении) операций."""
+    deltas = {}
+    for transaction in transactions:
+        _add(
+            deltas,
+            rollup_key(transaction),
+            sign,
+            sign * transaction.amount,
+        )
+    return deltas
+
+
+def count_created(transactions) -> None:
+    """Учитывает операции, созданные bulk_create (без сигналов)."""
+    apply(created_deltas(transactions))
+
+
+def settlement_deltas(watched) -> dict:
+    """
+    Изменения итогов по итогам леджера: watched — пары (операция,
+    прежний статус). Операция с новым статусом переходит из строки
+    прежнего статуса в строку нового.
+    """
+    deltas = {}
+    for transaction, previous in watched:
+        if transaction.status != previous:
+            amount = transaction.amount
+            _add(deltas, rollup_key(transaction, previous), -1, -amount)
+            _add(deltas, rollup_key(transaction), 1, amount)
+    return deltas
+
+
+def compute_rows(account_ids=None) -> dict:
+    """
+    Точные итоги {(счёт, месяц, тип, статус): (число, сумма)} полным
+    проходом по операциям (всем или счетов account_ids).
+    """
+    transactions = Transaction.objects.all()
+    if account_ids is not None:
+        transactions = transactions.filter(account_id__in=account_ids)
+    rows = (
+        transactions.annotate(
+            month=TruncMonth("created_at", output_field=DateField())
+        )
+        .values_list(*KEY_FIELDS)
+        .annotate(count=Count("id"), amount=Sum("amount"))
+        .order_by()
+    )
+    return {tuple(row[:4]): (row[4], row[5]) for row in rows}
+
+
+def stored_rows(account_ids=None) -> dict:
+    """Итоги из таблицы в том же виде, что и compute_rows()."""
+    rollups = MonthlyAccountRollup.objects.all()
+    if account_ids is not None:
+        rollups = rollups.filter(account_id__in=account_ids)
+    return {
+        tuple(row[:4]): (row[4], row[5])
+        for row in rollups.values_list(*KEY_FIELDS, "count", "amount")
+    }
+
+
+def rebuild(account_ids=None) -> int:
+    """
+    Пересчитывает итоги по операциям (всем или счетов account_ids)
+    и возвращает число строк. Строки итогов блокируются до подсчёта,
+    как в aggregates.rebuild(): проведения, уже изменившие итоги,
+    попадают в подсчёт, а новые ждут окончания пересчёта.
+    """
+    with db_transaction.atomic():
+        rollups = MonthlyAccountRollup.objects.all()
+        if account_ids is not None:
+            rollups = rollups.filter(account_id__in=account_ids)
+        list(rollups.select_for_update().values("id"))
+        rows = compute_rows(account_ids)
+        rollups.delete()
+        MonthlyAccountRollup.objects.bulk_create(
+            MonthlyAccountRollup(
+                **dict(zip(KEY_FIELDS, key)), count=count, amount=amount
+            )
+            for key, (count, amount) in rows.items()
+        )
+    return len(rows)
+
+
+def _month_totals(rows) -> list[MonthTotal]:
+    """Итоги по типам операций в порядке Transaction.TransactionType."""
+    by_type = {
+        transaction_type: (count, amount)
+        for transaction_type, count, amount in rows
+    }
+    return [
+        MonthTotal(transaction_type, label, *by_type[transaction_type])
+        for transaction_type, label in Transaction.TransactionType.choices
+        if transaction_type in by_type
+    ]
+
+
+def account_month_totals(account_ids, month: date | None = None) -> dict:
+    """
+    Проведённые операции счетов account_ids за месяц (по умолчанию
+    текущий) по типам: {id счёта: [MonthTotal, ...]}. Один запрос
+    по строкам итогов.
+    """
+    rows = {}
+    for account_id, transaction_type, count, amount in (
+        MonthlyAccountRollup.objects.filter(
+            account_id__in=account_ids,
+            month=month or current_month(),
+            status=Transaction.Status.COMPLETED,
+            count__gt=0,
+        ).values_list("account_id", "transaction_type", "count", "amount")
+    ):
+        rows.setdefault(account_id, []).append(
+            (transaction_type, count, amount)
+        )
+    return {
+        account_id: _month_totals(account_rows)
+        for account_id, account_rows in rows.items()
+    }
+
+
+def month_totals(month: date | None = None) -> list[MonthTotal]:
+    """
+    Проведённые операции всех счетов за месяц (по умолчанию текущий)
+    по типам для админ-панели: одна строка итогов на счёт и тип.
+    """
+    return _month_totals(
+        MonthlyAccountRollup.objects.filter(
+            month=month or current_month(),
+            status=Transaction.Status.COMPLETED,
+        )
+        .values_list("transaction_type")
+        .annotate(count=Sum("count"), amount=Sum("amount"))
+        .filter(count__gt=0)
+        .order_by()
+    )
@@ -0,0 +1,143 @@
+"""
+Поиск клиентов по индексу префиксов.
+
+Для каждого клиента в ClientSearchToken хранятся все префиксы слов его
+имени и логина и номеров его счетов (до MAX_TOKEN_LENGTH символов),
+приведённые к нижнему регистру (casefold, «ё» → «е»), а также его id.
+Поэтому поиск по началу слова или номера — это точное сравнение по
+B-tree индексу token на любой СУБД, без LIKE с ведущим «%» и без JOIN
+со счетами.
+
+Каждое слово запроса должно совпасть с префиксом; клиенты упорядочены
+по сумме весов совпадений: целое слово (или id) весит больше префикса.
+
+Индекс обновляется сигналами при сохранении клиента, его пользователя и
+счетов (banking/signals.py); полностью перестраивается командой
+rebuild_client_search.
+"""
+from __future__ import annotations
+
+import re
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, Sum
+
+from .models import Account, ClientProfile, ClientSearchToken
+
+MAX_TOKEN_LENGTH = 20
+MAX_QUERY_TERMS = 5
+WEIGHT_PREFIX = 1
+WEIGHT_WORD = 2
+WEIGHT_ID = 3
+INDEX_BATCH_SIZE = 500
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    return text.casefold().replace("ё", "е")
+
+
+def words(text: str | None) -> list[str]:
+    return _WORD_RE.findall(normalize(text or ""))
+
+
+def build_tokens(
+    client_id: int, full_name: str, username: str, account_numbers
+) -> dict[str, int]:
+    """Токены клиента и их веса."""
+    tokens = {}
+
+    def add(token: str, weight: int) -> None:
+        if tokens.get(token, 0) < weight:
+            tokens[token] = weight
+
+    for word in (
+        words(full_name)
+        + words(username)
+        + [number.strip() for number in account_numbers]
+    ):
+        word = word[:MAX_TOKEN_LENGTH]
+        for length in range(1, len(word)):
+            add(word[:length], WEIGHT_PREFIX)
+        if word:
+            add(word, WEIGHT_WORD)
+    add(str(client_id), WEIGHT_ID)
+    return tokens
+
+
+def index_clients(client_ids) -> int:
+    """Перестраивает токены клиентов client_ids. Возвращает их число."""
+    client_ids = list(client_ids)
+    if not client_ids:
+        return 0
+    numbers = {}
+    for client_id, number in Account.objects.filter(
+        client_id__in=client_ids
+    ).values_list("client_id", "account_number"):
+        numbers.setdefault(client_id, []).append(number)
+
+    rows = []
+    for client_id, full_name, username in ClientProfile.objects.filter(
+        id__in=client_ids
+    ).values_list("id", "full_name", "user__username"):
+        tokens = build_tokens(
+            client_id, full_name, username, numbers.get(client_id, [])
+        )
+        rows.extend(
+            ClientSearchToken(client_id=client_id, token=token, weight=weight)
+            for token, weight in tokens.items()
+        )
+
+    with db_transaction.atomic():
+        ClientSearchToken.objects.filter(client_id__in=client_ids).delete()
+        ClientSearchToken.objects.bulk_create(rows, batch_size=1000)
+    return len(client_ids)
+
+
+def index_client(client_id: int) -> None:
+    index_clients([client_id])
+
+
+def rebuild_index(batch_size: int = INDEX_BATCH_SIZE) -> int:
+    """Перестраивает индекс всех клиентов пачками."""
+    ClientSearchToken.objects.exclude(
+        client_id__in=ClientProfile.objects.values("id")
+    ).delete()
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            ClientProfile.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return indexed
+        indexed += index_clients(ids)
+        last_id = ids[-1]
+
+
+def search_terms(query: str) -> list[str]:
+    terms = dict.fromkeys(word[:MAX_TOKEN_LENGTH] for word in words(query))
+    return list(terms)[:MAX_QUERY_TERMS]
+
+
+def search_clients(queryset, query: str):
+    """
+    Клиенты из queryset, у которых каждое слово запроса совпадает
+    с префиксом имени, логина, номера счёта или с id, от лучших
+    совпадений к худшим (при равенстве — по id).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    return (
+        queryset.filter(search_tokens__token__in=terms)
+        .annotate(
+            search_matches=Count("search_tokens"),
+            search_rank=Sum("search_tokens__weight"),
+        )
+        .filter(search_matches=len(terms))
+        .order_by("-search_rank", "id")
+    )
@@ -1,25 +1,153 @@
 from __future__ import annotations
 
+import functools
 import time
 from dataclasses import dataclass
 from decimal import Decimal
 
+from django.conf import settings
 from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
 from django.utils import timezone
 
+from . import aggregates, events, idempotency, rollups, summaries
+from .ledger import append_entries
 from .models import Account, Transaction
+from .references import allocate_references
 from .utils import normalize_text
 
 PROCESSING_DELAY_SECONDS = 2
 
+SETTLEMENT_MODE_INLINE = "inline"
+SETTLEMENT_MODE_BACKGROUND = "background"
+
+ACCEPTED_MESSAGE = "Операция принята в обработку."
+
 
 @dataclass
 class TransactionResult:
     transaction: Transaction
     completed: bool
     message: str
+    pending: bool = False
+
+
+def settlement_mode() -> str:
+    """
+    Режим проведения операций: inline — в потоке запроса (по умолчанию),
+    background — воркерами команды run_settlement_worker.
+    """
+    return getattr(
+        settings, "BANKING_SETTLEMENT_MODE", SETTLEMENT_MODE_INLINE
+    )
+
+
+def _accepted(transaction: Transaction) -> TransactionResult:
+    return TransactionResult(
+        transaction=transaction,
+        completed=False,
+        message=ACCEPTED_MESSAGE,
+        pending=True,
+    )
+
+
+def replay_result(
+    key: str, request_fingerprint: str
+) -> TransactionResult | None:
+    """
+    Результат ранее выполненного запроса с тем же ключом: сначала из
+    кэша процесса, затем из таблицы ключей. Если ключ использован
+    запросом с другими параметрами, поднимает idempotency.KeyReused.
+    """
+    cached = idempotency.replay_cache.get(key)
+    if cached is not None:
+        stored_fingerprint, result = cached
+        idempotency.check_fingerprint(
+            key, stored_fingerprint, request_fingerprint
+        )
+        return result
+    record = idempotency.load(key)
+    if record is None:
+        return None
+    idempotency.check_fingerprint(
+        key, record.fingerprint, request_fingerprint
+    )
+    if not record.pending:
+        result = TransactionResult(
+            transaction=record.transaction,
+            completed=record.completed,
+            message=record.message,
+        )
+        idempotency.replay_cache.set(key, (record.fingerprint, result))
+        return result
+    transaction = record.transaction
+    if transaction.status == Transaction.Status.PENDING:
+        # Исходный запрос ещё выполняется в другом потоке или процессе
+        # либо операция ждёт воркера.
+        return _accepted(transaction)
+    # Операцию, принятую в обработку, уже провёл или отменил воркер.
+    if transaction.is_completed:
+        message = "Операция успешно выполнена."
+    else:
+        message = transaction.note or "Операция отменена."
+    result = TransactionResult(
+        transaction=transaction,
+        completed=transaction.is_completed,
+        message=message,
+    )
+    remember_result(key, result, record.fingerprint)
+    return result
+
+
+def remember_result(
+    key: str, result: TransactionResult, request_fingerprint: str
+) -> None:
+    """
+    Сохраняет результат в таблице ключей. В кэш процесса попадают только
+    итоговые результаты: «в обработке» может смениться итогом.
+    """
+    idempotency.store(
+        key,
+        completed=result.completed,
+        pending=result.pending,
+        message=result.message,
+    )
+    if not result.pending:
+        idempotency.replay_cache.set(key, (request_fingerprint, result))
+
+
+def _idempotent(func):
+    """
+    Повтор запроса с тем же idempotency_key возвращает исходный
+    TransactionResult, не создавая операцию и не трогая балансы.
+    Тот же ключ с другими параметрами поднимает idempotency.KeyReused.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*, idempotency_key: str | None = None, **kwargs):
+        if not idempotency_key:
+            return func(**kwargs)
+        request_fingerprint = idempotency.fingerprint(kwargs)
+        result = replay_result(idempotency_key, request_fingerprint)
+        if result is not None:
+            return result
+        try:
+            result = func(
+                idempotency_key=idempotency_key,
+                idempotency_fingerprint=request_fingerprint,
+                **kwargs,
+            )
+        except idempotency.DuplicateRequest:
+            # Параллельный запрос с тем же ключом успел создать операцию.
+            return replay_result(idempotency_key, request_fingerprint)
+        remember_result(idempotency_key, result, request_fingerprint)
+        return result
 
+    return wrapper
 
+
+@_idempotent
 def create_and_process_transaction(
     *,
     account: Account,
@@ -28,7 +156,41 @@ def create_and_process_transaction(
     note: str = "",
     performed_by=None,
     processed_by=None,
+    idempotency_key: str | None = None,
+    idempotency_fingerprint: str = "",
 ) -> TransactionResult:
+    opened = begin_transaction(
+        account=account,
+        transaction_type=transaction_type,
+        amount=amount,
+        note=note,
+        performed_by=performed_by,
+        processed_by=processed_by,
+        idempotency_key=idempotency_key,
+        idempotency_fingerprint=idempotency_fingerprint,
+    )
+    if isinstance(opened, TransactionResult):
+        return opened
+    time.sleep(PROCESSING_DELAY_SECONDS)
+    return complete_transaction(opened, processed_by=processed_by)
+
+
+def begin_transaction(
+    *,
+    account: Account,
+    transaction_type: str,
+    amount,
+    note: str = "",
+    performed_by=None,
+    processed_by=None,
+    idempotency_key: str | None = None,
+    idempotency_fingerprint: str = "",
+) -> Transaction | TransactionResult:
+    """
+    Первая фаза операции: создаёт её в статусе «В обработке». Возвращает
+    TransactionResult, если операция уже отклонена или передана воркерам,
+    иначе — операцию, которую после выдержки проводит complete_transaction.
+    """
     note = normalize_text(note)
 
     # Проверка лимита для операций снятия
@@ -47,6 +209,10 @@ def create_and_process_transaction(
                     note=note or limit_message,
                     performed_by=performed_by,
                 )
+                if idempotency_key:
+                    idempotency.reserve(
+                        idempotency_key, transaction, idempotency_fingerprint
+                    )
             transaction = cancel_transaction(
                 transaction.id,
                 cancelled_by=processed_by,
@@ -66,6 +232,10 @@ def create_and_process_transaction(
             note=note,
             performed_by=performed_by,
         )
+        if idempotency_key:
+            idempotency.reserve(
+                idempotency_key, transaction, idempotency_fingerprint
+            )
 
     if account.is_blocked or account.client.is_blocked:
         transaction = cancel_transaction(
@@ -79,7 +249,14 @@ def create_and_process_transaction(
             message="Счёт заблокирован.",
         )
 
-    time.sleep(PROCESSING_DELAY_SECONDS)
+    if settlement_mode() == SETTLEMENT_MODE_BACKGROUND:
+        return _accepted(transaction)
+    return transaction
+
+
+def complete_transaction(
+    transaction: Transaction, *, processed_by=None
+) -> TransactionResult:
     transaction = finalize_transaction(
         transaction.id, processed_by=processed_by
     )
@@ -97,6 +274,7 @@ def create_and_process_transaction(
     )
 
 
+@_idempotent
 def create_and_process_transfer(
     *,
     source_account: Account,
@@ -105,7 +283,40 @@ def create_and_process_transfer(
     note: str = "",
     performed_by=None,
     processed_by=None,
+    idempotency_key: str | None = None,
+    idempotency_fingerprint: str = "",
 ) -> TransactionResult:
+    opened = begin_transfer(
+        source_account=source_account,
+        target_account=target_account,
+        amount=amount,
+        note=note,
+        performed_by=performed_by,
+        processed_by=processed_by,
+        idempotency_key=idempotency_key,
+        idempotency_fingerprint=idempotency_fingerprint,
+    )
+    if isinstance(opened, TransactionResult):
+        return opened
+    time.sleep(PROCESSING_DELAY_SECONDS)
+    return complete_transfer(*opened, processed_by=processed_by)
+
+
+def begin_transfer(
+    *,
+    source_account: Account,
+    target_account: Account,
+    amount,
+    note: str = "",
+    performed_by=None,
+    processed_by=None,
+    idempotency_key: str | None = None,
+    idempotency_fingerprint: str = "",
+) -> tuple[Transaction, Transaction] | TransactionResult:
+    """
+    Первая фаза перевода: создаёт связанную пару операций. Возвращает
+    TransactionResult или пару (исходящая, входящая) для complete_transfer.
+    """
     normalized_note = normalize_text(note)
 
     # Проверка лимита для переводов
@@ -146,6 +357,10 @@ def create_and_process_transfer(
                 (outgoing, incoming),
                 fields=["related_transaction"],
             )
+            if idempotency_key:
+                idempotency.reserve(
+                    idempotency_key, outgoing, idempotency_fingerprint
+                )
         outgoing = cancel_transaction(
             outgoing.id, cancelled_by=processed_by, reason=limit_message
         )
@@ -186,6 +401,10 @@ def create_and_process_transfer(
             (outgoing, incoming),
             fields=["related_transaction"],
         )
+        if idempotency_key:
+            idempotency.reserve(
+                idempotency_key, outgoing, idempotency_fingerprint
+            )
 
     if (
         source_account.is_blocked
@@ -203,13 +422,21 @@ def create_and_process_transfer(
             transaction=outgoing, completed=False, message=message
         )
 
-    time.sleep(PROCESSING_DELAY_SECONDS)
+    if settlement_mode() == SETTLEMENT_MODE_BACKGROUND:
+        return _accepted(outgoing)
+    return outgoing, incoming
+
+
+def complete_transfer(
+    outgoing: Transaction, incoming: Transaction, *, processed_by=None
+) -> TransactionResult:
     outgoing, incoming = finalize_transfer(
         outgoing.id, incoming.id, processed_by=processed_by
     )
     if outgoing.is_completed and incoming.is_completed:
         message = (
-            f"Перевод выполнен. Получатель: {target_account.account_number}"
+            "Перевод выполнен. Получатель: "
+            f"{incoming.account.account_number}"
         )
         return TransactionResult(
             transaction=outgoing, completed=True, message=message
@@ -222,142 +449,795 @@ def create_and_process_transfer(
     )
 
 
+BULK_TRANSFER_MAX_ITEMS = 20000
+BULK_BATCH_SIZE = 1000
+CENT = Decimal("0.01")
+
+
+@dataclass
+class BulkTransferResult:
+    transactions: list
+    completed: bool
+    message: str
+    pending: bool = False
+
+    @property
+    def completed_count(self) -> int:
+        return sum(1 for item in self.transactions if item.is_completed)
+
+    @property
+    def cancelled_count(self) -> int:
+        return sum(1 for item in self.transactions if item.is_cancelled)
+
+
+def _chunks(items, size: int = BULK_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def payout_items(rows) -> list:
+    """
+    Превращает строки (номер счёта, сумма, комментарий) в items для
+    create_and_process_transfers_bulk. Суммы округляются до копеек;
+    NaN, бесконечность и неположительные суммы отклоняются. Счета
+    читаются одним запросом на каждые BULK_BATCH_SIZE номеров; ошибки
+    данных — ValueError с номером строки.
+    """
+    parsed = []
+    for line, row in enumerate(rows, start=1):
+        if len(row) < 2:
+            raise ValueError(f"Строка {line}: нужны номер счёта и сумма.")
+        account_number = str(row[0]).strip()
+        try:
+            amount = Decimal(str(row[1]).strip().replace(",", "."))
+            valid = amount.is_finite()
+            if valid:
+                amount = amount.quantize(CENT)
+        except ArithmeticError:
+            valid = False
+        if not valid:
+            raise ValueError(f"Строка {line}: некорректная сумма.")
+        if amount <= 0:
+            raise ValueError(
+                f"Строка {line}: сумма должна быть положительной."
+            )
+        note = str(row[2]).strip() if len(row) > 2 and row[2] else ""
+        parsed.append((line, account_number, amount, note))
+
+    accounts = {}
+    numbers = list({account_number for _, account_number, _, _ in parsed})
+    for chunk in _chunks(numbers):
+        accounts.update(
+            Account.objects.in_bulk(chunk, field_name="account_number")
+        )
+    items = []
+    for line, account_number, amount, note in parsed:
+        if account_number not in accounts:
+            raise ValueError(
+                f"Строка {line}: счёт {account_number} не найден."
+            )
+        items.append((accounts[account_number], amount, note))
+    return items
+
+
+def create_and_process_transfers_bulk(
+    source_account: Account,
+    items,
+    *,
+    performed_by=None,
+    processed_by=None,
+) -> BulkTransferResult:
+    """
+    Выплаты с одного счёта на многие: items — последовательность
+    (счёт получателя, сумма, комментарий).
+
+    Все пары операций вставляются двумя bulk_create. В режиме
+    проведения inline они проводятся одной транзакцией БД после
+    единственной выдержки: счета блокируются одним запросом в порядке
+    id, сумма выплат сверяется с балансом источника один раз, и выплата
+    проводится целиком или отменяется целиком. В режиме background
+    пары проводят воркеры run_settlement_worker по отдельности, поэтому
+    при нехватке средств часть выплат может быть отменена. Переводы
+    сверх лимита и на заблокированные счета создаются сразу отменёнными
+    и в сумму не входят.
+    """
+    items = list(items)
+    if not items:
+        raise ValueError("Список выплат пуст.")
+    if len(items) > BULK_TRANSFER_MAX_ITEMS:
+        raise ValueError(
+            f"Слишком много выплат: максимум {BULK_TRANSFER_MAX_ITEMS}."
+        )
+
+    source_account = Account.objects.select_related("client").get(
+        pk=source_account.pk
+    )
+    targets = {}
+    target_ids = list({target.pk for target, _, _ in items})
+    for chunk in _chunks(target_ids):
+        targets.update(
+            Account.objects.select_related("client").in_bulk(chunk)
+        )
+    if source_account.pk in targets:
+        raise ValueError("Счёт получателя совпадает со счётом списания.")
+
+    max_transfer = Decimal("100000")
+    limit_message = f"Превышен лимит перевода: максимум {max_transfer:,.2f} ₽"
+    source_blocked = (
+        source_account.is_blocked or source_account.client.is_blocked
+    )
+    now = timezone.now()
+    rows = []
+    total = Decimal("0")
+    for target, amount, note in items:
+        target = targets[target.pk]
+        amount = Decimal(amount)
+        if not amount.is_finite() or amount <= 0:
+            raise ValueError("Сумма выплаты должна быть положительной.")
+        if amount > max_transfer:
+            reason = limit_message
+        elif (
+            source_blocked
+            or target.is_blocked
+            or target.client.is_blocked
+        ):
+            reason = "Один из счетов заблокирован."
+        else:
+            reason = ""
+            total += amount
+        rows.append((target, amount, normalize_text(note), reason))
+
+    if total > source_account.balance:
+        return BulkTransferResult(
+            transactions=[],
+            completed=False,
+            message=(
+                f"Недостаточно средств для выплаты: требуется "
+                f"{total:,.2f} ₽, доступно {source_account.balance:,.2f} ₽"
+            ),
+        )
+
+    references = iter(allocate_references(len(rows) * 2))
+    outgoing_list = []
+    for target, amount, note, reason in rows:
+        status = (
+            Transaction.Status.CANCELLED
+            if reason
+            else Transaction.Status.PENDING
+        )
+        outgoing_list.append(
+            Transaction(
+                reference=next(references),
+                account=source_account,
+                transaction_type=Transaction.TransactionType.TRANSFER_OUT,
+                amount=amount,
+                status=status,
+                processed_at=now if reason else None,
+                note=(
+                    note
+                    or reason
+                    or f"Перевод на счёт {target.account_number}"
+                ),
+                performed_by=performed_by,
+                metadata={
+                    "counterparty_account_number": target.account_number
+                },
+            )
+        )
+
+    with db_transaction.atomic():
+        Transaction.objects.bulk_create(
+            outgoing_list, batch_size=BULK_BATCH_SIZE
+        )
+        # Входящие части ссылаются на уже созданные исходящие, поэтому
+        # обновлять ссылку нужно только у исходящих.
+        incoming_list = [
+            Transaction(
+                reference=next(references),
+                account=target,
+                transaction_type=Transaction.TransactionType.TRANSFER_IN,
+                amount=amount,
+                status=outgoing.status,
+                processed_at=outgoing.processed_at,
+                note=(
+                    note
+                    or reason
+                    or f"Перевод от счёта {source_account.account_number}"
+                ),
+                performed_by=performed_by,
+                related_transaction=outgoing,
+                metadata={
+                    "counterparty_account_number": (
+                        source_account.account_number
+                    )
+                },
+            )
+            for outgoing, (target, amount, note, reason) in zip(
+                outgoing_list, rows
+            )
+        ]
+        Transaction.objects.bulk_create(
+            incoming_list, batch_size=BULK_BATCH_SIZE
+        )
+        aggregates.count_created(outgoing_list + incoming_list)
+        rollups.count_created(outgoing_list + incoming_list)
+        events.publish_transactions(
+            outgoing_list + incoming_list, events.TRANSACTION_CREATED
+        )
+        summaries.invalidate_transactions(outgoing_list + incoming_list)
+        for outgoing, incoming in zip(outgoing_list, incoming_list):
+            outgoing.related_transaction = incoming
+        Transaction.objects.bulk_update(
+            outgoing_list,
+            fields=["related_transaction"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    pairs = [
+        (outgoing, incoming)
+        for outgoing, incoming in zip(outgoing_list, incoming_list)
+        if outgoing.is_pending
+    ]
+    if not pairs:
+        return BulkTransferResult(
+            transactions=outgoing_list,
+            completed=False,
+            message="Ни одна выплата не может быть проведена.",
+        )
+
+    if settlement_mode() == SETTLEMENT_MODE_BACKGROUND:
+        return BulkTransferResult(
+            transactions=outgoing_list,
+            completed=False,
+            message=ACCEPTED_MESSAGE,
+            pending=True,
+        )
+
+    time.sleep(PROCESSING_DELAY_SECONDS)
+    settled, funded = _settle_bulk_transfers(
+        source_account.pk, pairs, processed_by=processed_by
+    )
+    if not funded:
+        message = "Недостаточно средств для выплаты."
+    elif settled == len(outgoing_list):
+        message = f"Выплаты проведены: {settled}."
+    else:
+        message = f"Проведено выплат: {settled} из {len(outgoing_list)}."
+    return BulkTransferResult(
+        transactions=outgoing_list,
+        completed=settled == len(outgoing_list),
+        message=message,
+    )
+
+
+def _settle_bulk_transfers(
+    source_id: int, pairs, *, processed_by=None
+) -> tuple[int, bool]:
+    """
+    Проводит пары выплат одной транзакцией БД. Возвращает число
+    проведённых и признак того, что средств хватило. Сначала блокируются
+    все затронутые счета в порядке id, затем сами операции; сумма
+    сверяется с балансом источника один раз.
+    """
+    ledger = RowLockLedger()
+    account_ids = sorted(
+        {source_id} | {incoming.account_id for _, incoming in pairs}
+    )
+    with db_transaction.atomic():
+        accounts = {}
+        for chunk in _chunks(account_ids):
+            accounts.update(
+                (account.id, account)
+                for account in Account.objects.select_for_update()
+                .select_related("client")
+                .filter(id__in=chunk)
+                .order_by("id")
+            )
+        by_id = {}
+        transaction_ids = [
+            transaction.id for pair in pairs for transaction in pair
+        ]
+        for chunk in _chunks(transaction_ids):
+            by_id.update(
+                Transaction.objects.select_for_update()
+                .filter(id__in=chunk)
+                .only("id", "status")
+                .in_bulk()
+            )
+        pairs = [
+            (outgoing, incoming)
+            for outgoing, incoming in pairs
+            if by_id[outgoing.id].is_pending
+            and by_id[incoming.id].is_pending
+        ]
+
+        source = accounts[source_id]
+        total = sum(outgoing.amount for outgoing, _ in pairs)
+        funded = total <= source.balance
+        now = timezone.now()
+        for outgoing, incoming in pairs:
+            ledger.watch(outgoing, incoming)
+            outgoing.account = source
+            incoming.account = accounts[incoming.account_id]
+            if funded:
+                _settle_transfer(outgoing, incoming, ledger)
+            else:
+                msg = "Недостаточно средств для выплаты."
+                for transaction in (outgoing, incoming):
+                    transaction.status = Transaction.Status.CANCELLED
+                    transaction.note = transaction.note or msg
+            for transaction in (outgoing, incoming):
+                transaction.processed_at = now
+                transaction.processed_by = processed_by
+
+        ledger.flush()
+        Transaction.objects.bulk_update(
+            [transaction for pair in pairs for transaction in pair],
+            fields=SETTLEMENT_UPDATE_FIELDS,
+            batch_size=BULK_BATCH_SIZE,
+        )
+    settled = sum(1 for outgoing, _ in pairs if outgoing.is_completed)
+    return settled, funded
+
+
+CREDIT_TYPES = (
+    Transaction.TransactionType.DEPOSIT,
+    Transaction.TransactionType.TRANSFER_IN,
+)
+DEBIT_TYPES = (
+    Transaction.TransactionType.WITHDRAWAL,
+    Transaction.TransactionType.TRANSFER_OUT,
+)
+SETTLEMENT_UPDATE_FIELDS = ["status", "processed_at", "processed_by", "note"]
+CANCEL_UPDATE_FIELDS = ["status", "processed_at", "cancelled_by", "note"]
+
+LEDGER_MODE_LOCKING = "locking"
+LEDGER_MODE_CONDITIONAL = "conditional"
+
+
+def ledger_mode() -> str:
+    """
+    Способ изменения балансов: locking — счета блокируются
+    SELECT ... FOR UPDATE и баланс пересчитывается в Python (по умолчанию),
+    conditional — каждое изменение выполняется одним условным UPDATE.
+    """
+    return getattr(settings, "BANKING_LEDGER_MODE", LEDGER_MODE_LOCKING)
+
+
+# Отправляется из RowLockLedger.flush() в транзакции проведения после
+# записи балансов и журнала. entries — список (счёт, сумма, операция),
+# watched — пары (операция, статус до проведения) для операций,
+# отмеченных watch(). Подписчики — в banking/signals.py.
+ledger_flushed = Signal()
+
+
+class RowLockLedger:
+    """
+    Изменяет балансы счетов, уже заблокированных SELECT ... FOR UPDATE,
+    в памяти; flush() записывает изменённые счета одним bulk_update,
+    изменения — в журнал (ledger.append_entries) и отправляет сигнал
+    ledger_flushed.
+    """
+
+    lock_accounts = True
+
+    def __init__(self):
+        self.changed = {}
+        self.entries = []
+        self.watched = {}
+
+    def watch(self, *transactions: Transaction) -> None:
+        """Запоминает статусы операций до проведения или отмены."""
+        for transaction in transactions:
+            self.watched.setdefault(
+                transaction.id, (transaction, transaction.status)
+            )
+
+    def _record(self, account: Account, amount, transaction) -> None:
+        self.changed[account.id] = account
+        self.entries.append((account, amount, transaction))
+
+    def credit(self, account: Account, amount, *, transaction=None) -> None:
+        account.balance += amount
+        self._record(account, amount, transaction)
+
+    def debit(
+        self,
+        account: Account,
+        amount,
+        *,
+        allow_overdraft: bool = False,
+        transaction=None,
+    ) -> bool:
+        if not allow_overdraft and amount > account.balance:
+            return False
+        account.balance -= amount
+        self._record(account, -amount, transaction)
+        return True
+
+    def transfer(
+        self,
+        source: Account,
+        target: Account,
+        amount,
+        *,
+        outgoing=None,
+        incoming=None,
+    ) -> bool:
+        if not self.debit(source, amount, transaction=outgoing):
+            return False
+        self.credit(target, amount, transaction=incoming)
+        return True
+
+    def flush(self) -> None:
+        if self.changed:
+            Account.objects.bulk_update(
+                self.changed.values(), fields=["balance"]
+            )
+        self._flush_entries()
+
+    def _flush_entries(self) -> None:
+        append_entries(self.entries)
+        ledger_flushed.send(
+            sender=type(self),
+            entries=self.entries,
+            watched=list(self.watched.values()),
+        )
+        self.changed = {}
+        self.entries = []
+        self.watched = {}
+
+
+class ConditionalLedger(RowLockLedger):
+    """
+    Изменяет баланс одним UPDATE ... SET balance = balance ± x, а списание
+    выполняет только при условии balance >= x: решение о нехватке средств
+    принимает база по числу обновлённых строк. Счета заранее не
+    блокируются, и блокировка строки счёта держится только с момента
+    UPDATE до фиксации транзакции.
+    """
+
+    lock_accounts = False
+
+    def _update(
+        self, account: Account, delta, *, require_funds: bool, transaction
+    ):
+        queryset = Account.objects.filter(id=account.id)
+        if require_funds:
+            queryset = queryset.filter(balance__gte=-delta)
+        if not queryset.update(balance=F("balance") + delta):
+            return False
+        self._record(account, delta, transaction)
+        return True
+
+    def credit(self, account: Account, amount, *, transaction=None) -> None:
+        self._update(
+            account, amount, require_funds=False, transaction=transaction
+        )
+
+    def debit(
+        self,
+        account: Account,
+        amount,
+        *,
+        allow_overdraft: bool = False,
+        transaction=None,
+    ) -> bool:
+        return self._update(
+            account,
+            -amount,
+            require_funds=not allow_overdraft,
+            transaction=transaction,
+        )
+
+    def transfer(
+        self,
+        source: Account,
+        target: Account,
+        amount,
+        *,
+        outgoing=None,
+        incoming=None,
+    ) -> bool:
+        # Счета обновляются в порядке id, как и в finalize_transfer,
+        # чтобы встречные переводы не блокировали друг друга.
+        if source.id < target.id:
+            return super().transfer(
+                source, target, amount, outgoing=outgoing, incoming=incoming
+            )
+        self.credit(target, amount, transaction=incoming)
+        if self.debit(source, amount, transaction=outgoing):
+            return True
+        # Компенсация внутри той же транзакции БД: в журнал не попадают
+        # ни зачисление, ни его отмена.
+        self.debit(target, amount, allow_overdraft=True)
+        del self.entries[-2:]
+        return False
+
+    def flush(self) -> None:
+        # Значения в памяти устарели: подтягиваем итоговые балансы,
+        # чтобы вызывающий код показывал актуальные суммы, а журнал
+        # получил верные балансы после каждой записи.
+        for account in self.changed.values():
+            account.refresh_from_db(fields=["balance"])
+        self._flush_entries()
+
+
+def get_ledger() -> RowLockLedger:
+    if ledger_mode() == LEDGER_MODE_CONDITIONAL:
+        return ConditionalLedger()
+    return RowLockLedger()
+
+
+def _locked_transactions(ledger: RowLockLedger, *related):
+    """Блокирует операции и, в режиме locking, их счета."""
+    lock_of = ["self"]
+    if ledger.lock_accounts:
+        lock_of.extend(related)
+    return Transaction.objects.select_for_update(of=tuple(lock_of))
+
+
+def _settle(transaction: Transaction, ledger: RowLockLedger) -> None:
+    ledger.watch(transaction)
+    account = transaction.account
+    if account.is_blocked or account.client.is_blocked:
+        transaction.status = Transaction.Status.CANCELLED
+        transaction.note = transaction.note or "Счёт заблокирован."
+        return
+
+    if transaction.transaction_type in CREDIT_TYPES:
+        ledger.credit(account, transaction.amount, transaction=transaction)
+    elif transaction.transaction_type in DEBIT_TYPES:
+        if not ledger.debit(
+            account, transaction.amount, transaction=transaction
+        ):
+            transaction.status = Transaction.Status.CANCELLED
+            transaction.note = transaction.note or "Недостаточно средств."
+            return
+    else:
+        transaction.status = Transaction.Status.CANCELLED
+        transaction.note = transaction.note or "Неизвестный тип операции."
+        return
+
+    transaction.status = Transaction.Status.COMPLETED
+
+
+def _settle_transfer(
+    outgoing: Transaction, incoming: Transaction, ledger: RowLockLedger
+) -> None:
+    ledger.watch(outgoing, incoming)
+    if (
+        outgoing.account.is_blocked
+        or outgoing.account.client.is_blocked
+        or incoming.account.is_blocked
+        or incoming.account.client.is_blocked
+    ):
+        outgoing.status = Transaction.Status.CANCELLED
+        incoming.status = Transaction.Status.CANCELLED
+        outgoing.note = outgoing.note or "Счёт отправителя заблокирован."
+        incoming.note = incoming.note or "Счёт получателя заблокирован."
+        return
+
+    if not ledger.transfer(
+        outgoing.account,
+        incoming.account,
+        outgoing.amount,
+        outgoing=outgoing,
+        incoming=incoming,
+    ):
+        outgoing.status = Transaction.Status.CANCELLED
+        incoming.status = Transaction.Status.CANCELLED
+        msg = "Недостаточно средств для перевода."
+        outgoing.note = outgoing.note or msg
+        incoming.note = incoming.note or msg
+        return
+
+    outgoing.status = Transaction.Status.COMPLETED
+    incoming.status = Transaction.Status.COMPLETED
+
+
+def _reverse(transaction: Transaction, ledger: RowLockLedger) -> None:
+    """Возвращает на счёт сумму проведённой операции."""
+    if not transaction.is_completed:
+        return
+    if transaction.transaction_type in CREDIT_TYPES:
+        ledger.debit(
+            transaction.account,
+            transaction.amount,
+            allow_overdraft=True,
+            transaction=transaction,
+        )
+    elif transaction.transaction_type in DEBIT_TYPES:
+        ledger.credit(
+            transaction.account, transaction.amount, transaction=transaction
+        )
+
+
 def finalize_transaction(
     transaction_id: int, *, processed_by=None
 ) -> Transaction:
+    ledger = get_ledger()
     with db_transaction.atomic():
         transaction = (
-            Transaction.objects.select_for_update()
+            _locked_transactions(ledger, "account")
             .select_related("account", "account__client")
             .get(id=transaction_id)
         )
         if not transaction.is_pending:
             return transaction
 
-        account = transaction.account
-        if account.is_blocked or account.client.is_blocked:
-            transaction.status = Transaction.Status.CANCELLED
-            transaction.note = transaction.note or "Счёт заблокирован."
-        else:
-            if transaction.transaction_type in (
-                Transaction.TransactionType.DEPOSIT,
-                Transaction.TransactionType.TRANSFER_IN,
-            ):
-                account.balance += transaction.amount
-            elif transaction.transaction_type in (
-                Transaction.TransactionType.WITHDRAWAL,
-                Transaction.TransactionType.TRANSFER_OUT,
-            ):
-                if transaction.amount > account.balance:
-                    transaction.status = Transaction.Status.CANCELLED
-                    transaction.note = (
-                        transaction.note or "Недостаточно средств."
-                    )
-                else:
-                    account.balance -= transaction.amount
-            else:
-                transaction.status = Transaction.Status.CANCELLED
-                transaction.note = (
-                    transaction.note or "Неизвестный тип операции."
-                )
-
-            if transaction.status != Transaction.Status.CANCELLED:
-                account.save(update_fields=["balance"])
-                transaction.status = Transaction.Status.COMPLETED
+        _settle(transaction, ledger)
+        ledger.flush()
 
         transaction.processed_at = timezone.now()
         transaction.processed_by = processed_by
-        transaction.save(
-            update_fields=["status", "processed_at", "processed_by", "note"]
-        )
+        transaction.save(update_fields=SETTLEMENT_UPDATE_FIELDS)
         return transaction
 
 
 def finalize_transfer(
     outgoing_id: int, incoming_id: int, *, processed_by=None
 ) -> tuple[Transaction, Transaction]:
+    ledger = get_ledger()
     with db_transaction.atomic():
-        outgoing = (
-            Transaction.objects.select_for_update()
+        # Обе операции и оба счёта блокируются одним запросом в порядке
+        # id счёта: встречные переводы A→B и B→A берут блокировки
+        # в одинаковом порядке и не попадают во взаимную блокировку.
+        locked = {
+            transaction.id: transaction
+            for transaction in _locked_transactions(ledger, "account")
             .select_related("account", "account__client")
-            .get(id=outgoing_id)
-        )
-        incoming = (
-            Transaction.objects.select_for_update()
-            .select_related("account", "account__client")
-            .get(id=incoming_id)
-        )
+            .filter(id__in=(outgoing_id, incoming_id))
+            .order_by("account_id", "id")
+        }
+        if outgoing_id not in locked or incoming_id not in locked:
+            raise Transaction.DoesNotExist(
+                "Transaction matching query does not exist."
+            )
+        outgoing = locked[outgoing_id]
+        incoming = locked[incoming_id]
 
         if not outgoing.is_pending and not incoming.is_pending:
             return outgoing, incoming
 
-        now = timezone.now()
-        if (
-            outgoing.account.is_blocked
-            or outgoing.account.client.is_blocked
-            or incoming.account.is_blocked
-            or incoming.account.client.is_blocked
-        ):
-            outgoing.status = Transaction.Status.CANCELLED
-            incoming.status = Transaction.Status.CANCELLED
-            outgoing.note = outgoing.note or "Счёт отправителя заблокирован."
-            incoming.note = incoming.note or "Счёт получателя заблокирован."
-        elif outgoing.amount > outgoing.account.balance:
-            outgoing.status = Transaction.Status.CANCELLED
-            incoming.status = Transaction.Status.CANCELLED
-            msg = "Недостаточно средств для перевода."
-            outgoing.note = outgoing.note or msg
-            incoming.note = incoming.note or msg
-        else:
-            outgoing.account.balance -= outgoing.amount
-            incoming.account.balance += incoming.amount
-            outgoing.account.save(update_fields=["balance"])
-            incoming.account.save(update_fields=["balance"])
-            outgoing.status = Transaction.Status.COMPLETED
-            incoming.status = Transaction.Status.COMPLETED
+        _settle_transfer(outgoing, incoming, ledger)
+        ledger.flush()
 
+        now = timezone.now()
         outgoing.processed_at = now
         incoming.processed_at = now
         outgoing.processed_by = processed_by
         incoming.processed_by = processed_by
-        outgoing.save(
-            update_fields=["status", "processed_at", "processed_by", "note"]
-        )
-        incoming.save(
-            update_fields=["status", "processed_at", "processed_by", "note"]
-        )
+        outgoing.save(update_fields=SETTLEMENT_UPDATE_FIELDS)
+        incoming.save(update_fields=SETTLEMENT_UPDATE_FIELDS)
         return outgoing, incoming
 
 
+def finalize_pending_batch(
+    transaction_ids, *, processed_by=None
+) -> list[Transaction]:
+    """
+    Проводит пачку операций в одной транзакции БД.
+
+    Все операции (и вторые части переводов) блокируются одним запросом
+    в порядке id счёта, как и в finalize_transfer, балансы считаются
+    в памяти в порядке создания операций, а затем записываются одним
+    bulk_update по счетам и одним — по операциям. Итог каждой операции
+    совпадает с finalize_transaction и finalize_transfer. Пачка всегда
+    проводится с блокировкой счетов, независимо от BANKING_LEDGER_MODE.
+    """
+    transaction_ids = list(dict.fromkeys(transaction_ids))
+    if not transaction_ids:
+        return []
+
+    ledger = RowLockLedger()
+    with db_transaction.atomic():
+        locked = list(
+            Transaction.objects.select_for_update(of=("self", "account"))
+            .select_related("account", "account__client")
+            .filter(
+                Q(id__in=transaction_ids)
+                | Q(related_transaction_id__in=transaction_ids)
+            )
+            .order_by("account_id", "id")
+        )
+        locked.sort(key=lambda item: (item.created_at, item.id))
+        by_id = {transaction.id: transaction for transaction in locked}
+
+        # Один экземпляр Account на счёт, чтобы операции одного счёта
+        # видели баланс друг друга.
+        accounts = {}
+        for transaction in locked:
+            transaction.account = accounts.setdefault(
+                transaction.account_id, transaction.account
+            )
+
+        now = timezone.now()
+        settled = []
+        seen = set()
+        for transaction in locked:
+            if transaction.id in seen:
+                continue
+            mirror = by_id.get(transaction.related_transaction_id)
+            if mirror is not None and transaction.transaction_type in (
+                Transaction.TransactionType.TRANSFER_OUT,
+                Transaction.TransactionType.TRANSFER_IN,
+            ):
+                seen.update((transaction.id, mirror.id))
+                if (
+                    transaction.transaction_type
+                    == Transaction.TransactionType.TRANSFER_OUT
+                ):
+                    outgoing, incoming = transaction, mirror
+                else:
+                    outgoing, incoming = mirror, transaction
+                if not outgoing.is_pending and not incoming.is_pending:
+                    continue
+                _settle_transfer(outgoing, incoming, ledger)
+                settled.extend((outgoing, incoming))
+                continue
+
+            seen.add(transaction.id)
+            if not transaction.is_pending:
+                continue
+            _settle(transaction, ledger)
+            settled.append(transaction)
+
+        for transaction in settled:
+            transaction.processed_at = now
+            transaction.processed_by = processed_by
+
+        ledger.flush()
+        if settled:
+            Transaction.objects.bulk_update(
+                settled, fields=SETTLEMENT_UPDATE_FIELDS
+            )
+
+    return [
+        by_id[transaction_id]
+        for transaction_id in transaction_ids
+        if transaction_id in by_id
+    ]
+
+
 def cancel_transaction(
     transaction_id: int, *, cancelled_by=None, reason: str = ""
 ) -> Transaction:
+    ledger = get_ledger()
     with db_transaction.atomic():
-        transaction = (
-            Transaction.objects.select_for_update()
-            .select_related(
-                "account",
-                "related_transaction",
-                "related_transaction__account",
-            )
-            .get(id=transaction_id)
+        # Связь с зеркальной операцией неизменна, поэтому её можно
+        # прочитать без блокировки, а затем заблокировать обе операции
+        # одним запросом в том же порядке, что и finalize_transfer.
+        related_id = (
+            Transaction.objects.filter(id=transaction_id)
+            .values_list("related_transaction_id", flat=True)
+            .get()
         )
+        locked = {
+            transaction.id: transaction
+            for transaction in _locked_transactions(ledger, "account")
+            .select_related("account")
+            .filter(id__in=(transaction_id, related_id or transaction_id))
+            .order_by("account_id", "id")
+        }
+        transaction = locked[transaction_id]
+        mirror = locked.get(related_id)
+        if mirror is not None:
+            transaction.related_transaction = mirror
         if transaction.is_cancelled:
             return transaction
 
-        account = transaction.account
-        if transaction.is_completed:
-            if transaction.transaction_type in (
-                Transaction.TransactionType.DEPOSIT,
-                Transaction.TransactionType.TRANSFER_IN,
-            ):
-                account.balance -= transaction.amount
-            elif transaction.transaction_type in (
-                Transaction.TransactionType.WITHDRAWAL,
-                Transaction.TransactionType.TRANSFER_OUT,
-            ):
-                account.balance += transaction.amount
-            account.save(update_fields=["balance"])
+        if mirror is not None and mirror.is_cancelled:
+            mirror = None
+        # Балансы меняются в порядке id счетов, как в finalize_transfer
+        # и ConditionalLedger.transfer: отмена перевода и встречный
+        # перевод между теми же счетами не ждут друг друга по кругу.
+        for item in sorted(
+            filter(None, (transaction, mirror)),
+            key=lambda item: (item.account_id, item.id),
+        ):
+            ledger.watch(item)
+            _reverse(item, ledger)
 
         transaction.status = Transaction.Status.CANCELLED
         transaction.processed_at = timezone.now()
@@ -369,26 +1249,8 @@ def cancel_transaction(
         transaction.note = normalize_text(
             " ".join(part for part in note_parts if part).strip()
         )
-        transaction.save(
-            update_fields=["status", "processed_at", "cancelled_by", "note"]
-        )
-
-        mirror = transaction.related_transaction
-        if mirror and not mirror.is_cancelled:
-            mirror_account = mirror.account
-            if mirror.is_completed:
-                if mirror.transaction_type in (
-                    Transaction.TransactionType.DEPOSIT,
-                    Transaction.TransactionType.TRANSFER_IN,
-                ):
-                    mirror_account.balance -= mirror.amount
-                elif mirror.transaction_type in (
-                    Transaction.TransactionType.WITHDRAWAL,
-                    Transaction.TransactionType.TRANSFER_OUT,
-                ):
-                    mirror_account.balance += mirror.amount
-                mirror_account.save(update_fields=["balance"])
 
+        if mirror is not None:
             mirror.status = Transaction.Status.CANCELLED
             mirror.processed_at = timezone.now()
             mirror.cancelled_by = cancelled_by
@@ -401,14 +1263,11 @@ def cancel_transaction(
             mirror.note = normalize_text(
                 " ".join(part for part in mirror_note_parts if part).strip()
             )
-            mirror.save(
-                update_fields=[
-                    "status",
-                    "processed_at",
-                    "cancelled_by",
-                    "note",
-                ]
-            )
+
+        ledger.flush()
+        transaction.save(update_fields=CANCEL_UPDATE_FIELDS)
+        if mirror is not None:
+            mirror.save(update_fields=CANCEL_UPDATE_FIELDS)
         return transaction
 
 
@@ -0,0 +1,210 @@
+"""
+Фоновое проведение операций.
+
+В режиме BANKING_SETTLEMENT_MODE = "background" представления только
+создают операции в статусе «В обработке», а проводят их воркеры команды
+run_settlement_worker. Воркер арендует (claim) пачку операций, помечая
+их своим идентификатором и временем, и проводит её целиком через
+finalize_pending_batch (при ошибке — по одной операции через
+finalize_transaction/finalize_transfer).
+
+Если воркер упал, не завершив операцию, аренда остаётся в базе:
+перезапущенный воркер с тем же идентификатором сразу возвращает свои
+операции в очередь, а аренды остальных истекают через
+BANKING_SETTLEMENT_LEASE_SECONDS. Повторное проведение безопасно —
+finalize_* ничего не делают с уже проведёнными операциями.
+"""
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Transaction
+from .services import (
+    PROCESSING_DELAY_SECONDS,
+    finalize_pending_batch,
+    finalize_transaction,
+    finalize_transfer,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def lease_seconds() -> int:
+    return getattr(
+        settings, "BANKING_SETTLEMENT_LEASE_SECONDS", DEFAULT_LEASE_SECONDS
+    )
+
+
+def make_worker_id(index: int = 0) -> str:
+    """
+    Идентификатор воркера стабилен между перезапусками на одном хосте,
+    чтобы новый процесс мог забрать аренды упавшего предшественника.
+    """
+    return f"{socket.gethostname()}:{index}"[:64]
+
+
+def _claimable_filter(now) -> Q:
+    stale_before = now - timedelta(seconds=lease_seconds())
+    return Q(status=Transaction.Status.PENDING) & (
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale_before)
+    )
+
+
+def claimable_transactions(now=None):
+    """
+    Операции, готовые к проведению. Входящие части переводов проводятся
+    вместе с исходящими, поэтому отдельно не арендуются. Выдержка
+    PROCESSING_DELAY_SECONDS сохраняется как минимальный возраст операции.
+    """
+    now = now or timezone.now()
+    ready_before = now - timedelta(seconds=PROCESSING_DELAY_SECONDS)
+    return (
+        Transaction.objects.filter(_claimable_filter(now))
+        .filter(created_at__lte=ready_before)
+        .exclude(transaction_type=Transaction.TransactionType.TRANSFER_IN)
+    )
+
+
+def claim_batch(worker_id: str, *, limit: int = DEFAULT_BATCH_SIZE) -> list:
+    now = timezone.now()
+    with db_transaction.atomic():
+        candidate_ids = list(
+            claimable_transactions(now)
+            .select_for_update(skip_locked=True)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not candidate_ids:
+            return []
+        # Повторная проверка условия в UPDATE защищает от двойной аренды
+        # на базах без SELECT ... FOR UPDATE (SQLite).
+        Transaction.objects.filter(id__in=candidate_ids).filter(
+            _claimable_filter(now)
+        ).update(claimed_by=worker_id, claimed_at=now)
+    return list(
+        Transaction.objects.filter(
+            id__in=candidate_ids, claimed_by=worker_id, claimed_at=now
+        )
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)
+    )
+
+
+def release_claims(worker_id: str, *, ids=None) -> int:
+    """Возвращает в очередь непроведённые операции воркера."""
+    queryset = Transaction.objects.filter(
+        claimed_by=worker_id, status=Transaction.Status.PENDING
+    )
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    return queryset.update(claimed_by="", claimed_at=None)
+
+
+def release_stale_claims(now=None) -> int:
+    """Снимает просроченные аренды воркеров, которые больше не работают."""
+    now = now or timezone.now()
+    stale_before = now - timedelta(seconds=lease_seconds())
+    return Transaction.objects.filter(
+        status=Transaction.Status.PENDING, claimed_at__lt=stale_before
+    ).update(claimed_by="", claimed_at=None)
+
+
+def settle_transaction(transaction_id: int) -> Transaction:
+    transaction = Transaction.objects.only(
+        "id", "transaction_type", "related_transaction_id"
+    ).get(id=transaction_id)
+    if (
+        transaction.transaction_type
+        == Transaction.TransactionType.TRANSFER_OUT
+        and transaction.related_transaction_id
+    ):
+        outgoing, _ = finalize_transfer(
+            transaction.id, transaction.related_transaction_id
+        )
+        return outgoing
+    return finalize_transaction(transaction.id)
+
+
+class SettlementWorker:
+    def __init__(
+        self,
+        worker_id: str,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        stop_event=None,
+    ):
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stop_event = stop_event or threading.Event()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def recover(self) -> int:
+        released = release_claims(self.worker_id)
+        if released:
+            logger.warning(
+                "Воркер %s вернул в очередь %s незавершённых операций",
+                self.worker_id,
+                released,
+            )
+        return released
+
+    def run_once(self) -> int:
+        claimed = claim_batch(self.worker_id, limit=self.batch_size)
+        if not claimed:
+            return 0
+        if self.stop_event.is_set():
+            release_claims(self.worker_id, ids=claimed)
+            return 0
+        try:
+            finalize_pending_batch(claimed)
+            return len(claimed)
+        except Exception:
+            logger.exception(
+                "Пачка из %s операций не проведена, провожу по одной",
+                len(claimed),
+            )
+        return self._settle_one_by_one(claimed)
+
+    def _settle_one_by_one(self, claimed: list) -> int:
+        processed = 0
+        for index, transaction_id in enumerate(claimed):
+            if self.stop_event.is_set():
+                release_claims(self.worker_id, ids=claimed[index:])
+                break
+            try:
+                settle_transaction(transaction_id)
+            except Exception:
+                # Аренда остаётся за воркером и истечёт сама, чтобы
+                # проблемная операция не проводилась в цикле.
+                logger.exception(
+                    "Не удалось провести операцию %s", transaction_id
+                )
+                continue
+            processed += 1
+        return processed
+
+    def run(self) -> None:
+        self.recover()
+        while not self.stop_event.is_set():
+            close_old_connections()
+            processed = self.run_once()
+            if not processed:
+                self.stop_event.wait(self.poll_interval)
+        close_old_connections()
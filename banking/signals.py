@@ -0,0 +1,207 @@
+"""
+Поддержка производных данных — счётчиков итогов (banking/aggregates.py),
+итогов счетов по месяцам (banking/rollups.py), ленты событий
+(banking/events.py), индекса поиска клиентов (banking/search.py), версий
+карточек (banking/cards.py) и сводок кабинета (banking/summaries.py) —
+по сигналам сохранения и удаления моделей и по сигналу ledger_flushed
+(проведение и отмена операций леджером services.py).
+Подключается в BankingConfig.ready().
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import aggregates, cards, events, rollups, search, summaries
+from .models import Account, ClientProfile, Transaction
+from .services import ledger_flushed
+
+CLIENT_SEARCH_FIELDS = {"full_name", "user", "user_id"}
+ACCOUNT_SEARCH_FIELDS = {"account_number", "client", "client_id"}
+CLIENT_CARD_FIELDS = CLIENT_SEARCH_FIELDS | {"is_blocked"}
+ACCOUNT_CARD_FIELDS = ACCOUNT_SEARCH_FIELDS | {"balance", "is_blocked"}
+
+
+def _touches(update_fields, fields) -> bool:
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_save, sender=ClientProfile)
+def client_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        aggregates.apply({aggregates.CLIENTS: 1})
+
+
+@receiver(post_delete, sender=ClientProfile)
+def client_deleted(sender, instance, **kwargs):
+    aggregates.apply({aggregates.CLIENTS: -1})
+
+
+@receiver(post_save, sender=Account)
+def account_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        aggregates.apply(
+            {aggregates.ACCOUNTS: 1, aggregates.BALANCE: instance.balance}
+        )
+
+
+@receiver(post_delete, sender=Account)
+def account_deleted(sender, instance, **kwargs):
+    aggregates.apply(
+        {aggregates.ACCOUNTS: -1, aggregates.BALANCE: -instance.balance}
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        aggregates.apply({aggregates.status_counter(instance.status): 1})
+        rollups.count_created([instance])
+        events.publish_transactions([instance], events.TRANSACTION_CREATED)
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    aggregates.apply({aggregates.status_counter(instance.status): -1})
+    rollups.apply(rollups.created_deltas([instance], sign=-1))
+
+
+@receiver(post_save, sender=ClientProfile)
+def index_client_profile(
+    sender, instance, update_fields=None, raw=False, **kwargs
+):
+    if not raw and _touches(update_fields, CLIENT_SEARCH_FIELDS):
+        search.index_client(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user_client(
+    sender, instance, update_fields=None, raw=False, **kwargs
+):
+    # Вход в систему сохраняет только last_login — логин не меняется.
+    if raw or not _touches(update_fields, {"username"}):
+        return
+    client_id = (
+        ClientProfile.objects.filter(user=instance)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if client_id is not None:
+        search.index_client(client_id)
+
+
+@receiver(post_save, sender=Account)
+def index_account_client(
+    sender, instance, update_fields=None, raw=False, **kwargs
+):
+    if not raw and _touches(update_fields, ACCOUNT_SEARCH_FIELDS):
+        search.index_client(instance.client_id)
+
+
+@receiver(post_delete, sender=Account)
+def unindex_account(sender, instance, origin=None, **kwargs):
+    # При удалении клиента его счета и токены удаляются каскадом.
+    if getattr(origin, "model", type(origin)) is Account:
+        search.index_client(instance.client_id)
+
+
+@receiver(post_save, sender=ClientProfile)
+def bump_client_card(
+    sender, instance, created, update_fields=None, raw=False, **kwargs
+):
+    # У нового клиента версия уже новая.
+    if not raw and not created and _touches(update_fields, CLIENT_CARD_FIELDS):
+        cards.bump([instance.pk])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def bump_user_client_card(
+    sender, instance, update_fields=None, raw=False, **kwargs
+):
+    if not raw and _touches(update_fields, {"username"}):
+        cards.bump(
+            ClientProfile.objects.filter(user=instance).values_list(
+                "id", flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Account)
+def bump_account_client_card(
+    sender, instance, update_fields=None, raw=False, **kwargs
+):
+    if not raw and _touches(update_fields, ACCOUNT_CARD_FIELDS):
+        cards.bump([instance.client_id])
+
+
+@receiver(post_delete, sender=Account)
+def bump_deleted_account_client_card(
+    sender, instance, origin=None, **kwargs
+):
+    if getattr(origin, "model", type(origin)) is Account:
+        cards.bump([instance.client_id])
+
+
+@receiver(post_save, sender=Transaction)
+def invalidate_transaction_summary(sender, instance, raw=False, **kwargs):
+    if not raw:
+        summaries.invalidate_transactions([instance])
+
+
+@receiver(post_delete, sender=Transaction)
+def invalidate_deleted_transaction_summary(
+    sender, instance, origin=None, **kwargs
+):
+    # При каскадном удалении счёта или клиента сводку удаляет сигнал
+    # удаления счёта, без запроса владельца на каждую операцию.
+    if getattr(origin, "model", type(origin)) is Transaction:
+        summaries.invalidate_transactions([instance])
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def invalidate_account_summary(sender, instance, raw=False, **kwargs):
+    if not raw:
+        summaries.invalidate([instance.client_id])
+
+
+@receiver(post_save, sender=ClientProfile)
+def invalidate_client_summary(
+    sender, instance, created, raw=False, **kwargs
+):
+    if not raw and not created:
+        summaries.invalidate([instance.pk])
+
+
+@receiver(ledger_flushed)
+def apply_settlement_counters(sender, entries, watched, **kwargs):
+    aggregates.apply(aggregates.settlement_deltas(entries, watched))
+
+
+@receiver(ledger_flushed)
+def apply_settlement_rollups(sender, watched, **kwargs):
+    rollups.apply(rollups.settlement_deltas(watched))
+
+
+@receiver(ledger_flushed)
+def publish_settled_transactions(sender, watched, **kwargs):
+    events.publish_transactions(
+        (
+            transaction
+            for transaction, status in watched
+            if transaction.status != status
+        ),
+        events.TRANSACTION_UPDATED,
+    )
+
+
+@receiver(ledger_flushed)
+def bump_settled_client_cards(sender, entries, **kwargs):
+    cards.bump(account.client_id for account, _, _ in entries)
+
+
+@receiver(ledger_flushed)
+def invalidate_settled_summaries(sender, entries, watched, **kwargs):
+    summaries.invalidate(account.client_id for account, _, _ in entries)
+    summaries.invalidate_transactions(
+        transaction for transaction, _ in watched
+    )
@@ -0,0 +1,222 @@
+"""
+Кэш сводки кабинета клиента.
+
+Сводка клиента — профиль и все его счета; по каждому счёту баланс,
+число операций, последние SUMMARY_TRANSACTIONS операций (со счетами
+контрагентов) и проведённые за текущий месяц операции по типам
+(из итогов banking/rollups.py) — хранится в кэше BANKING_SUMMARY_CACHE
+под ключом с ClientProfile.summary_version. Кабинет запоминает id
+клиента в сессии, поэтому обычный просмотр — чтение версии по
+первичному ключу и одно чтение из кэша; при промахе сводка строится
+постоянным числом запросов к базе, сколько бы счетов ни было у клиента
+(build_summary), и кладётся в кэш (load_summary).
+
+Версия меняется (invalidate) при каждом изменении, которое видно
+в сводке:
+- создание и изменение операций, счетов и клиентов — сигналами
+  (banking/signals.py);
+- проведение и отмена операций — по сигналу ledger_flushed леджера
+  services.py (балансы меняются через bulk_update, без сигналов
+  сохранения);
+- массовое создание операций — create_and_process_transfers_bulk.
+Версия хранится в базе, поэтому изменение, сделанное в другом процессе
+(например, воркером run_settlement_worker), сразу видно и процессу
+с локальным кэшем; старые версии вытесняются по
+BANKING_SUMMARY_TIMEOUT.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from . import rollups
+from .models import (
+    Account,
+    ClientProfile,
+    Transaction,
+    new_cache_version,
+    resolve_counterparties,
+)
+from .pagination import CURSOR_NEXT, KeysetPaginator
+
+SUMMARY_TRANSACTIONS = 10
+HISTORY_PAGE_SIZE = 20
+DEFAULT_CACHE_ALIAS = "default"
+DEFAULT_TIMEOUT = 300
+
+
+@dataclass
+class AccountSummary:
+    account: Account
+    transaction_count: int
+    transactions: list[Transaction]
+    # Курсор продолжения истории после последних операций сводки.
+    next_cursor: str | None = None
+    month_totals: list[rollups.MonthTotal] = field(default_factory=list)
+
+
+@dataclass
+class ClientSummary:
+    user_id: int
+    client: ClientProfile
+    accounts: list[AccountSummary]
+    month: date | None = None
+
+    def for_account(self, account_id) -> AccountSummary | None:
+        for item in self.accounts:
+            if item.account.id == account_id:
+                return item
+        return None
+
+
+def summary_cache():
+    return caches[
+        getattr(settings, "BANKING_SUMMARY_CACHE", DEFAULT_CACHE_ALIAS)
+    ]
+
+
+def summary_key(client_id: int, version: int) -> str:
+    return f"banking:client-summary:{client_id}:{version}"
+
+
+def recent_transactions(account_ids, limit: int = SUMMARY_TRANSACTIONS):
+    """
+    Последние limit операций каждого из счетов account_ids одним
+    запросом: ROW_NUMBER() по окну счёта в порядке (created_at, id).
+    """
+    return (
+        Transaction.objects.filter(account_id__in=account_ids)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F("account_id")],
+                order_by=[F("created_at").desc(), F("id").desc()],
+            )
+        )
+        .filter(position__lte=limit)
+        .select_related(
+            "performed_by",
+            "related_transaction",
+            "related_transaction__account",
+        )
+        .order_by("-created_at", "-id")
+    )
+
+
+def history_paginator(account: Account, per_page: int = HISTORY_PAGE_SIZE):
+    """
+    История счёта страницами по ключу (created_at, id) от новых к старым:
+    индекс (account, created_at, id), без COUNT(*). Счета контрагентов
+    страницы загружает resolve_counterparties().
+    """
+    transactions = account.transactions.select_related(
+        "performed_by",
+        "related_transaction",
+        "related_transaction__account",
+    )
+    return KeysetPaginator(transactions, per_page)
+
+
+def build_summary(client: ClientProfile) -> ClientSummary:
+    """Сводка клиента из базы."""
+    accounts = list(client.accounts.order_by("id"))
+    month = rollups.current_month()
+    by_account = {
+        account.id: AccountSummary(
+            account=account, transaction_count=0, transactions=[]
+        )
+        for account in accounts
+    }
+    if by_account:
+        counts = (
+            Transaction.objects.filter(account_id__in=by_account)
+            .order_by()
+            .values_list("account_id")
+            .annotate(total=Count("id"))
+        )
+        for account_id, total in counts:
+            by_account[account_id].transaction_count = total
+        recent = list(recent_transactions(by_account))
+        resolve_counterparties(recent)
+        for transaction in recent:
+            item = by_account[transaction.account_id]
+            transaction.account = item.account
+            item.transactions.append(transaction)
+        for item in by_account.values():
+            if item.transaction_count > len(item.transactions):
+                item.next_cursor = history_paginator(
+                    item.account
+                ).encode_cursor(CURSOR_NEXT, item.transactions[-1])
+        totals = rollups.account_month_totals(by_account, month)
+        for account_id, month_totals in totals.items():
+            by_account[account_id].month_totals = month_totals
+    return ClientSummary(
+        user_id=client.user_id,
+        client=client,
+        accounts=list(by_account.values()),
+        month=month,
+    )
+
+
+def get_summary(client_id: int) -> ClientSummary | None:
+    """Сводка клиента из кэша по текущей версии из базы."""
+    version = (
+        ClientProfile.objects.filter(pk=client_id)
+        .values_list("summary_version", flat=True)
+        .first()
+    )
+    if version is None:
+        return None
+    return summary_cache().get(summary_key(client_id, version))
+
+
+def load_summary(client: ClientProfile) -> ClientSummary:
+    """Строит сводку из базы и кладёт её в кэш."""
+    summary = build_summary(client)
+    summary_cache().set(
+        summary_key(client.pk, client.summary_version),
+        summary,
+        getattr(settings, "BANKING_SUMMARY_TIMEOUT", DEFAULT_TIMEOUT),
+    )
+    return summary
+
+
+def invalidate(client_ids) -> None:
+    """
+    Меняет версию сводок клиентов client_ids после фиксации текущей
+    транзакции БД, как cards.bump().
+    """
+    client_ids = set(client_ids)
+    if client_ids:
+        db_transaction.on_commit(
+            lambda: ClientProfile.objects.filter(id__in=client_ids).update(
+                summary_version=new_cache_version()
+            )
+        )
+
+
+def invalidate_transactions(transactions) -> None:
+    """
+    Меняет версию сводок владельцев счетов операций. Клиенты берутся из уже
+    загруженных счетов, остальные счета запрашиваются одним запросом.
+    """
+    client_ids = set()
+    account_ids = set()
+    for transaction in transactions:
+        if Transaction.account.is_cached(transaction):
+            client_ids.add(transaction.account.client_id)
+        else:
+            account_ids.add(transaction.account_id)
+    if account_ids:
+        client_ids.update(
+            Account.objects.filter(id__in=account_ids).values_list(
+                "client_id", flat=True
+            )
+        )
+    invalidate(client_ids)
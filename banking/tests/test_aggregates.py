@@ -0,0 +1,297 @@
+"""
+Тесты счётчиков итогов админ-панели (banking.aggregates).
+
+Проверяют, что создание, проведение и отмена операций поддерживают
+счётчики в согласии с таблицами, и что админ-панель читает итоги
+из счётчиков.
+"""
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from banking import aggregates
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import (
+    cancel_transaction,
+    create_and_process_transaction,
+    create_and_process_transfer,
+    create_and_process_transfers_bulk,
+    finalize_pending_batch,
+)
+
+
+User = get_user_model()
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class DashboardCountersTests(TestCase):
+    """Тесты поддержания счётчиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.profile = ClientProfile.objects.create(
+            user=User.objects.create(username='client'),
+            full_name='Иван Клиент',
+        )
+        cls.target_profile = ClientProfile.objects.create(
+            user=User.objects.create(username='target'),
+            full_name='Получатель',
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.target_account = Account.objects.create(
+            client=cls.target_profile,
+            account_number='40817810000000000002',
+            balance=Decimal('500.00'),
+        )
+
+    def assertCountersMatchTables(self):
+        self.assertEqual(
+            aggregates.stored_values(), aggregates.compute_totals()
+        )
+
+    def _deposit(self, amount):
+        return create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal(amount),
+        )
+
+    def test_created_objects_are_counted(self, mock_sleep):
+        """Проверка учёта созданных клиентов и счетов."""
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.clients, 2)
+        self.assertEqual(totals.accounts, 2)
+        self.assertEqual(totals.balance, Decimal('1500.00'))
+        self.assertEqual(totals.transactions, 0)
+        self.assertCountersMatchTables()
+
+    def test_settlement_updates_balance_and_statuses(self, mock_sleep):
+        """Проверка проведения пополнения и перевода."""
+        self._deposit('200.00')
+        create_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target_account,
+            amount=Decimal('300.00'),
+        )
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.balance, Decimal('1700.00'))
+        self.assertEqual(
+            totals.transactions_by_status,
+            {
+                Transaction.Status.PENDING: 0,
+                Transaction.Status.COMPLETED: 3,
+                Transaction.Status.CANCELLED: 0,
+            },
+        )
+        self.assertCountersMatchTables()
+
+    def test_rejected_operations_are_counted_as_cancelled(self, mock_sleep):
+        """Проверка отклонённого снятия и перевода без средств."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.WITHDRAWAL,
+            amount=Decimal('5000.00'),
+        )
+        create_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target_account,
+            amount=Decimal('5000.00'),
+        )
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.balance, Decimal('1500.00'))
+        self.assertEqual(
+            totals.transactions_by_status[Transaction.Status.CANCELLED], 3
+        )
+        self.assertCountersMatchTables()
+
+    def test_cancellation_reverses_completed_transfer(self, mock_sleep):
+        """Проверка отмены проведённого перевода."""
+        result = create_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target_account,
+            amount=Decimal('300.00'),
+        )
+        cancel_transaction(result.transaction.id, reason='Ошибка')
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.balance, Decimal('1500.00'))
+        self.assertEqual(
+            totals.transactions_by_status[Transaction.Status.CANCELLED], 2
+        )
+        self.assertCountersMatchTables()
+
+    @override_settings(BANKING_LEDGER_MODE='conditional')
+    def test_conditional_ledger_compensation(self, mock_sleep):
+        """Проверка перевода без средств в режиме conditional."""
+        create_and_process_transfer(
+            source_account=self.target_account,
+            target_account=self.account,
+            amount=Decimal('700.00'),
+        )
+        self._deposit('100.00')
+        self.assertEqual(
+            aggregates.read_totals().balance, Decimal('1600.00')
+        )
+        self.assertCountersMatchTables()
+
+    def test_pending_batch(self, mock_sleep):
+        """Проверка пачки фонового проведения."""
+        ids = [
+            Transaction.objects.create(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.WITHDRAWAL,
+                amount=Decimal('600.00'),
+            ).id
+            for _ in range(2)
+        ]
+        self.assertEqual(
+            aggregates.read_totals().transactions_by_status[
+                Transaction.Status.PENDING
+            ],
+            2,
+        )
+        finalize_pending_batch(ids)
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.balance, Decimal('900.00'))
+        self.assertEqual(
+            totals.transactions_by_status[Transaction.Status.PENDING], 0
+        )
+        self.assertCountersMatchTables()
+
+    def test_bulk_payout(self, mock_sleep):
+        """Проверка массовой выплаты, созданной через bulk_create."""
+        create_and_process_transfers_bulk(
+            self.account,
+            [
+                (self.target_account, Decimal('100.00'), ''),
+                (self.target_account, Decimal('200000.00'), ''),
+            ],
+        )
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.balance, Decimal('1500.00'))
+        self.assertEqual(
+            totals.transactions_by_status,
+            {
+                Transaction.Status.PENDING: 0,
+                Transaction.Status.COMPLETED: 2,
+                Transaction.Status.CANCELLED: 2,
+            },
+        )
+        self.assertCountersMatchTables()
+
+    def test_deleted_objects_are_uncounted(self, mock_sleep):
+        """Проверка учёта удаления операций и клиентов."""
+        Transaction.objects.create(
+            account=self.target_account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('10.00'),
+        )
+        Transaction.objects.all().delete()
+        self.target_profile.delete()
+        totals = aggregates.read_totals()
+        self.assertEqual(totals.clients, 1)
+        self.assertEqual(totals.accounts, 1)
+        self.assertEqual(totals.balance, Decimal('1000.00'))
+        self.assertCountersMatchTables()
+
+    @override_settings(BANKING_AGGREGATE_SHARDS=3)
+    def test_rebuild_command_fixes_drift(self, mock_sleep):
+        """Проверка команды rebuild_dashboard_counters."""
+        Account.objects.filter(pk=self.account.pk).update(
+            balance=Decimal('1.00')
+        )
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_dashboard_counters',
+                '--check',
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+        call_command('rebuild_dashboard_counters', stdout=StringIO())
+        self.assertEqual(
+            aggregates.read_totals().balance, Decimal('501.00')
+        )
+        self.assertEqual(
+            set(
+                aggregates.DashboardCounter.objects.values_list(
+                    'shard', flat=True
+                )
+            ),
+            {0, 1, 2},
+        )
+        out = StringIO()
+        call_command('rebuild_dashboard_counters', '--check', stdout=out)
+        self.assertIn('сходятся', out.getvalue())
+
+
+class AdminDashboardTotalsTests(TestCase):
+    """Тесты итогов админ-панели."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.admin = User.objects.create_user(
+            username='admin',
+            password='testpass123',
+            is_staff=True,
+        )
+        for index in range(3):
+            profile = ClientProfile.objects.create(
+                user=User.objects.create(username=f'client{index}'),
+                full_name=f'Клиент {index}',
+            )
+            account = Account.objects.create(
+                client=profile,
+                account_number=f'4081781000000000000{index}',
+                balance=Decimal('100.00'),
+            )
+            Transaction.objects.create(
+                account=account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('10.00'),
+                status=Transaction.Status.COMPLETED,
+            )
+
+    def setUp(self):
+        self.client.login(username='admin', password='testpass123')
+
+    def test_totals_come_from_counters(self):
+        """Проверка итогов без загрузки списка счетов."""
+        response = self.client.get(reverse('banking:admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('accounts', response.context)
+        self.assertEqual(response.context['total_balance'], Decimal('300'))
+        self.assertEqual(response.context['total_accounts_count'], 3)
+        self.assertEqual(response.context['total_clients_count'], 3)
+        self.assertEqual(response.context['total_transactions_count'], 3)
+        self.assertEqual(
+            response.context['transaction_status_counts'][
+                Transaction.Status.COMPLETED
+            ],
+            3,
+        )
+
+    def test_filtered_transaction_count(self):
+        """Проверка числа операций при фильтрах."""
+        response = self.client.get(
+            reverse('banking:admin_dashboard'),
+            {'status': Transaction.Status.PENDING},
+        )
+        self.assertEqual(response.context['transactions'].total, 0)
+
+        account = Account.objects.order_by('id').first()
+        response = self.client.get(
+            reverse('banking:admin_dashboard'),
+            {'client': account.client_id},
+        )
+        self.assertEqual(response.context['transactions'].total, 1)
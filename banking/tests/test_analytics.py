@@ -0,0 +1,271 @@
+"""
+Тесты аналитики трат (banking.analytics).
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from banking import analytics
+from banking.models import Account, ClientProfile, Transaction
+
+
+User = get_user_model()
+
+DEPOSIT = Transaction.TransactionType.DEPOSIT
+WITHDRAWAL = Transaction.TransactionType.WITHDRAWAL
+TRANSFER_OUT = Transaction.TransactionType.TRANSFER_OUT
+TRANSFER_IN = Transaction.TransactionType.TRANSFER_IN
+
+
+@skipUnless(analytics.np is not None, 'NumPy не установлен')
+class SpendingAnalyticsTests(TestCase):
+    """Тесты расчёта аналитики и её сверки с перебором через ORM."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание счёта с операциями за период и до него."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        cls.user = User.objects.create_user(
+            username='client', password='testpass123'
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user, full_name='Иван Клиент'
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile, account_number='40817810000000000001'
+        )
+        other = ClientProfile.objects.create(
+            user=User.objects.create(username='other'),
+            full_name='Другой Клиент',
+        )
+        cls.other = Account.objects.create(
+            client=other, account_number='40817810000000000002'
+        )
+        cls.date_to = timezone.localdate() - timedelta(days=1)
+        cls.date_from = cls.date_to - timedelta(days=9)
+
+        cls._create(cls.account, DEPOSIT, '1000.00', days_ago=3)
+        cls._create(
+            cls.account, WITHDRAWAL, '150.00', days_ago=3,
+            metadata={'counterparty_account_number': '40817810999999999999'},
+        )
+        cls._create(
+            cls.account, WITHDRAWAL, '50.00', days_ago=1,
+            metadata={'counterparty_account_number': '40817810999999999999'},
+        )
+        incoming = cls._create(cls.other, TRANSFER_IN, '300.00', days_ago=2)
+        cls._create(
+            cls.account, TRANSFER_OUT, '300.00', days_ago=2,
+            related_transaction=incoming,
+        )
+        cls._create(cls.account, WITHDRAWAL, '20.00', days_ago=0)
+        # До периода: входит только в скользящий итог.
+        cls._create(cls.account, DEPOSIT, '500.00', days_ago=15)
+        # Отменённые операции не учитываются.
+        cls._create(
+            cls.account, DEPOSIT, '999.00', days_ago=3,
+            status=Transaction.Status.CANCELLED,
+        )
+
+    @classmethod
+    def _create(cls, account, transaction_type, amount, days_ago, **kwargs):
+        kwargs.setdefault('status', Transaction.Status.COMPLETED)
+        transaction = Transaction.objects.create(
+            account=account,
+            transaction_type=transaction_type,
+            amount=Decimal(amount),
+            **kwargs,
+        )
+        # Последняя минута дня по местному времени: в UTC это уже может
+        # быть другая дата.
+        day = cls.date_to - timedelta(days=days_ago)
+        created_at = timezone.make_aware(
+            datetime.combine(day, time(23, 59))
+        )
+        Transaction.objects.filter(pk=transaction.pk).update(
+            created_at=created_at
+        )
+        return transaction
+
+    def _analytics(self, transactions=None, **kwargs):
+        kwargs.setdefault('date_from', self.date_from)
+        kwargs.setdefault('date_to', self.date_to)
+        if transactions is None:
+            transactions = self.account.transactions.all()
+        return analytics.spending_analytics(transactions, **kwargs)
+
+    def test_totals(self):
+        """Проверка итогов, среднего чека и получателей за период."""
+        result = self._analytics()
+        self.assertEqual(result.transaction_count, 5)
+        self.assertEqual(result.inflow, Decimal('1000.00'))
+        self.assertEqual(result.outflow, Decimal('520.00'))
+        self.assertEqual(result.average_ticket, Decimal('130.00'))
+        self.assertEqual(
+            [
+                (total.account_number, total.count, total.amount)
+                for total in result.top_counterparties
+            ],
+            [
+                ('40817810000000000002', 1, Decimal('300.00')),
+                ('40817810999999999999', 2, Decimal('200.00')),
+            ],
+        )
+
+    def test_daily_flows_and_rolling_net(self):
+        """Проверка потоков по дням и скользящего итога за 30 дней."""
+        result = self._analytics()
+        self.assertEqual(len(result.daily), 10)
+        by_day = {flow.day: flow for flow in result.daily}
+        flow = by_day[self.date_to - timedelta(days=3)]
+        self.assertEqual(flow.inflow, Decimal('1000.00'))
+        self.assertEqual(flow.outflow, Decimal('150.00'))
+        self.assertEqual(flow.net, Decimal('850.00'))
+        # Пополнение на 500 за 15 дней до конца периода уже в окне.
+        self.assertEqual(result.daily[0].rolling_net, Decimal('500.00'))
+        self.assertEqual(result.daily[-1].rolling_net, Decimal('980.00'))
+
+    def test_top_limits_counterparties(self):
+        """Проверка ограничения числа получателей."""
+        result = self._analytics(top=1)
+        self.assertEqual(
+            [total.account_number for total in result.top_counterparties],
+            ['40817810000000000002'],
+        )
+
+    @override_settings(BANKING_ANALYTICS_CHUNK_SIZE=2)
+    def test_matches_orm_baseline(self):
+        """Проверка совпадения с перебором операций через ORM."""
+        periods = [
+            (self.date_from, self.date_to),
+            (self.date_to - timedelta(days=40), self.date_to),
+            (self.date_to, self.date_to),
+        ]
+        for transactions in (
+            self.account.transactions.all(),
+            Transaction.objects.all(),
+        ):
+            for date_from, date_to in periods:
+                with self.subTest(date_from=date_from):
+                    self.assertEqual(
+                        analytics.spending_analytics(
+                            transactions, date_from, date_to
+                        ),
+                        analytics.compute_with_orm(
+                            transactions, date_from, date_to
+                        ),
+                    )
+
+    @override_settings(BANKING_ANALYTICS_CHUNK_SIZE=2)
+    def test_history_is_read_with_one_query(self):
+        """Проверка чтения операций пачками одним запросом."""
+        with self.assertNumQueries(1):
+            self._analytics()
+
+    def test_empty_history(self):
+        """Проверка аналитики счёта без операций."""
+        result = self._analytics(Transaction.objects.none())
+        self.assertEqual(result.transaction_count, 0)
+        self.assertEqual(result.outflow, Decimal('0.00'))
+        self.assertIsNone(result.average_ticket)
+        self.assertEqual(result.top_counterparties, [])
+        self.assertEqual(
+            {flow.rolling_net for flow in result.daily}, {Decimal('0.00')}
+        )
+
+    def test_staff_endpoint(self):
+        """Проверка JSON аналитики для сотрудника."""
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(
+            reverse('banking:admin_analytics'),
+            {
+                'client': self.profile.id,
+                'date_from': self.date_from.isoformat(),
+                'date_to': self.date_to.isoformat(),
+                'top': 1,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        result = data['analytics']
+        self.assertEqual(result['outflow'], '520.00')
+        self.assertEqual(result['average_ticket'], '130.00')
+        self.assertEqual(len(result['top_counterparties']), 1)
+        self.assertEqual(result['daily'][-1]['day'], self.date_to.isoformat())
+
+    def test_endpoint_rejects_invalid_period(self):
+        """Проверка ответа 400 на перепутанные даты."""
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(
+            reverse('banking:admin_analytics'),
+            {'date_from': '2024-02-01', 'date_to': '2024-01-01'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+    def test_endpoint_rejects_out_of_range_periods(self):
+        """Проверка ответа 400 вместо ошибки расчёта на крайних датах."""
+        self.client.login(username='admin', password='testpass123')
+        for params in (
+            # date_to по умолчанию — сегодня, раньше date_from.
+            {'date_from': '2099-01-01'},
+            # Период длиннее MAX_PERIOD_DAYS.
+            {'date_from': '0001-01-05'},
+            {'date_from': '2000-01-01', 'date_to': '2010-01-01'},
+            {'date_to': '0001-01-05'},
+            {'date_to': '9999-12-31'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    reverse('banking:admin_analytics'), params
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+    def test_period_is_clamped_to_earliest_date(self):
+        """Проверка начала периода не раньше EARLIEST_DATE."""
+        self.assertEqual(
+            analytics.period(date(1, 1, 5), date(1, 3, 1)),
+            (analytics.EARLIEST_DATE, date(1, 3, 1)),
+        )
+        self.assertEqual(
+            analytics.period(None, analytics.EARLIEST_DATE),
+            (analytics.EARLIEST_DATE, analytics.EARLIEST_DATE),
+        )
+        result = self._analytics(
+            date_from=date(1, 1, 5), date_to=date(1, 3, 1)
+        )
+        self.assertEqual(result.transaction_count, 0)
+        with self.assertRaises(analytics.InvalidPeriod):
+            analytics.period(date(2099, 1, 1), None)
+
+    def test_endpoint_requires_staff(self):
+        """Проверка, что клиент не получает аналитику."""
+        self.client.login(username='client', password='testpass123')
+        response = self.client.get(reverse('banking:admin_analytics'))
+        self.assertRedirects(response, reverse('banking:client_dashboard'))
+
+    def test_command_benchmark(self):
+        """Проверка команды spending_analytics --benchmark."""
+        out = StringIO()
+        call_command(
+            'spending_analytics',
+            '--account', str(self.account.id),
+            '--date-from', self.date_from.isoformat(),
+            '--date-to', self.date_to.isoformat(),
+            '--benchmark',
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('40817810999999999999: 2', output)
+        self.assertIn('Результаты совпадают.', output)
@@ -0,0 +1,265 @@
+"""
+Тесты асинхронных сервисов и представлений (banking.async_services).
+
+Проверяют, что выдержка перед проведением не блокирует event loop и
+что асинхронные кабинет и чек ведут себя так же, как синхронные.
+"""
+import asyncio
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from banking import idempotency
+from banking.async_services import (
+    acreate_and_process_transaction,
+    acreate_and_process_transfer,
+    run_db,
+)
+from banking.models import Account, ClientProfile, Transaction
+
+
+User = get_user_model()
+
+
+def _create_accounts():
+    user = User.objects.create_user(
+        username='client',
+        password='testpass123',
+    )
+    target_user = User.objects.create_user(
+        username='target',
+        password='testpass123',
+    )
+    profile = ClientProfile.objects.create(
+        user=user,
+        full_name='Иван Клиент',
+    )
+    target_profile = ClientProfile.objects.create(
+        user=target_user,
+        full_name='Получатель',
+    )
+    account = Account.objects.create(
+        client=profile,
+        account_number='40817810000000000001',
+        balance=Decimal('1000.00'),
+    )
+    target_account = Account.objects.create(
+        client=target_profile,
+        account_number='40817810000000000002',
+        balance=Decimal('500.00'),
+    )
+    return user, account, target_account
+
+
+@override_settings(BANKING_ASYNC_DB_WORKERS=0)
+@patch('banking.async_services.PROCESSING_DELAY_SECONDS', 0.2)
+class AsyncServicesTests(TestCase):
+    """Тесты асинхронных сервисов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user, cls.account, cls.target_account = _create_accounts()
+
+    def setUp(self):
+        """Очистка кэша результатов между тестами."""
+        idempotency.replay_cache.clear()
+
+    async def test_operations_wait_concurrently(self):
+        """Проверка, что выдержки операций идут параллельно."""
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(
+                acreate_and_process_transaction(
+                    account=self.account,
+                    transaction_type=Transaction.TransactionType.DEPOSIT,
+                    amount=Decimal('10.00'),
+                )
+                for _ in range(10)
+            )
+        )
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.0)
+        self.assertTrue(all(result.completed for result in results))
+        await self.account.arefresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1100.00'))
+
+    async def test_transfer(self):
+        """Проверка асинхронного перевода."""
+        result = await acreate_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target_account,
+            amount=Decimal('300.00'),
+        )
+        await self.account.arefresh_from_db()
+        await self.target_account.arefresh_from_db()
+        self.assertTrue(result.completed)
+        self.assertIn(self.target_account.account_number, result.message)
+        self.assertEqual(self.account.balance, Decimal('700.00'))
+        self.assertEqual(self.target_account.balance, Decimal('800.00'))
+
+    async def test_rejected_operation_skips_delay(self):
+        """Проверка, что отклонённая операция не ждёт выдержку."""
+        with patch('banking.async_services.asyncio.sleep') as mock_sleep:
+            result = await acreate_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.WITHDRAWAL,
+                amount=Decimal('200000.00'),
+            )
+        mock_sleep.assert_not_called()
+        self.assertFalse(result.completed)
+        self.assertIn('Превышен лимит', result.message)
+
+    async def test_duplicate_key_returns_original_result(self):
+        """Проверка идемпотентности асинхронных операций."""
+        for _ in range(2):
+            result = await acreate_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('100.00'),
+                idempotency_key='1:deposit:abc',
+            )
+            self.assertTrue(result.completed)
+        self.assertEqual(await Transaction.objects.acount(), 1)
+
+    async def test_cancelled_request_still_settles(self):
+        """Проверка проведения операции после отключения клиента."""
+        request = asyncio.ensure_future(
+            acreate_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('100.00'),
+                idempotency_key='1:deposit:abc',
+            )
+        )
+        await asyncio.sleep(0.05)
+        request.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await request
+
+        transaction = await Transaction.objects.aget()
+        for _ in range(50):
+            await transaction.arefresh_from_db()
+            if transaction.status != Transaction.Status.PENDING:
+                break
+            await asyncio.sleep(0.05)
+        self.assertEqual(transaction.status, Transaction.Status.COMPLETED)
+        await self.account.arefresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1100.00'))
+
+        idempotency.replay_cache.clear()
+        retry = await acreate_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+            idempotency_key='1:deposit:abc',
+        )
+        self.assertTrue(retry.completed)
+        self.assertEqual(retry.transaction.pk, transaction.pk)
+
+
+@override_settings(BANKING_ASYNC_DB_WORKERS=0)
+@patch('banking.async_services.PROCESSING_DELAY_SECONDS', 0)
+class AsyncViewsTests(TestCase):
+    """Тесты асинхронных кабинета и чека."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user, cls.account, cls.target_account = _create_accounts()
+
+    async def test_requires_login(self):
+        """Проверка редиректа анонимного пользователя на вход."""
+        response = await self.async_client.get(
+            reverse('banking:async_client_dashboard')
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+    async def test_dashboard_renders(self):
+        """Проверка отображения кабинета."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse('banking:async_client_dashboard')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.account.account_number)
+
+    async def test_deposit_redirects_to_async_receipt(self):
+        """Проверка пополнения и перехода к асинхронному чеку."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse('banking:async_client_dashboard'),
+            {'form_type': 'deposit', 'amount': '250.00'},
+        )
+        transaction = await Transaction.objects.aget()
+        receipt_url = reverse(
+            'banking:async_transaction_receipt', args=[transaction.pk]
+        )
+        self.assertRedirects(
+            response, receipt_url, fetch_redirect_response=False
+        )
+        self.assertEqual(transaction.status, Transaction.Status.COMPLETED)
+
+        receipt = await self.async_client.get(receipt_url)
+        self.assertContains(receipt, transaction.reference)
+
+    async def test_invalid_form_is_rendered_with_errors(self):
+        """Проверка повторного показа формы с ошибками."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse('banking:async_client_dashboard'),
+            {'form_type': 'deposit', 'amount': '-5'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['deposit_form'].errors)
+        self.assertEqual(await Transaction.objects.acount(), 0)
+
+    async def test_foreign_receipt_is_not_found(self):
+        """Проверка, что чужой чек недоступен."""
+        transaction = await Transaction.objects.acreate(
+            account=self.target_account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse(
+                'banking:async_transaction_receipt', args=[transaction.pk]
+            )
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(BANKING_ASYNC_DB_WORKERS=2)
+@patch('banking.async_services.PROCESSING_DELAY_SECONDS', 0)
+class AsyncExecutorTests(TransactionTestCase):
+    """Тесты выполнения запросов к базе в отдельном пуле потоков."""
+
+    def test_run_db_uses_bounded_pool(self):
+        """Проверка проведения операции через пул потоков."""
+        _, account, _ = _create_accounts()
+
+        async def scenario():
+            thread_name = await run_db(
+                lambda: threading.current_thread().name
+            )
+            result = await acreate_and_process_transaction(
+                account=account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('100.00'),
+            )
+            return thread_name, result
+
+        thread_name, result = asyncio.run(scenario())
+
+        account.refresh_from_db()
+        self.assertTrue(thread_name.startswith('banking-db'))
+        self.assertTrue(result.completed)
+        self.assertEqual(account.balance, Decimal('1100.00'))
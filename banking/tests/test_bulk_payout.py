@@ -0,0 +1,304 @@
+"""
+Тесты массовых выплат (create_and_process_transfers_bulk).
+
+Проверяют проведение пачки переводов с одного счёта, сверку суммы
+с балансом, отмену отдельных выплат, команду bulk_payout и
+JSON-эндпоинт для сотрудников.
+"""
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import (
+    create_and_process_transfers_bulk,
+    finalize_pending_batch,
+    payout_items,
+)
+
+
+User = get_user_model()
+
+
+def _create_account(index, balance='0.00'):
+    # Пароль не нужен: хеширование заметно замедляет создание сотни
+    # получателей.
+    user = User.objects.create(username=f'client{index}')
+    profile = ClientProfile.objects.create(
+        user=user,
+        full_name=f'Клиент {index}',
+    )
+    return Account.objects.create(
+        client=profile,
+        account_number=f'408178100000000{index:05d}',
+        balance=Decimal(balance),
+    )
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class BulkTransferServiceTests(TestCase):
+    """Тесты сервиса массовых выплат."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.source = _create_account(0, '10000.00')
+        cls.targets = [_create_account(index) for index in range(1, 6)]
+
+    def test_all_payouts_are_settled(self, mock_sleep):
+        """Проверка проведения всех выплат с одной выдержкой."""
+        items = [
+            (target, Decimal('100.00'), 'Зарплата')
+            for target in self.targets
+        ]
+        result = create_and_process_transfers_bulk(self.source, items)
+
+        self.source.refresh_from_db()
+        mock_sleep.assert_called_once()
+        self.assertTrue(result.completed)
+        self.assertEqual(result.completed_count, 5)
+        self.assertEqual(self.source.balance, Decimal('9500.00'))
+        for target in self.targets:
+            target.refresh_from_db()
+            self.assertEqual(target.balance, Decimal('100.00'))
+        incoming = Transaction.objects.filter(
+            transaction_type=Transaction.TransactionType.TRANSFER_IN
+        )
+        self.assertEqual(incoming.count(), 5)
+        for outgoing in result.transactions:
+            outgoing.refresh_from_db()
+            self.assertTrue(outgoing.is_completed)
+            self.assertEqual(
+                outgoing.related_transaction.related_transaction_id,
+                outgoing.id,
+            )
+            self.assertEqual(outgoing.note, 'Зарплата')
+
+    def test_query_count_does_not_depend_on_size(self, mock_sleep):
+        """Проверка, что число запросов не растёт с числом выплат."""
+        targets = [_create_account(index) for index in range(10, 60)]
+        with CaptureQueriesContext(connection) as small:
+            create_and_process_transfers_bulk(
+                self.source,
+                [(target, Decimal('1.00'), '') for target in self.targets],
+            )
+        with CaptureQueriesContext(connection) as large:
+            create_and_process_transfers_bulk(
+                self.source,
+                [(target, Decimal('1.00'), '') for target in targets],
+            )
+        self.assertEqual(len(large), len(small))
+
+    def test_total_above_balance_rejects_whole_payout(self, mock_sleep):
+        """Проверка однократной сверки суммы с балансом."""
+        items = [
+            (target, Decimal('2500.00'), '') for target in self.targets
+        ]
+        result = create_and_process_transfers_bulk(self.source, items)
+
+        self.source.refresh_from_db()
+        self.assertFalse(result.completed)
+        self.assertIn('Недостаточно средств', result.message)
+        self.assertEqual(result.transactions, [])
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.assertEqual(self.source.balance, Decimal('10000.00'))
+
+    def test_blocked_and_over_limit_payouts_are_cancelled(self, mock_sleep):
+        """Проверка отмены отдельных выплат без влияния на остальные."""
+        blocked = self.targets[0]
+        blocked.is_blocked = True
+        blocked.save()
+        source = _create_account(99, '500000.00')
+        items = [
+            (blocked, Decimal('100.00'), ''),
+            (self.targets[1], Decimal('150000.00'), ''),
+            (self.targets[2], Decimal('100.00'), ''),
+        ]
+        result = create_and_process_transfers_bulk(source, items)
+
+        source.refresh_from_db()
+        self.assertFalse(result.completed)
+        self.assertEqual(result.completed_count, 1)
+        self.assertEqual(result.cancelled_count, 2)
+        self.assertIn('Превышен лимит', result.transactions[1].note)
+        self.assertEqual(source.balance, Decimal('499900.00'))
+
+    def test_source_cannot_be_target(self, mock_sleep):
+        """Проверка запрета выплаты самому себе."""
+        with self.assertRaises(ValueError):
+            create_and_process_transfers_bulk(
+                self.source, [(self.source, Decimal('1.00'), '')]
+            )
+
+    @override_settings(BANKING_SETTLEMENT_MODE='background')
+    def test_background_mode_leaves_pairs_for_workers(self, mock_sleep):
+        """Проверка фонового режима и проведения пачкой воркера."""
+        items = [(target, Decimal('10.00'), '') for target in self.targets]
+        result = create_and_process_transfers_bulk(self.source, items)
+
+        mock_sleep.assert_not_called()
+        self.assertTrue(result.pending)
+        finalize_pending_batch([item.id for item in result.transactions])
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.balance, Decimal('9950.00'))
+
+    def test_payout_items_reports_unknown_account(self, mock_sleep):
+        """Проверка разбора строк выплат."""
+        items = payout_items(
+            [(self.targets[0].account_number, '10,50', 'Кешбэк')]
+        )
+        self.assertEqual(items[0][1], Decimal('10.50'))
+        with self.assertRaisesMessage(ValueError, 'Строка 2'):
+            payout_items(
+                [
+                    (self.targets[0].account_number, '1'),
+                    ('00000000000000000000', '1'),
+                ]
+            )
+
+    def test_payout_items_rejects_non_finite_amounts(self, mock_sleep):
+        """Проверка отказа от NaN, бесконечности и неположительных сумм."""
+        number = self.targets[0].account_number
+        amounts = (
+            'NaN', 'sNaN', '-nan', 'Infinity', '-Inf', '1e999999',
+            '0', '-5', '0,001', 'abc',
+        )
+        for amount in amounts:
+            with self.subTest(amount=amount):
+                with self.assertRaisesMessage(ValueError, 'Строка 1'):
+                    payout_items([(number, amount)])
+        items = payout_items([(number, '10.005'), (number, '1E+1')])
+        self.assertEqual(
+            [amount for _, amount, _ in items],
+            [Decimal('10.00'), Decimal('10.00')],
+        )
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class BulkPayoutCommandTests(TestCase):
+    """Тесты команды bulk_payout."""
+
+    def test_command_reads_csv(self, mock_sleep):
+        """Проверка выплат из CSV-файла."""
+        source = _create_account(0, '1000.00')
+        target = _create_account(1)
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False, encoding='utf-8'
+        ) as f:
+            f.write('account,amount,note\n')
+            f.write(f'{target.account_number},250.00,Премия\n')
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command(
+            'bulk_payout',
+            source.account_number,
+            f.name,
+            '--skip-header',
+            stdout=out,
+        )
+        target.refresh_from_db()
+        self.assertEqual(target.balance, Decimal('250.00'))
+        self.assertIn('Проведено: 1', out.getvalue())
+
+    def test_unknown_source_fails(self, mock_sleep):
+        """Проверка ошибки для несуществующего счёта."""
+        with self.assertRaises(CommandError):
+            call_command('bulk_payout', '00000000000000000000', '-')
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class AdminBulkPayoutViewTests(TestCase):
+    """Тесты JSON-эндпоинта массовых выплат."""
+
+    def setUp(self):
+        """Настройка тестовых данных."""
+        self.staff = User.objects.create_user(
+            username='staff',
+            password='testpass123',
+            is_staff=True,
+        )
+        self.source = _create_account(0, '1000.00')
+        self.target = _create_account(1)
+        self.url = reverse('banking:admin_bulk_payout')
+
+    def _post(self, data):
+        return self.client.post(
+            self.url, json.dumps(data), content_type='application/json'
+        )
+
+    def test_requires_staff(self, mock_sleep):
+        """Проверка доступа только для сотрудников."""
+        User.objects.create_user(username='user', password='testpass123')
+        self.client.login(username='user', password='testpass123')
+        response = self._post({})
+        self.assertEqual(response.status_code, 302)
+
+    def test_payout_is_processed(self, mock_sleep):
+        """Проверка проведения выплат через эндпоинт."""
+        self.client.login(username='staff', password='testpass123')
+        response = self._post(
+            {
+                'source_account': self.source.account_number,
+                'items': [
+                    {
+                        'account_number': self.target.account_number,
+                        'amount': '300.00',
+                        'note': 'Зарплата',
+                    }
+                ],
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['completed'], 1)
+        outgoing = Transaction.objects.get(reference=data['references'][0])
+        self.assertEqual(outgoing.processed_by, self.staff)
+
+    def test_invalid_payload_returns_400(self, mock_sleep):
+        """Проверка ответа на некорректный запрос."""
+        self.client.login(username='staff', password='testpass123')
+        response = self._post(
+            {'source_account': self.source.account_number}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+    def test_malformed_json_returns_generic_message(self, mock_sleep):
+        """Проверка, что текст ошибки парсера JSON не уходит клиенту."""
+        self.client.login(username='staff', password='testpass123')
+        for body in ('{"source_account": ', b'\xff\xfe{'):
+            response = self.client.post(
+                self.url, body, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.json()['message'], 'Некорректный формат запроса.'
+            )
+
+    def test_nan_amount_returns_400(self, mock_sleep):
+        """Проверка ответа 400 на сумму NaN вместо ошибки сервера."""
+        self.client.login(username='staff', password='testpass123')
+        response = self._post(
+            {
+                'source_account': self.source.account_number,
+                'items': [
+                    {
+                        'account_number': self.target.account_number,
+                        'amount': 'NaN',
+                    }
+                ],
+            }
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('некорректная сумма', response.json()['message'])
@@ -0,0 +1,139 @@
+"""
+Тесты кэша карточек клиентов админ-панели (banking.cards).
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking import cards
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import (
+    create_and_process_transaction,
+    toggle_account_block,
+)
+
+
+User = get_user_model()
+
+ACCOUNTS_PREFETCH = '"banking_account"."client_id" IN'
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class ClientCardCacheTests(TestCase):
+    """Тесты кэширования и смены версии карточек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание сотрудника, клиента и счёта."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=User.objects.create(username='client'),
+            full_name='Иван Клиент',
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+
+    def setUp(self):
+        """Вход сотрудника и очистка кэша карточек."""
+        cards.card_cache().clear()
+        self.client.login(username='admin', password='testpass123')
+
+    def _render(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('banking:admin_dashboard_clients')
+            )
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(query['sql'] for query in queries)
+        return response.content.decode(), ACCOUNTS_PREFETCH in sql
+
+    def _version(self):
+        return ClientProfile.objects.get(pk=self.profile.pk).card_version
+
+    def test_second_render_comes_from_cache(self, mock_sleep):
+        """Проверка, что счета загружаются только при промахе кэша."""
+        html, loaded = self._render()
+        self.assertTrue(loaded)
+        self.assertIn('Баланс: 1000,00', html)
+        html, loaded = self._render()
+        self.assertFalse(loaded)
+        self.assertIn(self.account.account_number, html)
+
+    def test_csrf_token_is_not_cached(self, mock_sleep):
+        """Проверка подстановки токена CSRF в карточку из кэша."""
+        self._render()
+        html, _ = self._render()
+        self.assertIn('name="csrfmiddlewaretoken" value="', html)
+        self.assertNotIn(str(cards.CSRF_PLACEHOLDER), html)
+        key = cards.card_key(ClientProfile.objects.get(pk=self.profile.pk))
+        cached = cards.card_cache().get(key)
+        self.assertIn(str(cards.CSRF_PLACEHOLDER), cached)
+        self.assertNotIn('csrfmiddlewaretoken', cached)
+
+    def test_settlement_changes_version(self, mock_sleep):
+        """Проверка новой карточки после проведения операции."""
+        self._render()
+        version = self._version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('250.00'),
+            )
+        # Строка клиента не обновляется в транзакции проведения.
+        self.assertEqual(self._version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(self._version(), version)
+        html, loaded = self._render()
+        self.assertTrue(loaded)
+        self.assertIn('Баланс: 1250,00', html)
+
+    def test_block_changes_version(self, mock_sleep):
+        """Проверка новой карточки после блокировки счёта."""
+        self._render()
+        version = self._version()
+        with self.captureOnCommitCallbacks(execute=True):
+            toggle_account_block(self.account, blocked=True)
+        self.assertNotEqual(self._version(), version)
+        html, _ = self._render()
+        self.assertIn('Разблокировать', html)
+        self.assertIn('Заблокирован', html)
+
+    def test_new_account_changes_version(self, mock_sleep):
+        """Проверка новой карточки после открытия счёта."""
+        self._render()
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.create(
+                client=self.profile, account_number='40817810000000000002'
+            )
+        html, _ = self._render()
+        self.assertIn('40817810000000000002', html)
+
+    def test_transaction_without_balance_change_keeps_version(
+        self, mock_sleep
+    ):
+        """Проверка, что новая операция в обработке не меняет карточку."""
+        version = self._version()
+        Transaction.objects.create(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('10.00'),
+        )
+        self.assertEqual(self._version(), version)
+
+    @override_settings(BANKING_CARD_CACHE='default')
+    def test_cache_alias_setting(self, mock_sleep):
+        """Проверка выбора кэша настройкой BANKING_CARD_CACHE."""
+        self.assertIs(cards.card_cache(), caches['default'])
@@ -0,0 +1,194 @@
+"""
+Нагрузочные тесты конкурентного проведения переводов.
+
+Встречные переводы между одними и теми же счетами проводятся из многих
+потоков одновременно. Основной вариант требует базы с SELECT ... FOR
+UPDATE (PostgreSQL, MySQL). На SQLite записи выполняются строго по
+очереди, поэтому там потоки работают с файловой тестовой базой
+и повторяют перевод, получив «database is locked».
+"""
+import threading
+import time
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import finalize_transfer
+
+
+User = get_user_model()
+
+THREADS = 16
+TRANSFERS_PER_THREAD = 10
+SQLITE_LOCK_RETRIES = 200
+
+
+def _create_accounts():
+    accounts = []
+    for index in range(2):
+        user = User.objects.create_user(
+            username=f'client{index}',
+            password='testpass123',
+        )
+        profile = ClientProfile.objects.create(
+            user=user,
+            full_name=f'Клиент {index}',
+        )
+        accounts.append(
+            Account.objects.create(
+                client=profile,
+                account_number=f'4081781000000000000{index}',
+                balance=Decimal('100000.00'),
+            )
+        )
+    return accounts
+
+
+def _create_pending_transfer(source, target, amount):
+    outgoing = Transaction.objects.create(
+        account=source,
+        transaction_type=Transaction.TransactionType.TRANSFER_OUT,
+        amount=amount,
+    )
+    incoming = Transaction.objects.create(
+        account=target,
+        transaction_type=Transaction.TransactionType.TRANSFER_IN,
+        amount=amount,
+    )
+    outgoing.related_transaction = incoming
+    incoming.related_transaction = outgoing
+    Transaction.objects.bulk_update(
+        [outgoing, incoming], fields=['related_transaction']
+    )
+    return outgoing.id, incoming.id
+
+
+class OpposingTransfersMixin:
+    """Встречные переводы A→B и B→A из многих потоков."""
+
+    def finalize(self, outgoing_id, incoming_id):
+        finalize_transfer(outgoing_id, incoming_id)
+
+    def test_opposing_transfers_finish_and_conserve_money(self):
+        """Проверка отсутствия взаимных блокировок и сохранения денег."""
+        account_a, account_b = _create_accounts()
+        total_before = Account.objects.aggregate(total=Sum('balance'))[
+            'total'
+        ]
+
+        batches = []
+        for index in range(THREADS):
+            source, target = (
+                (account_a, account_b)
+                if index % 2 == 0
+                else (account_b, account_a)
+            )
+            batches.append(
+                [
+                    _create_pending_transfer(
+                        source, target, Decimal('10.00') + index
+                    )
+                    for _ in range(TRANSFERS_PER_THREAD)
+                ]
+            )
+
+        barrier = threading.Barrier(THREADS)
+        errors = []
+
+        def worker(pairs):
+            try:
+                barrier.wait()
+                for outgoing_id, incoming_id in pairs:
+                    self.finalize(outgoing_id, incoming_id)
+            except Exception as exc:  # pragma: no cover - диагностика
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(pairs,))
+            for pairs in batches
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=120)
+
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(errors, [])
+        self.assertFalse(
+            Transaction.objects.filter(
+                status=Transaction.Status.PENDING
+            ).exists()
+        )
+        total_after = Account.objects.aggregate(total=Sum('balance'))[
+            'total'
+        ]
+        self.assertEqual(total_after, total_before)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class OpposingTransfersStressTests(
+    OpposingTransfersMixin, TransactionTestCase
+):
+    """Встречные переводы на базе с блокировкой строк."""
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Только для SQLite')
+class SQLiteOpposingTransfersStressTests(
+    OpposingTransfersMixin, TransactionTestCase
+):
+    """
+    Встречные переводы на SQLite.
+
+    Тестовая база SQLite лежит в файле (DATABASES["default"]["TEST"]),
+    и каждый поток работает со своим соединением. Запись, не
+    дождавшаяся блокировки файла, откатывается целиком и повторяется.
+    """
+
+    def finalize(self, outgoing_id, incoming_id):
+        for _ in range(SQLITE_LOCK_RETRIES):
+            try:
+                return finalize_transfer(outgoing_id, incoming_id)
+            except OperationalError as exc:
+                if 'database is locked' not in str(exc):
+                    raise
+                time.sleep(0.01)
+        self.fail('SQLite так и не отдал блокировку записи')
+
+    def test_test_database_is_file_backed(self):
+        """Проверка, что потоки работают с одной файловой базой."""
+        self.assertFalse(connection.is_in_memory_db())
+
+
+class FinalizeTransferLockingTests(TestCase):
+    """Проверка блокировки перевода одним запросом."""
+
+    def test_transfer_is_locked_with_single_query(self):
+        """Проверка, что обе части перевода читаются одним запросом."""
+        account_a, account_b = _create_accounts()
+        outgoing_id, incoming_id = _create_pending_transfer(
+            account_b, account_a, Decimal('100.00')
+        )
+        with CaptureQueriesContext(connection) as queries:
+            outgoing, incoming = finalize_transfer(outgoing_id, incoming_id)
+
+        selects = [
+            query['sql']
+            for query in queries
+            if query['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('ORDER BY', selects[0])
+        self.assertTrue(outgoing.is_completed)
+        self.assertTrue(incoming.is_completed)
+        account_a.refresh_from_db()
+        account_b.refresh_from_db()
+        self.assertEqual(account_a.balance, Decimal('100100.00'))
+        self.assertEqual(account_b.balance, Decimal('99900.00'))
@@ -0,0 +1,153 @@
+"""
+Тесты пакетной загрузки счетов контрагентов (resolve_counterparties).
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking.models import (
+    Account,
+    ClientProfile,
+    Transaction,
+    resolve_counterparties,
+)
+
+
+User = get_user_model()
+
+
+class CounterpartyResolutionTests(TestCase):
+    """Тесты resolve_counterparties."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание счетов и операций с контрагентами."""
+        cls.admin = User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True,
+            is_superuser=True,
+        )
+        profile = ClientProfile.objects.create(
+            user=User.objects.create(username='client'),
+            full_name='Иван Клиент',
+        )
+        cls.account = Account.objects.create(
+            client=profile, account_number='40817810000000000001'
+        )
+        cls.targets = [
+            Account.objects.create(
+                client=profile, account_number=f'4081781000000000010{i}'
+            )
+            for i in range(3)
+        ]
+        cls.incoming = Transaction.objects.create(
+            account=cls.targets[0],
+            transaction_type=Transaction.TransactionType.TRANSFER_IN,
+            amount=Decimal('10.00'),
+        )
+        cls.outgoing = Transaction.objects.create(
+            account=cls.account,
+            transaction_type=Transaction.TransactionType.TRANSFER_OUT,
+            amount=Decimal('10.00'),
+            related_transaction=cls.incoming,
+        )
+        for target in cls.targets:
+            cls._payout(target.account_number)
+        cls.unknown = cls._payout('40817810999999999999')
+        cls.deposit = Transaction.objects.create(
+            account=cls.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('10.00'),
+        )
+
+    @classmethod
+    def _payout(cls, number):
+        return Transaction.objects.create(
+            account=cls.account,
+            transaction_type=Transaction.TransactionType.TRANSFER_OUT,
+            amount=Decimal('10.00'),
+            metadata={'counterparty_account_number': number},
+        )
+
+    def test_metadata_numbers_resolve_in_one_query(self):
+        """Проверка одного запроса на все номера из metadata."""
+        transactions = list(
+            Transaction.objects.filter(
+                account=self.account, related_transaction__isnull=True
+            )
+        )
+        with self.assertNumQueries(1):
+            resolve_counterparties(transactions)
+        with self.assertNumQueries(0):
+            numbers = {
+                t.id: t.counterparty_account for t in transactions
+            }
+        self.assertEqual(
+            sorted(a.account_number for a in numbers.values() if a),
+            sorted(a.account_number for a in self.targets),
+        )
+        self.assertIsNone(numbers[self.unknown.id])
+        self.assertIsNone(numbers[self.deposit.id])
+
+    def test_related_transactions_are_batched(self):
+        """Проверка пакетной загрузки счетов связанных операций."""
+        transactions = list(Transaction.objects.all())
+        with self.assertNumQueries(2):
+            resolve_counterparties(transactions)
+        outgoing = next(t for t in transactions if t.id == self.outgoing.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(outgoing.counterparty_account, self.targets[0])
+
+    def test_select_related_is_reused(self):
+        """Проверка, что загруженные через JOIN счета не запрашиваются."""
+        transactions = list(
+            Transaction.objects.filter(pk=self.outgoing.pk)
+            .select_related('related_transaction__account')
+        )
+        with self.assertNumQueries(0):
+            resolve_counterparties(transactions)
+            self.assertEqual(
+                transactions[0].counterparty_account, self.targets[0]
+            )
+
+    def test_unresolved_instance_still_works(self):
+        """Проверка свойства без пакетной загрузки."""
+        payout = Transaction.objects.filter(
+            metadata__counterparty_account_number=(
+                self.targets[1].account_number
+            )
+        ).get()
+        self.assertEqual(payout.counterparty_account, self.targets[1])
+
+    def _dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('banking:admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_dashboard_query_count_does_not_grow(self):
+        """Проверка, что число запросов не зависит от числа операций."""
+        self.client.login(username='admin', password='testpass123')
+        # Первый запрос заполняет кэш карточек клиентов.
+        self._dashboard_queries()
+        before = self._dashboard_queries()
+        for i in range(5):
+            self._payout(f'4081781000000000020{i}')
+        self.assertEqual(self._dashboard_queries(), before)
+
+    def test_admin_changelist_query_count_does_not_grow(self):
+        """Проверка списка операций в админке Django."""
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:banking_transaction_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        before = len(queries)
+        for target in self.targets:
+            self._payout(target.account_number)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), before)
+        self.assertContains(response, self.targets[2].account_number)
@@ -0,0 +1,202 @@
+"""
+Тесты ленты операций для сотрудников (banking.events).
+"""
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from banking import events
+from banking.events import EVENT_RESYNC, EVENT_TRANSACTION, EventFeed
+from banking.models import (
+    Account,
+    ClientProfile,
+    Transaction,
+    TransactionEvent,
+)
+from banking.services import create_and_process_transaction
+
+
+User = get_user_model()
+
+
+class EventFeedTests(TestCase):
+    """Тесты чтения событий из таблицы."""
+
+    def _publish(self, *numbers):
+        events.publish(EVENT_TRANSACTION, [{'n': n} for n in numbers])
+
+    def test_subscriber_receives_new_events(self):
+        """Проверка доставки событий после подписки."""
+        self._publish(0)
+        feed = EventFeed()
+        self.assertEqual(feed.poll(), [])
+        self._publish(1, 2)
+        batch = feed.poll()
+        self.assertEqual([event.data['n'] for event in batch], [1, 2])
+        self.assertEqual(batch[1].id, events.latest_id())
+        self.assertEqual(feed.poll(), [])
+
+    def test_resume_from_last_id(self):
+        """Проверка повтора пропущенных событий."""
+        self._publish(1, 2, 3)
+        feed = EventFeed(events.latest_id() - 2)
+        self.assertEqual([event.data['n'] for event in feed.poll()], [2, 3])
+
+    @override_settings(BANKING_EVENTS_HISTORY=3)
+    def test_resync_when_history_is_gone(self):
+        """Проверка resync, если пропущенного уже нет в таблице."""
+        self._publish(0)
+        first = events.latest_id()
+        self._publish(1, 2, 3, 4, 5, 6)
+        self.assertLessEqual(TransactionEvent.objects.count(), 6)
+        self.assertFalse(TransactionEvent.objects.filter(id=first).exists())
+        for last_id in (first, events.latest_id() + 10):
+            [event] = EventFeed(last_id).poll()
+            self.assertEqual(event.name, EVENT_RESYNC)
+            self.assertEqual(event.id, events.latest_id())
+
+    @override_settings(BANKING_EVENTS_BUFFER=2)
+    def test_slow_subscriber_is_resynced(self):
+        """Проверка ограничения числа событий за опрос."""
+        feed = EventFeed()
+        feed.poll()
+        self._publish(1, 2, 3, 4)
+        [event] = feed.poll()
+        self.assertEqual(event.name, EVENT_RESYNC)
+        self._publish(5)
+        self.assertEqual([event.data['n'] for event in feed.poll()], [5])
+
+    def test_late_commit_is_delivered(self):
+        """Проверка события, зафиксированного позже события с большим id."""
+        self._publish(0)
+        feed = EventFeed(events.latest_id())
+        self._publish(1, 2)
+        early = TransactionEvent.objects.filter(id__gt=feed.last_id).first()
+        early_id = early.id
+        early.delete()
+        [event] = feed.poll()
+        self.assertEqual(event.data['n'], 2)
+        TransactionEvent.objects.create(
+            id=early_id, name=EVENT_TRANSACTION, data={'n': 1}
+        )
+        [event] = feed.poll()
+        self.assertEqual(event.data['n'], 1)
+        self.assertEqual(event.id, feed.last_id)
+        self.assertEqual(feed.poll(), [])
+
+    def test_encode(self):
+        """Проверка формата text/event-stream."""
+        self._publish(1)
+        [event] = EventFeed(events.latest_id() - 1).poll()
+        self.assertEqual(
+            event.encode(),
+            f'id: {event.id}\nevent: transaction\ndata: {{"n": 1}}\n\n',
+        )
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class TransactionEventsTests(TestCase):
+    """Тесты публикации операций и потока admin_events."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание сотрудника, клиента и счёта."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        profile = ClientProfile.objects.create(
+            user=User.objects.create_user(
+                username='client', password='testpass123'
+            ),
+            full_name='Иван Клиент',
+        )
+        cls.account = Account.objects.create(
+            client=profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+
+    def setUp(self):
+        """Подписка на события после уже записанных."""
+        self.feed = EventFeed()
+        self.feed.poll()
+
+    def _deposit(self):
+        return create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        ).transaction
+
+    def test_events_are_published_after_commit(self, mock_sleep):
+        """Проверка событий создания и проведения операции."""
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction = self._deposit()
+        batch = self.feed.poll()
+        self.assertEqual(
+            [(e.data['change'], e.data['status']) for e in batch],
+            [
+                (events.TRANSACTION_CREATED, Transaction.Status.PENDING),
+                (events.TRANSACTION_UPDATED, Transaction.Status.COMPLETED),
+            ],
+        )
+        self.assertEqual(batch[0].data['reference'], transaction.reference)
+        self.assertEqual(batch[1].data['amount'], '100.00')
+
+    def test_rolled_back_changes_are_not_published(self, mock_sleep):
+        """Проверка, что без фиксации событий нет."""
+        with self.captureOnCommitCallbacks(execute=False):
+            self._deposit()
+        self.assertEqual(self.feed.poll(), [])
+
+    @override_settings(BANKING_EVENTS_STREAM_SECONDS=0)
+    def test_stream_resumes_from_last_event_id(self, mock_sleep):
+        """Проверка потока с Last-Event-ID."""
+        last_id = events.latest_id()
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction = self._deposit()
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(
+            reverse('banking:admin_events'), HTTP_LAST_EVENT_ID=str(last_id)
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('retry: '))
+        payloads = [
+            json.loads(line[len('data: '):])
+            for line in body.splitlines()
+            if line.startswith('data: ')
+        ]
+        self.assertEqual(
+            [payload['id'] for payload in payloads], [transaction.id] * 2
+        )
+        self.assertIn(f'id: {events.latest_id()}\n', body)
+
+    def test_stream_requires_staff(self, mock_sleep):
+        """Проверка доступа к ленте только для сотрудников."""
+        self.client.login(username='client', password='testpass123')
+        response = self.client.get(reverse('banking:admin_events'))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(BANKING_EVENTS_STREAM_SECONDS=0)
+    async def test_asgi_stream_is_async(self, mock_sleep):
+        """Проверка асинхронного потока под ASGI."""
+        last_id = await sync_to_async(events.latest_id)()
+        await sync_to_async(events.publish)(EVENT_TRANSACTION, [{'n': 1}])
+        await self.async_client.alogin(
+            username='admin', password='testpass123'
+        )
+        response = await self.async_client.get(
+            reverse('banking:admin_events'), {'last_id': last_id}
+        )
+        self.assertTrue(response.is_async)
+        body = b''.join(
+            [chunk async for chunk in response.streaming_content]
+        ).decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn('data: {"n": 1}\n', body)
@@ -531,6 +531,33 @@ class TransactionFilterFormTests(TestCase):
         self.assertTrue(form.is_valid())
         self.assertEqual(form.cleaned_data['client'], profile)
 
+    def test_client_widget_renders_only_selected(self):
+        """Проверка, что в список попадает только выбранный клиент."""
+        profiles = [
+            ClientProfile.objects.create(
+                user=User.objects.create(username=f'client{i}'),
+                full_name=f'Клиент {i}',
+            )
+            for i in range(3)
+        ]
+        html = str(TransactionFilterForm()['client'])
+        self.assertIn('data-autocomplete-url="/admin-dashboard/', html)
+        self.assertNotIn('Клиент 0', html)
+
+        form = TransactionFilterForm(data={'client': profiles[1].id})
+        self.assertTrue(form.is_valid())
+        html = str(form['client'])
+        self.assertIn(f'Клиент 1 (ID {profiles[1].id})', html)
+        self.assertIn('selected', html)
+        self.assertNotIn('Клиент 0', html)
+        self.assertNotIn('Клиент 2', html)
+
+    def test_client_widget_ignores_non_ascii_digits(self):
+        """Проверка формы с надстрочной цифрой вместо id клиента."""
+        form = TransactionFilterForm(data={'client': '²'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('value="" selected', str(form['client']))
+
 
 class ClientFilterFormTests(TestCase):
     """Тесты для формы фильтрации клиентов."""
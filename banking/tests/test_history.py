@@ -0,0 +1,154 @@
+"""
+Тесты подгрузки истории счёта в кабинете клиента (client_history).
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking import summaries
+from banking.models import Account, ClientProfile, Transaction
+
+
+User = get_user_model()
+
+
+class ClientHistoryTests(TestCase):
+    """Тесты страниц истории по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание клиента со счётом из 35 операций."""
+        cls.user = User.objects.create_user(
+            username='client', password='testpass123'
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user, full_name='Иван Клиент'
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.short = Account.objects.create(
+            client=cls.profile, account_number='40817810000000000002'
+        )
+        for i in range(35):
+            Transaction.objects.create(
+                account=cls.account,
+                transaction_type=Transaction.TransactionType.WITHDRAWAL,
+                amount=Decimal('10.00') + i,
+                status=Transaction.Status.COMPLETED,
+                metadata={
+                    'counterparty_account_number': cls.short.account_number
+                },
+            )
+        other = ClientProfile.objects.create(
+            user=User.objects.create(username='other'),
+            full_name='Другой Клиент',
+        )
+        cls.foreign = Account.objects.create(
+            client=other, account_number='40817810000000000003'
+        )
+
+    def setUp(self):
+        """Вход клиента и очистка кэша сводок."""
+        summaries.summary_cache().clear()
+        self.client.login(username='client', password='testpass123')
+
+    def _summary(self, account):
+        response = self.client.get(reverse('banking:client_dashboard'))
+        return next(
+            item
+            for item in response.context['accounts']
+            if item.account == account
+        )
+
+    def _page(self, cursor, account=None):
+        return self.client.get(
+            reverse('banking:client_history'),
+            {'account': (account or self.account).id, 'cursor': cursor},
+        )
+
+    def test_pages_continue_dashboard_history(self):
+        """Проверка продолжения истории без пропусков и повторов."""
+        item = self._summary(self.account)
+        seen = [t.id for t in item.transactions]
+        cursor = item.next_cursor
+        sizes = []
+        while cursor:
+            data = self._page(cursor).json()
+            sizes.append(len(data['results']))
+            seen.extend(row['id'] for row in data['results'])
+            cursor = data['next_cursor']
+            self.assertEqual(data['has_more'], cursor is not None)
+        self.assertEqual(sizes, [20, 5])
+        expected = list(
+            self.account.transactions.order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_short_history_has_no_cursor(self):
+        """Проверка, что у короткой истории нет кнопки продолжения."""
+        self.assertIsNone(self._summary(self.short).next_cursor)
+        response = self.client.get(reverse('banking:client_dashboard'))
+        self.assertContains(response, 'data-cursor=', count=1)
+
+    def test_row_fields(self):
+        """Проверка полей строки истории."""
+        cursor = self._summary(self.account).next_cursor
+        row = self._page(cursor).json()['results'][0]
+        transaction = Transaction.objects.get(pk=row['id'])
+        self.assertEqual(row['amount'], f'-{transaction.amount}')
+        self.assertTrue(row['amount_display'].startswith('−'))
+        self.assertTrue(row['debit'])
+        self.assertEqual(row['type_label'], 'Снятие')
+        self.assertEqual(row['status_label'], 'Завершена')
+        self.assertEqual(row['counterparty'], self.short.account_number)
+        self.assertEqual(
+            row['receipt_url'],
+            reverse('banking:transaction_receipt', args=[transaction.pk]),
+        )
+
+    def test_page_cost_does_not_depend_on_depth(self):
+        """Проверка, что страницы читаются без COUNT и одинаково дёшево."""
+        first = self._summary(self.account).next_cursor
+        counts = []
+        cursor = first
+        while cursor:
+            with CaptureQueriesContext(connection) as queries:
+                data = self._page(cursor).json()
+            sql = ' '.join(query['sql'] for query in queries)
+            self.assertNotIn('COUNT(', sql)
+            counts.append(len(queries))
+            cursor = data['next_cursor']
+        self.assertEqual(len(set(counts)), 1)
+
+    def test_foreign_account_is_not_found(self):
+        """Проверка, что история чужого счёта недоступна."""
+        cursor = self._summary(self.account).next_cursor
+        self.assertEqual(
+            self._page(cursor, account=self.foreign).status_code, 404
+        )
+        response = self.client.get(reverse('banking:client_history'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_non_ascii_digits_are_not_found(self):
+        """Проверка ответа 404 на надстрочные и арабские цифры в id."""
+        for account_id in ('²', '٣', f'{self.account.id}²'):
+            with self.subTest(account=account_id):
+                response = self.client.get(
+                    reverse('banking:client_history'),
+                    {'account': account_id},
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_invalid_cursor_is_rejected(self):
+        """Проверка ответа 400 на повреждённый курсор."""
+        response = self._page('not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
@@ -0,0 +1,312 @@
+"""
+Тесты идемпотентности клиентских операций (banking.idempotency).
+
+Проверяют, что повтор запроса с тем же ключом возвращает исходный
+результат, не создавая новую операцию и не меняя балансы.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from banking import idempotency
+from banking.idempotency import ReplayCache
+from banking.models import Account, ClientProfile, IdempotencyKey, Transaction
+from banking.services import (
+    create_and_process_transaction,
+    create_and_process_transfer,
+    finalize_transaction,
+)
+
+
+User = get_user_model()
+
+
+class IdempotentServicesTests(TestCase):
+    """Тесты повторных вызовов сервисов с ключом идемпотентности."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user = User.objects.create_user(
+            username='client',
+            password='testpass123',
+        )
+        cls.target_user = User.objects.create_user(
+            username='target',
+            password='testpass123',
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user,
+            full_name='Иван Клиент',
+        )
+        cls.target_profile = ClientProfile.objects.create(
+            user=cls.target_user,
+            full_name='Получатель',
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.target_account = Account.objects.create(
+            client=cls.target_profile,
+            account_number='40817810000000000002',
+            balance=Decimal('500.00'),
+        )
+
+    def setUp(self):
+        """Очистка кэша результатов между тестами."""
+        idempotency.replay_cache.clear()
+
+    def _deposit(self, key, amount='100.00'):
+        with patch('banking.services.time.sleep', return_value=None):
+            return create_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal(amount),
+                idempotency_key=key,
+            )
+
+    def test_duplicate_deposit_returns_original_result(self):
+        """Проверка, что повтор не создаёт вторую операцию."""
+        first = self._deposit('1:deposit:abc')
+        second = self._deposit('1:deposit:abc')
+
+        self.account.refresh_from_db()
+        self.assertIs(second, first)
+        self.assertTrue(second.completed)
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(self.account.balance, Decimal('1100.00'))
+
+    def test_replay_from_database_without_cache(self):
+        """Проверка повтора после потери кэша (другой процесс)."""
+        first = self._deposit('1:deposit:abc')
+        idempotency.replay_cache.clear()
+
+        with self.assertNumQueries(1):
+            second = self._deposit('1:deposit:abc')
+
+        self.assertEqual(second.transaction.pk, first.transaction.pk)
+        self.assertTrue(second.completed)
+        self.assertEqual(second.message, first.message)
+
+    def test_different_keys_create_different_operations(self):
+        """Проверка, что разные ключи не мешают друг другу."""
+        self._deposit('1:deposit:abc')
+        self._deposit('1:deposit:def')
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1200.00'))
+
+    def test_duplicate_transfer_is_not_settled_twice(self):
+        """Проверка повтора перевода."""
+        for _ in range(2):
+            with patch('banking.services.time.sleep', return_value=None):
+                result = create_and_process_transfer(
+                    source_account=self.account,
+                    target_account=self.target_account,
+                    amount=Decimal('300.00'),
+                    idempotency_key='1:transfer:abc',
+                )
+            self.assertTrue(result.completed)
+
+        self.account.refresh_from_db()
+        self.target_account.refresh_from_db()
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(self.account.balance, Decimal('700.00'))
+        self.assertEqual(self.target_account.balance, Decimal('800.00'))
+
+    def test_rejected_operation_is_replayed_as_rejected(self):
+        """Проверка повтора операции, отклонённой по лимиту."""
+        for _ in range(2):
+            result = create_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.WITHDRAWAL,
+                amount=Decimal('200000.00'),
+                idempotency_key='1:withdrawal:abc',
+            )
+            self.assertFalse(result.completed)
+            self.assertIn('Превышен лимит', result.message)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    @override_settings(BANKING_SETTLEMENT_MODE='background')
+    def test_in_flight_duplicate_is_reported_as_pending(self):
+        """Проверка повтора, пока исходная операция ещё в обработке."""
+        first = self._deposit('1:deposit:abc')
+        IdempotencyKey.objects.update(message='')
+        idempotency.replay_cache.clear()
+
+        second = self._deposit('1:deposit:abc')
+
+        self.assertTrue(second.pending)
+        self.assertEqual(second.transaction.pk, first.transaction.pk)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_key_with_other_parameters_is_rejected(self):
+        """Проверка, что ключ не возвращает результат другой операции."""
+        self._deposit('1:deposit:abc')
+        for clear_cache in (False, True):
+            if clear_cache:
+                idempotency.replay_cache.clear()
+            with self.assertRaises(idempotency.KeyReused):
+                self._deposit('1:deposit:abc', amount='900.00')
+        # Та же сумма в другой записи — повтор.
+        self.assertTrue(self._deposit('1:deposit:abc', amount='100').completed)
+        self.account.refresh_from_db()
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(self.account.balance, Decimal('1100.00'))
+
+    @override_settings(BANKING_SETTLEMENT_MODE='background')
+    def test_pending_result_is_not_cached(self):
+        """Проверка итога повтора после проведения операции воркером."""
+        first = self._deposit('1:deposit:abc')
+        self.assertTrue(first.pending)
+        self.assertEqual(len(idempotency.replay_cache), 0)
+        self.assertTrue(self._deposit('1:deposit:abc').pending)
+
+        finalize_transaction(first.transaction.id)
+        second = self._deposit('1:deposit:abc')
+        self.assertTrue(second.completed)
+        self.assertFalse(second.pending)
+        self.assertEqual(second.transaction.pk, first.transaction.pk)
+        self.assertFalse(IdempotencyKey.objects.get().pending)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_expired_keys_are_purged(self):
+        """Проверка удаления ключей старше времени жизни."""
+        self._deposit('1:deposit:old')
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(
+                seconds=idempotency.ttl_seconds() + 1
+            )
+        )
+        with patch.object(idempotency, 'PURGE_INTERVAL', 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._deposit('1:deposit:new')
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list('key', flat=True)),
+            ['1:deposit:new'],
+        )
+
+    def test_reserve_rejects_duplicate_key(self):
+        """Проверка уникальности ключа в таблице."""
+        transaction = Transaction.objects.create(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        idempotency.reserve('1:deposit:abc', transaction)
+        with self.assertRaises(idempotency.DuplicateRequest):
+            idempotency.reserve('1:deposit:abc', transaction)
+
+
+class ReplayCacheTests(TestCase):
+    """Тесты LRU-кэша результатов."""
+
+    def test_evicts_least_recently_used(self):
+        """Проверка вытеснения самого старого по обращению ключа."""
+        cache = ReplayCache(max_size=2, ttl_seconds=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_items_are_dropped(self):
+        """Проверка вытеснения по времени жизни."""
+        cache = ReplayCache(max_size=10, ttl_seconds=60)
+        with patch('banking.idempotency.time.monotonic', return_value=0):
+            cache.set('a', 1)
+        with patch('banking.idempotency.time.monotonic', return_value=61):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class IdempotentDashboardPostTests(TestCase):
+    """Тесты повторной отправки формы клиентского кабинета."""
+
+    def setUp(self):
+        """Настройка тестовых данных."""
+        idempotency.replay_cache.clear()
+        self.user = User.objects.create_user(
+            username='client',
+            password='testpass123',
+        )
+        self.profile = ClientProfile.objects.create(
+            user=self.user,
+            full_name='Иван Клиент',
+        )
+        self.account = Account.objects.create(
+            client=self.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        self.client.login(username='client', password='testpass123')
+
+    def test_dashboard_renders_idempotency_key(self):
+        """Проверка скрытого поля с ключом в формах."""
+        response = self.client.get(reverse('banking:client_dashboard'))
+        self.assertContains(
+            response,
+            f'value="{response.context["idempotency_key"]}"',
+            count=3,
+        )
+
+    @patch('banking.services.time.sleep')
+    def test_resubmitted_form_is_processed_once(self, mock_sleep):
+        """Проверка повторной отправки формы пополнения."""
+        data = {
+            'form_type': 'deposit',
+            'amount': '250.00',
+            'idempotency_key': 'form-key',
+        }
+        first = self.client.post(reverse('banking:client_dashboard'), data)
+        second = self.client.post(reverse('banking:client_dashboard'), data)
+
+        self.account.refresh_from_db()
+        self.assertEqual(first['Location'], second['Location'])
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(self.account.balance, Decimal('1250.00'))
+        mock_sleep.assert_called_once()
+
+    @patch('banking.services.time.sleep')
+    def test_header_key_takes_precedence(self, mock_sleep):
+        """Проверка ключа из заголовка Idempotency-Key."""
+        url = reverse('banking:client_dashboard')
+        for form_key in ('one', 'two'):
+            self.client.post(
+                url,
+                {
+                    'form_type': 'deposit',
+                    'amount': '250.00',
+                    'idempotency_key': form_key,
+                },
+                headers={'Idempotency-Key': 'till-42'},
+            )
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    @patch('banking.services.time.sleep')
+    def test_reused_key_returns_422(self, mock_sleep):
+        """Проверка ответа 422 на ключ с другой суммой."""
+        url = reverse('banking:client_dashboard')
+        for amount, status in (('250.00', 302), ('300.00', 422)):
+            response = self.client.post(
+                url,
+                {
+                    'form_type': 'deposit',
+                    'amount': amount,
+                    'idempotency_key': 'form-key',
+                },
+            )
+            self.assertEqual(response.status_code, status)
+        self.assertContains(
+            response, 'Форма уже отправлена с другими данными', status_code=422
+        )
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1250.00'))
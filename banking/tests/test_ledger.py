@@ -0,0 +1,308 @@
+"""
+Тесты журнала операций и контрольных точек (banking.ledger).
+
+Проверяют запись изменений балансов при проведении и отмене операций,
+восстановление баланса на момент времени и сверку Account.balance.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from banking.ledger import balance_as_of, create_checkpoint, verify_account
+from banking.models import (
+    Account,
+    BalanceCheckpoint,
+    ClientProfile,
+    LedgerEntry,
+    Transaction,
+)
+from banking.services import (
+    cancel_transaction,
+    create_and_process_transaction,
+    create_and_process_transfer,
+    finalize_transaction,
+    ledger_flushed,
+)
+
+
+User = get_user_model()
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class LedgerEntriesTests(TestCase):
+    """Тесты записей журнала."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user = User.objects.create_user(
+            username='client',
+            password='testpass123',
+        )
+        cls.target_user = User.objects.create_user(
+            username='target',
+            password='testpass123',
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user,
+            full_name='Иван Клиент',
+        )
+        cls.target_profile = ClientProfile.objects.create(
+            user=cls.target_user,
+            full_name='Получатель',
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.target_account = Account.objects.create(
+            client=cls.target_profile,
+            account_number='40817810000000000002',
+            balance=Decimal('500.00'),
+        )
+
+    def _deposit(self, amount):
+        return create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal(amount),
+        )
+
+    def test_operations_append_signed_entries(self, mock_sleep):
+        """Проверка записей со знаком и балансом после операции."""
+        deposit = self._deposit('200.00')
+        create_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target_account,
+            amount=Decimal('300.00'),
+        )
+
+        entries = list(
+            LedgerEntry.objects.values_list(
+                'account_id', 'amount', 'balance_after'
+            )
+        )
+        self.assertEqual(
+            entries,
+            [
+                (self.account.id, Decimal('200.00'), Decimal('1200.00')),
+                (self.account.id, Decimal('-300.00'), Decimal('900.00')),
+                (
+                    self.target_account.id,
+                    Decimal('300.00'),
+                    Decimal('800.00'),
+                ),
+            ],
+        )
+        self.assertEqual(
+            LedgerEntry.objects.first().transaction_id,
+            deposit.transaction.id,
+        )
+
+    def test_cancellation_appends_reversal(self, mock_sleep):
+        """Проверка, что отмена добавляет обратную запись."""
+        deposit = self._deposit('200.00')
+        cancel_transaction(deposit.transaction.id, reason='Тест')
+
+        amounts = list(
+            LedgerEntry.objects.values_list('amount', 'balance_after')
+        )
+        self.assertEqual(
+            amounts,
+            [
+                (Decimal('200.00'), Decimal('1200.00')),
+                (Decimal('-200.00'), Decimal('1000.00')),
+            ],
+        )
+
+    def test_rejected_withdrawal_writes_nothing(self, mock_sleep):
+        """Проверка, что отклонённое списание не попадает в журнал."""
+        transaction = Transaction.objects.create(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.WITHDRAWAL,
+            amount=Decimal('5000.00'),
+        )
+        finalize_transaction(transaction.id)
+        self.assertFalse(LedgerEntry.objects.exists())
+
+    def test_flush_sends_ledger_flushed(self, mock_sleep):
+        """Проверка сигнала с записями журнала и статусами операций."""
+        sent = []
+
+        def receiver(sender, entries, watched, **kwargs):
+            sent.append((
+                [(account.id, amount) for account, amount, _ in entries],
+                [(t.status, status) for t, status in watched],
+            ))
+
+        ledger_flushed.connect(receiver)
+        self.addCleanup(ledger_flushed.disconnect, receiver)
+        self._deposit('200.00')
+        self.assertEqual(
+            sent,
+            [(
+                [(self.account.id, Decimal('200.00'))],
+                [(Transaction.Status.COMPLETED, Transaction.Status.PENDING)],
+            )],
+        )
+
+    @override_settings(BANKING_LEDGER_MODE='conditional')
+    def test_cancel_updates_accounts_in_id_order(self, mock_sleep):
+        """Проверка порядка UPDATE счетов при отмене перевода."""
+        result = create_and_process_transfer(
+            source_account=self.target_account,
+            target_account=self.account,
+            amount=Decimal('100.00'),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            cancel_transaction(result.transaction.id, reason='Тест')
+        updated = [
+            account_id
+            for query in queries
+            if query['sql'].startswith('UPDATE "banking_account"')
+            for account_id in (self.account.id, self.target_account.id)
+            if f'"id" = {account_id}' in query['sql']
+        ]
+        self.assertEqual(updated, [self.account.id, self.target_account.id])
+        self.account.refresh_from_db()
+        self.target_account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1000.00'))
+        self.assertEqual(self.target_account.balance, Decimal('500.00'))
+
+    @override_settings(BANKING_LEDGER_MODE='conditional')
+    def test_conditional_ledger_records_entries(self, mock_sleep):
+        """Проверка журнала в режиме условных UPDATE."""
+        self._deposit('200.00')
+        result = create_and_process_transfer(
+            source_account=self.target_account,
+            target_account=self.account,
+            amount=Decimal('600.00'),
+        )
+        self.assertFalse(result.completed)
+        self.assertEqual(
+            list(LedgerEntry.objects.values_list('amount', 'balance_after')),
+            [(Decimal('200.00'), Decimal('1200.00'))],
+        )
+        self.account.refresh_from_db()
+        self.assertEqual(verify_account(self.account), [])
+
+    def test_entries_are_append_only(self, mock_sleep):
+        """Проверка запрета изменения и удаления записей."""
+        self._deposit('200.00')
+        entry = LedgerEntry.objects.get()
+        entry.amount = Decimal('1.00')
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_balance_as_of(self, mock_sleep):
+        """Проверка баланса на момент времени."""
+        start = timezone.now()
+        self._deposit('200.00')
+        LedgerEntry.objects.update(created_at=start + timedelta(hours=1))
+        self._deposit('50.00')
+        LedgerEntry.objects.filter(amount=Decimal('50.00')).update(
+            created_at=start + timedelta(hours=2)
+        )
+
+        self.assertEqual(
+            balance_as_of(self.account, start), Decimal('1000.00')
+        )
+        self.assertEqual(
+            balance_as_of(self.account, start + timedelta(minutes=90)),
+            Decimal('1200.00'),
+        )
+        self.assertEqual(
+            balance_as_of(self.account, start + timedelta(hours=3)),
+            Decimal('1250.00'),
+        )
+        self.assertEqual(
+            balance_as_of(self.target_account, start), Decimal('500.00')
+        )
+
+    def test_verify_detects_out_of_band_change(self, mock_sleep):
+        """Проверка обнаружения изменения баланса в обход журнала."""
+        self._deposit('200.00')
+        self.account.refresh_from_db()
+        self.assertEqual(verify_account(self.account), [])
+        Account.objects.filter(pk=self.account.pk).update(
+            balance=Decimal('99999.00')
+        )
+        self.account.refresh_from_db()
+        self.assertEqual(len(verify_account(self.account)), 1)
+        self.assertIsNone(create_checkpoint(self.account))
+
+    def test_checkpoint_limits_verification_tail(self, mock_sleep):
+        """Проверка, что сверка начинается с контрольной точки."""
+        self._deposit('200.00')
+        checkpoint = create_checkpoint(self.account)
+        self.assertEqual(checkpoint.balance, Decimal('1200.00'))
+        self.assertEqual(
+            checkpoint.last_entry, LedgerEntry.objects.get()
+        )
+        self._deposit('50.00')
+        self.account.refresh_from_db()
+        with self.assertNumQueries(2):
+            self.assertEqual(verify_account(self.account), [])
+
+    def test_checkpoint_command(self, mock_sleep):
+        """Проверка команды create_balance_checkpoints."""
+        self._deposit('200.00')
+        out = StringIO()
+        call_command('create_balance_checkpoints', stdout=out)
+        self.assertEqual(BalanceCheckpoint.objects.count(), 2)
+        self.assertIn('с расхождениями: 0', out.getvalue())
+
+        Account.objects.filter(pk=self.account.pk).update(
+            balance=Decimal('1.00')
+        )
+        with self.assertRaises(CommandError):
+            call_command(
+                'create_balance_checkpoints',
+                '--verify-only',
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+
+# Команды создают десятки пользователей: быстрый хешер паролей.
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+@patch('banking.services.time.sleep', return_value=None)
+class SeedCommandJournalTests(TestCase):
+    """Тесты журнала после команд загрузки демонстрационных данных."""
+
+    def _run_twice(self, *args):
+        call_command(*args, stdout=StringIO())
+        account = Account.objects.order_by('id').first()
+        create_and_process_transaction(
+            account=account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        self.assertTrue(LedgerEntry.objects.filter(account=account).exists())
+        call_command(*args, stdout=StringIO())
+        for account in Account.objects.all():
+            self.assertEqual(verify_account(account), [], account)
+
+    def test_load_test_data_twice(self, mock_sleep):
+        """Проверка повторной загрузки после проведённой операции."""
+        self._run_twice('load_test_data')
+        self.assertEqual(
+            BalanceCheckpoint.objects.count(), Account.objects.count()
+        )
+
+    def test_generate_accounts_twice(self, mock_sleep):
+        """Проверка повторной генерации счетов."""
+        self._run_twice('generate_accounts', '--count', '5')
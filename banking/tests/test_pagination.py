@@ -0,0 +1,182 @@
+"""
+Тесты постраничного вывода по ключу (banking.pagination).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from banking.models import Account, ClientProfile, Transaction
+from banking.pagination import (
+    InvalidCursor,
+    KeysetPaginator,
+    estimate_count,
+)
+
+
+User = get_user_model()
+
+
+class KeysetPaginatorTests(TestCase):
+    """Тесты KeysetPaginator."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание 12 операций, по две с одинаковым временем."""
+        profile = ClientProfile.objects.create(
+            user=User.objects.create(username='client'),
+            full_name='Иван Клиент',
+        )
+        cls.account = Account.objects.create(
+            client=profile,
+            account_number='40817810000000000001',
+        )
+        base = timezone.now()
+        for index in range(12):
+            transaction = Transaction.objects.create(
+                account=cls.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('10.00'),
+            )
+            Transaction.objects.filter(pk=transaction.pk).update(
+                created_at=base - timedelta(minutes=index // 2)
+            )
+        cls.expected = list(
+            Transaction.objects.order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def _paginator(self, **kwargs):
+        return KeysetPaginator(Transaction.objects.all(), 5, **kwargs)
+
+    def test_walks_forward_and_back(self):
+        """Проверка обхода вперёд и назад без пропусков и повторов."""
+        paginator = self._paginator()
+        first = paginator.page()
+        self.assertFalse(first.has_previous)
+        self.assertTrue(first.has_next)
+
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertFalse(third.has_next)
+        seen = [t.id for page in (first, second, third) for t in page]
+        self.assertEqual(seen, self.expected)
+
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual([t.id for t in back], [t.id for t in second])
+        self.assertTrue(back.has_previous)
+        self.assertTrue(back.has_next)
+        start = paginator.page(back.previous_cursor)
+        self.assertEqual([t.id for t in start], [t.id for t in first])
+        self.assertFalse(start.has_previous)
+
+    def test_broken_cursor_is_rejected(self):
+        """Проверка отказа от повреждённого курсора."""
+        paginator = self._paginator()
+        cursor = paginator.page().next_cursor
+        for broken in ('garbage', cursor[:-3], 'WzFd'):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(broken)
+        self.assertEqual(
+            [t.id for t in paginator.get_page('garbage')],
+            self.expected[:5],
+        )
+
+    def test_deep_page_reads_constant_rows(self):
+        """Проверка запроса без OFFSET и COUNT."""
+        paginator = self._paginator()
+        page = paginator.page(paginator.page().next_cursor)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(page.next_cursor)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+        self.assertIn('LIMIT 6', sql)
+
+    def test_total_is_lazy(self):
+        """Проверка, что общее число вычисляется только по запросу."""
+        calls = []
+
+        def total():
+            calls.append(1)
+            return 12
+
+        paginator = self._paginator(total=total)
+        page = paginator.page()
+        self.assertEqual(calls, [])
+        self.assertEqual(page.total, 12)
+        self.assertEqual(page.total, 12)
+        self.assertEqual(calls, [1])
+
+    def test_estimate_count_is_capped(self):
+        """Проверка подсчёта не больше limit + 1 строк без PostgreSQL."""
+        transactions = Transaction.objects.all()
+        self.assertEqual(estimate_count(transactions, limit=12), 12)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(estimate_count(transactions, limit=5))
+        self.assertIn('LIMIT 6', queries[0]['sql'].upper())
+
+
+class AdminTransactionPaginationTests(TestCase):
+    """Тесты курсоров списка операций в админ-панели."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        profile = ClientProfile.objects.create(
+            user=User.objects.create(username='client'),
+            full_name='Иван Клиент',
+        )
+        account = Account.objects.create(
+            client=profile,
+            account_number='40817810000000000001',
+        )
+        for status in ('completed', 'cancelled') * 30:
+            Transaction.objects.create(
+                account=account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('10.00'),
+                status=status,
+            )
+
+    def setUp(self):
+        self.client.login(username='admin', password='testpass123')
+
+    def test_cursor_keeps_filters(self):
+        """Проверка перехода по курсору с сохранением фильтра."""
+        url = reverse('banking:admin_dashboard')
+        response = self.client.get(url, {'status': 'completed'})
+        page = response.context['transactions']
+        self.assertEqual(len(page), 25)
+        self.assertEqual(page.total, 30)
+        self.assertContains(response, page.next_cursor)
+
+        response = self.client.get(
+            url,
+            {'status': 'completed', 'transaction_cursor': page.next_cursor},
+        )
+        page = response.context['transactions']
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next)
+        self.assertTrue(
+            all(t.status == 'completed' for t in page.object_list)
+        )
+
+    def test_section_without_rows_does_not_count(self):
+        """Проверка, что число строк считается, только если выводится."""
+        url = reverse('banking:admin_dashboard_transactions')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'transaction_type': 'withdrawal'})
+        self.assertEqual(len(response.context['transactions']), 0)
+        self.assertFalse(
+            any('COUNT(' in query['sql'].upper() for query in queries)
+        )
@@ -0,0 +1,165 @@
+"""
+Тесты кэша квитанций и ответов 304 (banking.receipts).
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking import receipts
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import (
+    cancel_transaction,
+    create_and_process_transaction,
+)
+
+
+User = get_user_model()
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class ReceiptCacheTests(TestCase):
+    """Тесты кэширования квитанций."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание сотрудника, клиента и счёта."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        cls.user = User.objects.create_user(
+            username='client', password='testpass123'
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user, full_name='Иван Клиент'
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        ClientProfile.objects.create(user=other, full_name='Другой Клиент')
+
+    def setUp(self):
+        """Очистка кэша квитанций и вход клиента."""
+        receipts.receipt_cache().clear()
+        self.client.login(username='client', password='testpass123')
+
+    def _deposit(self, amount='250.00'):
+        return create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal(amount),
+        ).transaction
+
+    def _get(self, transaction, **headers):
+        url = reverse('banking:transaction_receipt', args=[transaction.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        # Полная загрузка операции для отрисовки квитанции.
+        loads = [
+            query['sql']
+            for query in queries
+            if '"banking_transaction"."note"' in query['sql']
+        ]
+        return response, loads
+
+    def test_completed_receipt_is_cached(self, mock_sleep):
+        """Проверка, что квитанция рисуется из кэша со второго раза."""
+        transaction = self._deposit()
+        response, loaded = self._get(transaction)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(loaded)
+        response, loaded = self._get(transaction)
+        self.assertEqual(loaded, [])
+        self.assertContains(response, transaction.reference)
+        self.assertContains(response, 'Завершена')
+        self.assertIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_if_none_match_returns_304(self, mock_sleep):
+        """Проверка ответа 304 на совпадающий ETag."""
+        transaction = self._deposit()
+        response, _ = self._get(transaction)
+        etag = response['ETag']
+        response, loaded = self._get(transaction, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(loaded, [])
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_differs_per_user(self, mock_sleep):
+        """Проверка, что ETag сотрудника не совпадает с клиентским."""
+        transaction = self._deposit()
+        client_etag = self._get(transaction)[0]['ETag']
+        self.client.login(username='admin', password='testpass123')
+        response, _ = self._get(transaction, if_none_match=client_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отменить транзакцию')
+
+    def test_etag_changes_after_login(self, mock_sleep):
+        """Проверка, что после нового входа форма получает новый CSRF."""
+        transaction = self._deposit()
+        etag = self._get(transaction)[0]['ETag']
+        self.client.logout()
+        self.client.login(username='client', password='testpass123')
+        response, _ = self._get(transaction, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_role(self, mock_sleep):
+        """Проверка, что после смены роли кнопки рисуются заново."""
+        transaction = self._deposit()
+        etag = self._get(transaction)[0]['ETag']
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response, _ = self._get(transaction, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отменить транзакцию')
+
+    def test_cached_receipt_is_not_shown_to_other_client(self, mock_sleep):
+        """Проверка прав при квитанции в кэше."""
+        transaction = self._deposit()
+        etag = self._get(transaction)[0]['ETag']
+        self.client.login(username='other', password='testpass123')
+        response, _ = self._get(transaction)
+        self.assertEqual(response.status_code, 404)
+        response, _ = self._get(transaction, if_none_match=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_cancel_renders_new_receipt(self, mock_sleep):
+        """Проверка новой квитанции после отмены операции."""
+        transaction = self._deposit()
+        etag = self._get(transaction)[0]['ETag']
+        cancel_transaction(transaction.id, reason='Отмена.')
+        response, loaded = self._get(transaction, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(loaded)
+        self.assertContains(response, 'Отменена')
+        self.assertContains(response, '1000,00 ₽')
+
+    def test_pending_receipt_is_rendered_live(self, mock_sleep):
+        """Проверка, что квитанция в обработке не кэшируется."""
+        transaction = Transaction.objects.create(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('10.00'),
+        )
+        response, loaded = self._get(transaction)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'В обработке')
+        _, loaded = self._get(transaction)
+        self.assertTrue(loaded)
+
+    def test_balance_after_comes_from_ledger(self, mock_sleep):
+        """Проверка баланса на момент операции, а не текущего."""
+        first = self._deposit('250.00')
+        self._deposit('100.00')
+        response, _ = self._get(first)
+        self.assertContains(response, '1250,00 ₽')
+        self.assertNotContains(response, '1350,00 ₽')
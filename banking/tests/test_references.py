@@ -0,0 +1,178 @@
+"""
+Тесты выдачи номеров операций (banking.references).
+"""
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from banking.checks import check_reference_node, check_reference_node_is_set
+from banking.models import Account, ClientProfile, Transaction
+from banking.references import ReferenceAllocator, node_id, to_base36
+
+
+User = get_user_model()
+
+# 2025-01-01 12:00:00 UTC
+BASE_TIME = 1735732800
+
+
+class FakeClock:
+    def __init__(self, value=BASE_TIME):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+class ReferenceAllocatorTests(SimpleTestCase):
+    """Тесты генератора номеров."""
+
+    def test_format(self):
+        """Проверка читаемого формата и длины номера."""
+        allocator = ReferenceAllocator(node=37, pid=36, clock=FakeClock())
+        self.assertEqual(allocator.next(), 'TRX-20250101120000-1100010-0')
+        self.assertEqual(allocator.next(), 'TRX-20250101120000-1100010-1')
+        self.assertLessEqual(len(allocator.allocate(36**4)[-1]), 32)
+
+    def test_sequence_restarts_each_second(self):
+        """Проверка сброса номера при смене секунды."""
+        clock = FakeClock()
+        allocator = ReferenceAllocator(node=0, pid=1, clock=clock)
+        allocator.next()
+        clock.value += 1
+        self.assertEqual(allocator.next(), 'TRX-20250101120001-0000001-0')
+
+    def test_clock_going_back_does_not_repeat(self):
+        """Проверка, что перевод часов назад не даёт повторов."""
+        clock = FakeClock()
+        allocator = ReferenceAllocator(node=0, pid=1, clock=clock)
+        first = allocator.next()
+        clock.value -= 10
+        second = allocator.next()
+        self.assertNotEqual(first, second)
+        self.assertIn('20250101120000', second)
+
+    @patch('banking.references.SEQUENCE_LIMIT', 3)
+    def test_exhausted_second_moves_to_next(self):
+        """Проверка перехода на следующую секунду при исчерпании номеров."""
+        allocator = ReferenceAllocator(node=0, pid=1, clock=FakeClock())
+        references = [allocator.next() for _ in range(4)]
+        references += allocator.allocate(4)
+        self.assertEqual(len(set(references)), 8)
+        self.assertEqual(references[3], 'TRX-20250101120001-0000001-0')
+
+    def test_allocate_and_next_do_not_overlap(self):
+        """Проверка уникальности пакетной и одиночной выдачи."""
+        allocator = ReferenceAllocator(node=0, pid=1, clock=FakeClock())
+        references = allocator.allocate(50000)
+        references.append(allocator.next())
+        references += allocator.allocate(10)
+        self.assertEqual(len(set(references)), len(references))
+
+    def test_backdated_references_use_given_moment(self):
+        """Проверка метки номеров, выданных задним числом."""
+        clock = FakeClock()
+        allocator = ReferenceAllocator(node=0, pid=1, clock=clock)
+        moment = datetime(2024, 6, 1, 9, 30, 15, tzinfo=timezone.utc)
+        references = [allocator.next(moment), allocator.next(moment)]
+        references += allocator.allocate(3, at=moment)
+        self.assertEqual(references[0], 'TRX-20240601093015-0000001-0')
+        self.assertEqual(references[-1], 'TRX-20240601093015-0000001-4')
+        self.assertEqual(len(set(references)), 5)
+        later = datetime.fromtimestamp(BASE_TIME + 5, tz=timezone.utc)
+        self.assertEqual(
+            allocator.next(later), 'TRX-20250101120000-0000001-0'
+        )
+
+    @patch('banking.references.SEQUENCE_LIMIT', 3)
+    def test_exhausted_backdated_second_moves_to_previous(self):
+        """Проверка перехода на предыдущую секунду задним числом."""
+        allocator = ReferenceAllocator(node=0, pid=1, clock=FakeClock())
+        moment = datetime(2024, 6, 1, 9, 30, 15, tzinfo=timezone.utc)
+        references = allocator.allocate(4, at=moment)
+        self.assertEqual(len(set(references)), 4)
+        self.assertEqual(references[3], 'TRX-20240601093014-0000001-0')
+
+    def test_threads_get_unique_references(self):
+        """Проверка уникальности при выдаче из многих потоков."""
+        allocator = ReferenceAllocator(node=0, pid=1)
+        results = []
+
+        def worker():
+            results.append([allocator.next() for _ in range(5000)])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        issued = [reference for chunk in results for reference in chunk]
+        self.assertEqual(len(set(issued)), 40000)
+
+    def test_processes_and_nodes_differ(self):
+        """Проверка, что процессы и узлы выдают разные номера."""
+        clock = FakeClock()
+        references = {
+            ReferenceAllocator(node=node, pid=pid, clock=clock).next()
+            for node in (0, 1)
+            for pid in (100, 101)
+        }
+        self.assertEqual(len(references), 4)
+
+    @override_settings(BANKING_REFERENCE_NODE_ID=1295)
+    def test_node_id_from_settings(self):
+        """Проверка узла из настроек."""
+        self.assertEqual(node_id(), 1295)
+        self.assertEqual(to_base36(1295, 2), 'ZZ')
+
+    def test_out_of_range_node_id_is_rejected(self):
+        """Проверка отказа от узла вне 0–1295 вместо остатка от деления."""
+        for value in (1296, -1, 'node-1'):
+            with self.subTest(value=value):
+                with override_settings(BANKING_REFERENCE_NODE_ID=value):
+                    with self.assertRaises(ImproperlyConfigured):
+                        node_id()
+                    self.assertEqual(
+                        [error.id for error in check_reference_node(None)],
+                        ['banking.E001'],
+                    )
+
+    @override_settings(BANKING_REFERENCE_NODE_ID=None)
+    def test_node_id_from_hostname_warns(self):
+        """Проверка предупреждения при узле по имени хоста."""
+        with self.assertLogs('banking.references', 'WARNING'):
+            self.assertLess(node_id(), 1296)
+        self.assertEqual(
+            [warning.id for warning in check_reference_node_is_set(None)],
+            ['banking.W001'],
+        )
+
+
+class TransactionReferenceTests(TestCase):
+    """Тесты номеров, присваиваемых операциям."""
+
+    def test_many_transactions_in_one_second(self):
+        """Проверка отсутствия коллизий при массовом создании."""
+        user = User.objects.create_user(username='client')
+        profile = ClientProfile.objects.create(user=user, full_name='Клиент')
+        account = Account.objects.create(
+            client=profile,
+            account_number='40817810000000000001',
+        )
+        # Прежний формат давал 10 000 вариантов в секунду: 2000 номеров
+        # почти наверняка содержали бы повтор.
+        transactions = Transaction.objects.bulk_create(
+            Transaction(
+                reference=Transaction._generate_reference(),
+                account=account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('1.00'),
+            )
+            for _ in range(2000)
+        )
+        self.assertEqual(len(transactions), 2000)
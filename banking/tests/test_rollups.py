@@ -0,0 +1,295 @@
+"""
+Тесты итогов счетов по месяцам (banking.rollups).
+"""
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking import rollups, summaries
+from banking.models import (
+    Account,
+    ClientProfile,
+    MonthlyAccountRollup,
+    Transaction,
+)
+from banking.services import (
+    cancel_transaction,
+    create_and_process_transaction,
+    create_and_process_transfer,
+    create_and_process_transfers_bulk,
+)
+
+
+User = get_user_model()
+
+COMPLETED = Transaction.Status.COMPLETED
+DEPOSIT = Transaction.TransactionType.DEPOSIT
+
+
+def _create_account(index, balance='0.00'):
+    profile = ClientProfile.objects.create(
+        user=User.objects.create_user(
+            username=f'client{index}', password='testpass123'
+        ),
+        full_name=f'Клиент {index}',
+    )
+    return Account.objects.create(
+        client=profile,
+        account_number=f'408178100000000000{index:02d}',
+        balance=Decimal(balance),
+    )
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class MonthlyRollupTests(TestCase):
+    """Тесты поддержки итогов сервисами и сигналами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание двух счетов."""
+        cls.account = _create_account(1, '1000.00')
+        cls.target = _create_account(2)
+
+    def _row(self, account, transaction_type, status):
+        return rollups.stored_rows([account.id]).get(
+            (account.id, rollups.current_month(), transaction_type, status),
+            (0, 0),
+        )
+
+    def assertRollupsMatch(self):
+        """Итоги в таблице совпадают с подсчётом по операциям."""
+        stored = {
+            key: value
+            for key, value in rollups.stored_rows().items()
+            if value != (0, 0)
+        }
+        self.assertEqual(stored, rollups.compute_rows())
+
+    def test_settlement_moves_pending_to_completed(self, mock_sleep):
+        """Проверка перехода операции в строку нового статуса."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=DEPOSIT,
+            amount=Decimal('250.00'),
+        )
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        self.assertEqual(
+            self._row(self.account, DEPOSIT, COMPLETED),
+            (2, Decimal('350.00')),
+        )
+        self.assertEqual(
+            self._row(self.account, DEPOSIT, Transaction.Status.PENDING),
+            (0, 0),
+        )
+        self.assertRollupsMatch()
+
+    def test_cancel_moves_to_cancelled(self, mock_sleep):
+        """Проверка отмены проведённого перевода."""
+        result = create_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target,
+            amount=Decimal('300.00'),
+        )
+        self.assertEqual(
+            self._row(
+                self.target, Transaction.TransactionType.TRANSFER_IN, COMPLETED
+            ),
+            (1, Decimal('300.00')),
+        )
+        cancel_transaction(result.transaction.id, reason='Ошибка.')
+        self.assertEqual(
+            self._row(
+                self.account,
+                Transaction.TransactionType.TRANSFER_OUT,
+                Transaction.Status.CANCELLED,
+            ),
+            (1, Decimal('300.00')),
+        )
+        self.assertEqual(
+            self._row(
+                self.target, Transaction.TransactionType.TRANSFER_IN, COMPLETED
+            ),
+            (0, 0),
+        )
+        self.assertRollupsMatch()
+
+    def test_bulk_payout_and_delete(self, mock_sleep):
+        """Проверка массовых выплат и удаления операций."""
+        targets = [_create_account(index) for index in range(3, 8)]
+        create_and_process_transfers_bulk(
+            self.account,
+            [(target, Decimal('10.00'), '') for target in targets],
+        )
+        self.assertEqual(
+            self._row(
+                self.account, Transaction.TransactionType.TRANSFER_OUT,
+                COMPLETED,
+            ),
+            (5, Decimal('50.00')),
+        )
+        self.assertRollupsMatch()
+        pending = Transaction.objects.create(
+            account=targets[0], transaction_type=DEPOSIT, amount=Decimal('5')
+        )
+        self.assertRollupsMatch()
+        pending.delete()
+        self.assertRollupsMatch()
+
+    def test_query_count_does_not_depend_on_accounts(self, mock_sleep):
+        """Проверка, что apply() не делает запрос на каждый счёт."""
+        month = rollups.current_month()
+        small = {
+            (self.account.id, month, DEPOSIT, COMPLETED): (1, Decimal('1'))
+        }
+        large = {
+            (account_id, month, DEPOSIT, status): (1, Decimal('1'))
+            for account_id in (self.account.id, self.target.id)
+            for status in Transaction.Status.values
+        }
+        with CaptureQueriesContext(connection) as small_queries:
+            rollups.apply(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            rollups.apply(large)
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(
+            self._row(self.account, DEPOSIT, COMPLETED), (2, Decimal('2'))
+        )
+
+
+class RollupRebuildTests(TestCase):
+    """Тесты пересчёта итогов и команды rebuild_monthly_rollups."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание счёта с операциями за два месяца."""
+        cls.account = _create_account(1)
+        cls.deposit = Transaction.objects.create(
+            account=cls.account,
+            transaction_type=DEPOSIT,
+            amount=Decimal('100.00'),
+            status=COMPLETED,
+        )
+        # 31 января 21:30 UTC — уже 1 февраля в Москве.
+        Transaction.objects.filter(pk=cls.deposit.pk).update(
+            created_at=datetime(2024, 1, 31, 21, 30, tzinfo=dt_timezone.utc)
+        )
+        Transaction.objects.create(
+            account=cls.account,
+            transaction_type=DEPOSIT,
+            amount=Decimal('50.00'),
+            status=COMPLETED,
+        )
+
+    def test_month_follows_local_time(self):
+        """Проверка месяца операции по часовому поясу TIME_ZONE."""
+        self.deposit.refresh_from_db()
+        self.assertEqual(
+            rollups.month_of(self.deposit.created_at), date(2024, 2, 1)
+        )
+        self.assertIn(
+            (self.account.id, date(2024, 2, 1), DEPOSIT, COMPLETED),
+            rollups.compute_rows(),
+        )
+
+    def test_check_and_rebuild(self):
+        """Проверка обнаружения расхождения и пересчёта."""
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_monthly_rollups', '--check', stdout=out, stderr=out
+            )
+        call_command('rebuild_monthly_rollups', stdout=out)
+        self.assertEqual(rollups.stored_rows(), rollups.compute_rows())
+        call_command('rebuild_monthly_rollups', '--check', stdout=out)
+        self.assertIn('сходятся', out.getvalue())
+
+    def test_rebuild_single_account(self):
+        """Проверка пересчёта только указанного счёта."""
+        other = _create_account(2)
+        Transaction.objects.create(
+            account=other, transaction_type=DEPOSIT, amount=Decimal('1.00')
+        )
+        MonthlyAccountRollup.objects.update(count=0, amount=0)
+        call_command(
+            'rebuild_monthly_rollups', '--account', str(other.id),
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            rollups.stored_rows([other.id]), rollups.compute_rows([other.id])
+        )
+        self.assertNotEqual(
+            rollups.stored_rows([self.account.id]),
+            rollups.compute_rows([self.account.id]),
+        )
+
+
+class MonthSummaryViewTests(TestCase):
+    """Тесты итогов месяца в кабинете клиента и админ-панели."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание сотрудника и клиента с операциями месяца."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        cls.account = _create_account(1)
+        for amount, transaction_type in (
+            ('700.00', DEPOSIT),
+            ('300.00', DEPOSIT),
+            ('120.00', Transaction.TransactionType.WITHDRAWAL),
+        ):
+            Transaction.objects.create(
+                account=cls.account,
+                transaction_type=transaction_type,
+                amount=Decimal(amount),
+                status=COMPLETED,
+            )
+
+    def setUp(self):
+        """Очистка кэша сводок."""
+        summaries.summary_cache().clear()
+
+    def test_client_dashboard_shows_month_totals(self):
+        """Проверка итогов месяца по счёту в кабинете."""
+        self.client.login(username='client1', password='testpass123')
+        response = self.client.get(reverse('banking:client_dashboard'))
+        item = response.context['accounts'][0]
+        self.assertEqual(
+            [
+                (total.transaction_type, total.count, total.amount)
+                for total in item.month_totals
+            ],
+            [
+                (DEPOSIT, 2, Decimal('1000.00')),
+                (
+                    Transaction.TransactionType.WITHDRAWAL,
+                    1,
+                    Decimal('120.00'),
+                ),
+            ],
+        )
+        self.assertContains(response, 'Пополнение: 2 на 1000,00 ₽')
+
+    def test_admin_dashboard_shows_month_totals(self):
+        """Проверка оборотов месяца в админ-панели."""
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(reverse('banking:admin_dashboard'))
+        totals = {
+            total.transaction_type: (total.count, total.amount)
+            for total in response.context['month_totals']
+        }
+        self.assertEqual(totals[DEPOSIT], (2, Decimal('1000.00')))
+        self.assertContains(response, 'Пополнение: 2')
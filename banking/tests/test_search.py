@@ -0,0 +1,146 @@
+"""
+Тесты индекса поиска клиентов (banking.search).
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking.models import Account, ClientProfile, ClientSearchToken
+from banking.search import build_tokens, search_clients
+
+
+User = get_user_model()
+
+
+def _create_client(username, full_name, *numbers):
+    profile = ClientProfile.objects.create(
+        user=User.objects.create(username=username),
+        full_name=full_name,
+    )
+    for number in numbers:
+        Account.objects.create(client=profile, account_number=number)
+    return profile
+
+
+class BuildTokensTests(TestCase):
+    """Тесты разбиения на токены."""
+
+    def test_prefixes_are_case_folded(self):
+        """Проверка префиксов в нижнем регистре и замены «ё»."""
+        tokens = build_tokens(7, 'Пётр ЁЛКИН', 'petr_1', ['4081'])
+        self.assertEqual(tokens['петр'], 2)
+        self.assertEqual(tokens['пет'], 1)
+        self.assertEqual(tokens['елкин'], 2)
+        self.assertIn('petr', tokens)
+        self.assertIn('408', tokens)
+        self.assertEqual(tokens['7'], 3)
+        self.assertNotIn('ёлкин', tokens)
+
+
+class SearchClientsTests(TestCase):
+    """Тесты поиска клиентов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых клиентов."""
+        cls.ivan = _create_client(
+            'ivan', 'Иван Петров', '40817810000000000001'
+        )
+        cls.ivanova = _create_client(
+            'ivanova', 'Мария Иванова', '40817810000000000002'
+        )
+        cls.petr = _create_client(
+            'petr', 'Пётр Сидоров', '40702810000000000003'
+        )
+
+    def _search(self, query):
+        return list(search_clients(ClientProfile.objects.all(), query))
+
+    def test_cyrillic_prefix_in_any_case(self):
+        """Проверка поиска по началу имени без учёта регистра."""
+        self.assertEqual(self._search('иВа'), [self.ivan, self.ivanova])
+        self.assertEqual(self._search('ПЕТР'), [self.petr, self.ivan])
+        self.assertEqual(self._search('ёлка'), [])
+
+    def test_exact_word_ranks_first(self):
+        """Проверка ранжирования: целое слово выше префикса."""
+        self.assertEqual(self._search('иван'), [self.ivan, self.ivanova])
+        self.assertEqual(self._search('иванова'), [self.ivanova])
+
+    def test_account_number_prefix(self):
+        """Проверка поиска по началу номера счёта."""
+        self.assertEqual(
+            self._search('4081781'), [self.ivan, self.ivanova]
+        )
+        self.assertEqual(self._search('40702810000000000003'), [self.petr])
+        self.assertEqual(self._search('0000000003'), [])
+
+    def test_all_words_must_match(self):
+        """Проверка поиска по нескольким словам."""
+        self.assertEqual(self._search('иван 40817'), [self.ivan, self.ivanova])
+        self.assertEqual(self._search('петров иван'), [self.ivan])
+        self.assertEqual(self._search('петров мария'), [])
+        self.assertEqual(self._search('!!!'), [])
+
+    def test_client_id(self):
+        """Проверка поиска по id клиента."""
+        self.assertEqual(self._search(str(self.petr.id))[0], self.petr)
+
+    def test_index_follows_changes(self):
+        """Проверка обновления индекса при изменениях."""
+        self.ivan.full_name = 'Иван Кузнецов'
+        self.ivan.save()
+        self.assertEqual(self._search('кузн'), [self.ivan])
+        self.assertEqual(self._search('петров'), [])
+
+        self.ivan.user.username = 'kuznetsov'
+        self.ivan.user.save()
+        self.assertEqual(self._search('kuzn'), [self.ivan])
+
+        account = Account.objects.create(
+            client=self.petr, account_number='40817810999999999999'
+        )
+        self.assertEqual(self._search('408178109'), [self.petr])
+        account.delete()
+        self.assertEqual(self._search('408178109'), [])
+
+        self.ivanova.delete()
+        self.assertFalse(
+            ClientSearchToken.objects.filter(
+                client_id=self.ivanova.id
+            ).exists()
+        )
+
+    def test_rebuild_command(self):
+        """Проверка команды rebuild_client_search."""
+        ClientSearchToken.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_client_search', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(self._search('сидоров'), [self.petr])
+
+    def test_dashboard_search_uses_index(self):
+        """Проверка поиска в админ-панели без LIKE."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        self.client.login(username='admin', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('banking:admin_dashboard'), {'search': 'Иван'}
+            )
+        self.assertEqual(
+            list(response.context['clients']), [self.ivan, self.ivanova]
+        )
+        client_queries = [
+            query['sql']
+            for query in queries
+            if 'banking_clientsearchtoken' in query['sql']
+        ]
+        self.assertTrue(client_queries)
+        self.assertTrue(all('LIKE' not in sql for sql in client_queries))
@@ -8,13 +8,16 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from banking.models import Account, ClientProfile, Transaction
 from banking.services import (
     cancel_transaction,
     create_and_process_transaction,
     create_and_process_transfer,
+    finalize_pending_batch,
     finalize_transaction,
     toggle_account_block,
 )
@@ -752,3 +755,244 @@ class FinalizeTransactionTests(TestCase):
             Transaction.Status.CANCELLED
         )
         self.assertIn('заблокирован', finalized.note)
+
+
+class FinalizePendingBatchTests(TestCase):
+    """Тесты пакетного проведения операций."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+        )
+        cls.target_user = User.objects.create_user(
+            username='target',
+            password='testpass123',
+        )
+        cls.client_profile = ClientProfile.objects.create(
+            user=cls.user,
+            full_name='Иван Клиент',
+        )
+        cls.target_profile = ClientProfile.objects.create(
+            user=cls.target_user,
+            full_name='Получатель',
+        )
+        cls.account = Account.objects.create(
+            client=cls.client_profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.target_account = Account.objects.create(
+            client=cls.target_profile,
+            account_number='40817810000000000002',
+            balance=Decimal('500.00'),
+        )
+
+    def _create(self, transaction_type, amount, account=None):
+        return Transaction.objects.create(
+            account=account or self.account,
+            transaction_type=transaction_type,
+            amount=Decimal(amount),
+        )
+
+    def _create_transfer(self, amount):
+        outgoing = self._create(
+            Transaction.TransactionType.TRANSFER_OUT, amount
+        )
+        incoming = self._create(
+            Transaction.TransactionType.TRANSFER_IN,
+            amount,
+            account=self.target_account,
+        )
+        outgoing.related_transaction = incoming
+        incoming.related_transaction = outgoing
+        Transaction.objects.bulk_update(
+            [outgoing, incoming], fields=['related_transaction']
+        )
+        return outgoing, incoming
+
+    def test_batch_sums_deposits_per_account(self):
+        """Проверка суммирования пополнений одного счёта."""
+        ids = [
+            self._create(Transaction.TransactionType.DEPOSIT, '100.00').id
+            for _ in range(5)
+        ]
+        settled = finalize_pending_batch(ids)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1500.00'))
+        self.assertTrue(all(t.is_completed for t in settled))
+        self.assertTrue(all(t.processed_at for t in settled))
+
+    def test_batch_query_count_does_not_grow_with_size(self):
+        """Проверка постоянного числа запросов для пачки."""
+        small = [
+            self._create(Transaction.TransactionType.DEPOSIT, '10.00').id
+            for _ in range(2)
+        ]
+        large = [
+            self._create(Transaction.TransactionType.DEPOSIT, '10.00').id
+            for _ in range(10)
+        ]
+        with CaptureQueriesContext(connection) as small_queries:
+            finalize_pending_batch(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            finalize_pending_batch(large)
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_batch_cancels_withdrawal_without_funds(self):
+        """Проверка отмены снятия, на которое не хватило средств."""
+        first = self._create(Transaction.TransactionType.WITHDRAWAL, '600')
+        second = self._create(Transaction.TransactionType.WITHDRAWAL, '600')
+        first, second = finalize_pending_batch([first.id, second.id])
+        self.account.refresh_from_db()
+        self.assertTrue(first.is_completed)
+        self.assertTrue(second.is_cancelled)
+        self.assertEqual(second.note, 'Недостаточно средств.')
+        self.assertEqual(self.account.balance, Decimal('400.00'))
+
+    def test_batch_matches_finalize_transaction_when_blocked(self):
+        """Проверка совпадения итога с finalize_transaction."""
+        self.account.is_blocked = True
+        self.account.save()
+        single = self._create(Transaction.TransactionType.DEPOSIT, '100')
+        batched = self._create(Transaction.TransactionType.DEPOSIT, '100')
+
+        single = finalize_transaction(single.id)
+        (batched,) = finalize_pending_batch([batched.id])
+        self.assertEqual(batched.status, single.status)
+        self.assertEqual(batched.note, single.note)
+
+    def test_batch_settles_transfer_pair(self):
+        """Проверка проведения обеих частей перевода."""
+        outgoing, incoming = self._create_transfer('300.00')
+        finalize_pending_batch([outgoing.id])
+        outgoing.refresh_from_db()
+        incoming.refresh_from_db()
+        self.account.refresh_from_db()
+        self.target_account.refresh_from_db()
+        self.assertTrue(outgoing.is_completed)
+        self.assertTrue(incoming.is_completed)
+        self.assertEqual(self.account.balance, Decimal('700.00'))
+        self.assertEqual(self.target_account.balance, Decimal('800.00'))
+
+    def test_batch_cancels_transfer_without_funds(self):
+        """Проверка отмены перевода при недостатке средств."""
+        outgoing, incoming = self._create_transfer('1500.00')
+        finalize_pending_batch([outgoing.id, incoming.id])
+        outgoing.refresh_from_db()
+        incoming.refresh_from_db()
+        self.assertTrue(outgoing.is_cancelled)
+        self.assertTrue(incoming.is_cancelled)
+        self.assertEqual(outgoing.note, 'Недостаточно средств для перевода.')
+
+    def test_batch_skips_processed_transactions(self):
+        """Проверка, что проведённые операции не проводятся повторно."""
+        transaction = self._create(
+            Transaction.TransactionType.DEPOSIT, '100.00'
+        )
+        finalize_pending_batch([transaction.id])
+        finalize_pending_batch([transaction.id])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1100.00'))
+
+
+@override_settings(BANKING_LEDGER_MODE='conditional')
+class ConditionalLedgerTests(TestCase):
+    """Тесты режима условных UPDATE для балансов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+        )
+        cls.target_user = User.objects.create_user(
+            username='target',
+            password='testpass123',
+        )
+        cls.client_profile = ClientProfile.objects.create(
+            user=cls.user,
+            full_name='Иван Клиент',
+        )
+        cls.target_profile = ClientProfile.objects.create(
+            user=cls.target_user,
+            full_name='Получатель',
+        )
+        cls.account = Account.objects.create(
+            client=cls.client_profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.target_account = Account.objects.create(
+            client=cls.target_profile,
+            account_number='40817810000000000002',
+            balance=Decimal('500.00'),
+        )
+
+    def _create(self, transaction_type, amount):
+        return Transaction.objects.create(
+            account=self.account,
+            transaction_type=transaction_type,
+            amount=Decimal(amount),
+        )
+
+    def test_withdrawal_uses_conditional_update(self):
+        """Проверка списания одним условным UPDATE."""
+        transaction = self._create(
+            Transaction.TransactionType.WITHDRAWAL, '300.00'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            finalized = finalize_transaction(transaction.id)
+        updates = [
+            query['sql']
+            for query in queries
+            if query['sql'].startswith('UPDATE "banking_account"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"balance" >=', updates[0])
+        self.assertTrue(finalized.is_completed)
+        self.assertEqual(finalized.account.balance, Decimal('700.00'))
+
+    def test_withdrawal_without_funds_is_cancelled(self):
+        """Проверка отмены списания, когда UPDATE не затронул строк."""
+        transaction = self._create(
+            Transaction.TransactionType.WITHDRAWAL, '1000.01'
+        )
+        finalized = finalize_transaction(transaction.id)
+        self.account.refresh_from_db()
+        self.assertTrue(finalized.is_cancelled)
+        self.assertIn('Недостаточно средств', finalized.note)
+        self.assertEqual(self.account.balance, Decimal('1000.00'))
+
+    def test_transfer_to_lower_account_id_rolls_back_credit(self):
+        """Проверка компенсации зачисления при нехватке средств."""
+        for source, target, amount, completed in (
+            (self.target_account, self.account, '600.00', False),
+            (self.target_account, self.account, '200.00', True),
+            (self.account, self.target_account, '1500.00', False),
+        ):
+            with patch('banking.services.time.sleep', return_value=None):
+                result = create_and_process_transfer(
+                    source_account=source,
+                    target_account=target,
+                    amount=Decimal(amount),
+                )
+            self.assertEqual(result.completed, completed)
+
+        self.account.refresh_from_db()
+        self.target_account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1200.00'))
+        self.assertEqual(self.target_account.balance, Decimal('300.00'))
+
+    def test_cancel_reverses_balance(self):
+        """Проверка возврата суммы при отмене проведённой операции."""
+        transaction = self._create(
+            Transaction.TransactionType.DEPOSIT, '250.00'
+        )
+        finalize_transaction(transaction.id)
+        cancel_transaction(transaction.id, reason='Тестовая отмена')
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1000.00'))
@@ -0,0 +1,184 @@
+"""
+Тесты фонового проведения операций (banking.settlement).
+
+Проверяют аренду ожидающих операций воркерами, их проведение,
+возврат незавершённых операций в очередь и корректную остановку.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import (
+    create_and_process_transaction,
+    create_and_process_transfer,
+)
+from banking.settlement import (
+    SettlementWorker,
+    claim_batch,
+    release_stale_claims,
+)
+
+
+User = get_user_model()
+
+
+@override_settings(BANKING_SETTLEMENT_MODE='background')
+class SettlementWorkerTests(TestCase):
+    """Тесты воркера фонового проведения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.user = User.objects.create_user(
+            username='sender',
+            password='testpass123',
+        )
+        cls.target_user = User.objects.create_user(
+            username='receiver',
+            password='testpass123',
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user,
+            full_name='Отправитель',
+        )
+        cls.target_profile = ClientProfile.objects.create(
+            user=cls.target_user,
+            full_name='Получатель',
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.target_account = Account.objects.create(
+            client=cls.target_profile,
+            account_number='40817810000000000002',
+            balance=Decimal('500.00'),
+        )
+
+    def _make_ready(self):
+        """Состаривает операции, чтобы прошла выдержка проведения."""
+        Transaction.objects.update(
+            created_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    @patch('banking.services.time.sleep')
+    def test_background_mode_returns_pending_without_sleep(self, mock_sleep):
+        """Проверка, что запрос не ждёт проведения операции."""
+        result = create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+            performed_by=self.profile,
+        )
+        self.account.refresh_from_db()
+        mock_sleep.assert_not_called()
+        self.assertTrue(result.pending)
+        self.assertFalse(result.completed)
+        self.assertTrue(result.transaction.is_pending)
+        self.assertEqual(self.account.balance, Decimal('1000.00'))
+
+    def test_worker_settles_deposit_and_transfer(self):
+        """Проверка проведения пополнения и перевода воркером."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        transfer = create_and_process_transfer(
+            source_account=self.account,
+            target_account=self.target_account,
+            amount=Decimal('300.00'),
+        )
+        self._make_ready()
+
+        processed = SettlementWorker('test:0').run_once()
+
+        self.account.refresh_from_db()
+        self.target_account.refresh_from_db()
+        outgoing = Transaction.objects.get(pk=transfer.transaction.pk)
+        self.assertEqual(processed, 2)
+        self.assertEqual(self.account.balance, Decimal('800.00'))
+        self.assertEqual(self.target_account.balance, Decimal('800.00'))
+        self.assertTrue(outgoing.is_completed)
+        self.assertTrue(outgoing.related_transaction.is_completed)
+        self.assertFalse(
+            Transaction.objects.filter(
+                status=Transaction.Status.PENDING
+            ).exists()
+        )
+
+    def test_fresh_operations_wait_for_processing_delay(self):
+        """Проверка, что свежие операции не арендуются раньше выдержки."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        self.assertEqual(claim_batch('test:0'), [])
+
+    def test_claimed_operation_is_not_claimed_twice(self):
+        """Проверка, что арендованную операцию не забирает другой воркер."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        self._make_ready()
+        self.assertEqual(len(claim_batch('test:0')), 1)
+        self.assertEqual(claim_batch('test:1'), [])
+
+    def test_restarted_worker_recovers_own_claims(self):
+        """Проверка возврата аренд упавшего воркера при перезапуске."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        self._make_ready()
+        claim_batch('test:0')
+
+        worker = SettlementWorker('test:0')
+        self.assertEqual(worker.recover(), 1)
+        self.assertEqual(worker.run_once(), 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1100.00'))
+
+    @override_settings(BANKING_SETTLEMENT_LEASE_SECONDS=10)
+    def test_stale_claims_are_released(self):
+        """Проверка снятия просроченных аренд."""
+        create_and_process_transaction(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+        self._make_ready()
+        claim_batch('test:0')
+        Transaction.objects.update(
+            claimed_at=timezone.now() - timedelta(seconds=30)
+        )
+
+        self.assertEqual(release_stale_claims(), 1)
+        self.assertEqual(len(claim_batch('test:1')), 1)
+
+    def test_stopped_worker_releases_unprocessed_claims(self):
+        """Проверка корректной остановки посреди пачки."""
+        for _ in range(3):
+            create_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('100.00'),
+            )
+        self._make_ready()
+        worker = SettlementWorker('test:0')
+        worker.stop()
+
+        self.assertEqual(worker.run_once(), 0)
+        self.assertFalse(
+            Transaction.objects.exclude(claimed_by='').exists()
+        )
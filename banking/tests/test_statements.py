@@ -0,0 +1,251 @@
+"""
+Тесты потоковой выписки по операциям (banking.statements).
+"""
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from banking import statements
+from banking.models import Account, ClientProfile, Transaction
+
+
+User = get_user_model()
+
+
+class StatementTests(TestCase):
+    """Тесты выписки клиента и сотрудника."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание двух клиентов с операциями."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        cls.user = User.objects.create_user(
+            username='client', password='testpass123'
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user, full_name='Иван Клиент'
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile, account_number='40817810000000000001'
+        )
+        cls.savings = Account.objects.create(
+            client=cls.profile, account_number='40817810000000000002'
+        )
+        other = ClientProfile.objects.create(
+            user=User.objects.create(username='other'),
+            full_name='Другой Клиент',
+        )
+        cls.foreign = Account.objects.create(
+            client=other, account_number='40817810000000000003'
+        )
+        cls.deposit = cls._create(
+            cls.account, Transaction.TransactionType.DEPOSIT, days_ago=3,
+            note='Зарплата, аванс',
+        )
+        cls.incoming = cls._create(
+            cls.savings, Transaction.TransactionType.TRANSFER_IN, days_ago=2
+        )
+        cls.outgoing = cls._create(
+            cls.account,
+            Transaction.TransactionType.TRANSFER_OUT,
+            days_ago=2,
+            related_transaction=cls.incoming,
+        )
+        cls.payout = cls._create(
+            cls.account,
+            Transaction.TransactionType.WITHDRAWAL,
+            days_ago=1,
+            status=Transaction.Status.PENDING,
+            metadata={'counterparty_account_number': '40817810999999999999'},
+        )
+        cls._create(cls.foreign, Transaction.TransactionType.DEPOSIT)
+
+    @classmethod
+    def _create(cls, account, transaction_type, days_ago=0, **kwargs):
+        kwargs.setdefault('status', Transaction.Status.COMPLETED)
+        transaction = Transaction.objects.create(
+            account=account,
+            transaction_type=transaction_type,
+            amount=Decimal('100.00'),
+            **kwargs,
+        )
+        Transaction.objects.filter(pk=transaction.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return transaction
+
+    def _download(self, url_name, **params):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def _csv(self, url_name, **params):
+        response, content = self._download(url_name, **params)
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.DictReader(io.StringIO(content[1:])))
+        return response, rows
+
+    def test_client_csv_contains_own_accounts(self):
+        """Проверка CSV клиента по всем его счетам."""
+        self.client.login(username='client', password='testpass123')
+        response, rows = self._csv('banking:client_statement')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="statement.csv"',
+        )
+        self.assertEqual(
+            [row['reference'] for row in rows],
+            [
+                self.deposit.reference,
+                self.incoming.reference,
+                self.outgoing.reference,
+                self.payout.reference,
+            ],
+        )
+        by_reference = {row['reference']: row for row in rows}
+        self.assertEqual(
+            by_reference[self.deposit.reference]['note'], 'Зарплата, аванс'
+        )
+        outgoing = by_reference[self.outgoing.reference]
+        self.assertEqual(outgoing['amount'], '-100.00')
+        self.assertEqual(outgoing['counterparty'], self.savings.account_number)
+        payout = by_reference[self.payout.reference]
+        self.assertEqual(payout['counterparty'], '40817810999999999999')
+        self.assertEqual(payout['status'], Transaction.Status.PENDING)
+
+    def test_csv_formulas_are_escaped(self):
+        """Проверка апострофа перед текстом, похожим на формулу."""
+        notes = ['=HYPERLINK("http://x")', '+1', '-1', '@SUM(A1)', 'Кафе']
+        for note in notes:
+            self._create(
+                self.account, Transaction.TransactionType.DEPOSIT, note=note
+            )
+        self.client.login(username='client', password='testpass123')
+        _, rows = self._csv('banking:client_statement')
+        self.assertEqual(
+            [row['note'] for row in rows[-len(notes):]],
+            [
+                '\'=HYPERLINK("http://x")',
+                "'+1",
+                "'-1",
+                "'@SUM(A1)",
+                'Кафе',
+            ],
+        )
+        # Суммы списаний остаются числами.
+        self.assertIn('-100.00', [row['amount'] for row in rows])
+
+    async def test_asgi_statement_is_streamed_async(self):
+        """Проверка асинхронной выписки под ASGI."""
+        await self.async_client.alogin(
+            username='client', password='testpass123'
+        )
+        response = await self.async_client.get(
+            reverse('banking:client_statement'), {'format': 'jsonl'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join(
+            [chunk async for chunk in response.streaming_content]
+        ).decode()
+        self.assertEqual(
+            [json.loads(line)['reference'] for line in content.splitlines()],
+            [
+                self.deposit.reference,
+                self.incoming.reference,
+                self.outgoing.reference,
+                self.payout.reference,
+            ],
+        )
+
+    def test_client_jsonl_for_account_and_period(self):
+        """Проверка JSON Lines по счёту и периоду."""
+        self.client.login(username='client', password='testpass123')
+        day = timezone.localdate() - timedelta(days=2)
+        response, content = self._download(
+            'banking:client_statement',
+            account=self.account.id,
+            date_from=day.isoformat(),
+            date_to=day.isoformat(),
+            format='jsonl',
+        )
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        self.assertIn(
+            f'statement-{day}-{day}.jsonl', response['Content-Disposition']
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['reference'] for row in rows], [self.outgoing.reference]
+        )
+        self.assertEqual(rows[0]['account'], self.account.account_number)
+
+    def test_client_cannot_export_foreign_account(self):
+        """Проверка, что чужой счёт недоступен."""
+        self.client.login(username='client', password='testpass123')
+        response = self.client.get(
+            reverse('banking:client_statement'), {'account': self.foreign.id}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_period_is_rejected(self):
+        """Проверка ошибки при перепутанных датах периода."""
+        self.client.login(username='client', password='testpass123')
+        response = self.client.get(
+            reverse('banking:client_statement'),
+            {'date_from': '2024-02-01', 'date_to': '2024-01-01'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+    def test_staff_export_with_filters(self):
+        """Проверка выписки сотрудника по фильтрам."""
+        self.client.login(username='admin', password='testpass123')
+        _, rows = self._csv('banking:admin_statement')
+        self.assertEqual(len(rows), 5)
+        _, rows = self._csv(
+            'banking:admin_statement',
+            status=Transaction.Status.COMPLETED,
+            client=self.profile.id,
+        )
+        self.assertEqual(len(rows), 3)
+        _, rows = self._csv('banking:admin_statement', account=self.foreign.id)
+        self.assertEqual(
+            [row['account'] for row in rows], [self.foreign.account_number]
+        )
+
+    def test_admin_statement_requires_staff(self):
+        """Проверка, что клиент не получает выписку сотрудника."""
+        self.client.login(username='client', password='testpass123')
+        response = self.client.get(reverse('banking:admin_statement'))
+        self.assertRedirects(response, reverse('banking:client_dashboard'))
+
+    def test_header_is_sent_before_query(self):
+        """Проверка, что заголовок CSV отдаётся до запроса к базе."""
+        chunks = statements.stream(Transaction.objects.all())
+        with self.assertNumQueries(0):
+            self.assertIn('reference', next(chunks))
+        with self.assertNumQueries(1):
+            content = ''.join(chunks)
+        self.assertIn(self.outgoing.reference, content)
+
+    @override_settings(BANKING_STATEMENT_CHUNK_SIZE=2)
+    def test_rows_are_read_in_chunks(self):
+        """Проверка чтения операций через iterator(chunk_size)."""
+        rows = statements.iter_rows(Transaction.objects.all())
+        with self.assertNumQueries(1):
+            references = [row['reference'] for row in rows]
+        self.assertEqual(len(references), 5)
+        self.assertEqual(statements.chunk_size(), 2)
@@ -0,0 +1,330 @@
+"""
+Тесты кэша сводки кабинета клиента (banking.summaries).
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking import summaries
+from banking.models import Account, ClientProfile, Transaction
+from banking.services import (
+    cancel_transaction,
+    create_and_process_transaction,
+)
+
+
+User = get_user_model()
+
+BANKING_TABLES = (
+    'banking_account',
+    'banking_clientprofile',
+    'banking_transaction',
+)
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class ClientDashboardSummaryTests(TestCase):
+    """Тесты сводки кабинета клиента."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание клиента со счётом и операцией."""
+        cls.user = User.objects.create_user(
+            username='client', password='testpass123'
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user, full_name='Иван Клиент'
+        )
+        cls.account = Account.objects.create(
+            client=cls.profile,
+            account_number='40817810000000000001',
+            balance=Decimal('1000.00'),
+        )
+        cls.deposit = Transaction.objects.create(
+            account=cls.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+            status=Transaction.Status.COMPLETED,
+        )
+
+    def setUp(self):
+        """Вход клиента и очистка кэша."""
+        summaries.summary_cache().clear()
+        self.client.login(username='client', password='testpass123')
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('banking:client_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        touched = [
+            query['sql']
+            for query in queries
+            if any(table in query['sql'] for table in BANKING_TABLES)
+        ]
+        return response, touched
+
+    def assertServedFromCache(self, touched):
+        """Из базы прочитана только версия сводки."""
+        self.assertEqual(len(touched), 1)
+        self.assertIn('summary_version', touched[0])
+        self.assertNotIn('banking_account', touched[0])
+
+    def test_repeated_view_is_served_from_cache(self, mock_sleep):
+        """Проверка, что повторный просмотр читает из базы только версию."""
+        response, touched = self._get()
+        self.assertTrue(touched)
+        self.assertEqual(response.context['total_transactions_count'], 1)
+        response, touched = self._get()
+        self.assertServedFromCache(touched)
+        self.assertEqual(response.context['account'], self.account)
+        self.assertEqual(
+            list(response.context['transactions']), [self.deposit]
+        )
+
+    def test_settlement_invalidates_summary(self, mock_sleep):
+        """Проверка новой сводки после проведения операции."""
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_and_process_transaction(
+                account=self.account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('250.00'),
+            )
+        response, touched = self._get()
+        self.assertTrue(touched)
+        self.assertEqual(
+            response.context['account'].balance, Decimal('1250.00')
+        )
+        self.assertEqual(response.context['total_transactions_count'], 2)
+
+    def test_cancel_invalidates_summary(self, mock_sleep):
+        """Проверка новой сводки после отмены операции."""
+        pending = Transaction.objects.create(
+            account=self.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('10.00'),
+        )
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_transaction(pending.id, reason='Отмена.')
+        response, _ = self._get()
+        self.assertEqual(
+            response.context['transactions'][0].status,
+            Transaction.Status.CANCELLED,
+        )
+
+    def test_block_invalidates_summary(self, mock_sleep):
+        """Проверка новой сводки после блокировки счёта."""
+        self._get()
+        self.account.is_blocked = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.save(update_fields=['is_blocked'])
+        response, _ = self._get()
+        self.assertTrue(response.context['account'].is_blocked)
+
+    def test_missing_entry_is_rebuilt(self, mock_sleep):
+        """Проверка построения сводки при промахе кэша."""
+        self._get()
+        summaries.summary_cache().clear()
+        response, touched = self._get()
+        self.assertTrue(touched)
+        self.assertEqual(response.context['total_transactions_count'], 1)
+        _, touched = self._get()
+        self.assertServedFromCache(touched)
+
+    def test_change_in_other_process_is_visible(self, mock_sleep):
+        """Проверка новой сводки, когда запись в кэше не удалялась."""
+        self._get()
+        # Воркер в другом процессе не видит локальный кэш сервера:
+        # баланс и версия меняются только в базе.
+        Account.objects.filter(pk=self.account.pk).update(
+            balance=Decimal('1500.00')
+        )
+        cache = summaries.summary_cache()
+        with patch.object(cache, 'delete_many') as delete_many:
+            with self.captureOnCommitCallbacks(execute=True):
+                summaries.invalidate([self.profile.pk])
+        delete_many.assert_not_called()
+        response, touched = self._get()
+        self.assertTrue(touched)
+        self.assertEqual(
+            response.context['account'].balance, Decimal('1500.00')
+        )
+
+    def test_summary_of_another_user_is_ignored(self, mock_sleep):
+        """Проверка, что сводка чужого клиента не выдаётся."""
+        other = ClientProfile.objects.create(
+            user=User.objects.create(username='other'),
+            full_name='Другой Клиент',
+        )
+        Account.objects.create(
+            client=other, account_number='40817810000000000002'
+        )
+        summaries.load_summary(other)
+        session = self.client.session
+        session['dashboard_client_id'] = other.id
+        session.save()
+        response, _ = self._get()
+        self.assertEqual(response.context['account'], self.account)
+
+
+@patch('banking.services.time.sleep', return_value=None)
+class MultiAccountDashboardTests(TestCase):
+    """Тесты кабинета клиента с несколькими счетами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание клиента с двумя счетами и операциями."""
+        cls.user = User.objects.create_user(
+            username='client', password='testpass123'
+        )
+        cls.profile = ClientProfile.objects.create(
+            user=cls.user, full_name='Иван Клиент'
+        )
+        cls.accounts = [
+            cls._open_account(f'4081781000000000000{i}', operations=12)
+            for i in range(2)
+        ]
+
+    @classmethod
+    def _open_account(cls, number, operations=3):
+        account = Account.objects.create(
+            client=cls.profile,
+            account_number=number,
+            balance=Decimal('1000.00'),
+        )
+        for _ in range(operations):
+            Transaction.objects.create(
+                account=account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('10.00'),
+                status=Transaction.Status.COMPLETED,
+            )
+        return account
+
+    def setUp(self):
+        """Вход клиента и очистка кэша."""
+        summaries.summary_cache().clear()
+        self.client.login(username='client', password='testpass123')
+
+    def _get(self, **params):
+        return self.client.get(reverse('banking:client_dashboard'), params)
+
+    def _rebuild_queries(self):
+        summaries.summary_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._get().status_code, 200)
+        return len(queries)
+
+    def test_all_accounts_with_recent_history(self, mock_sleep):
+        """Проверка счетов и последних операций каждого счёта."""
+        response = self._get()
+        items = response.context['accounts']
+        self.assertEqual([item.account for item in items], self.accounts)
+        for item in items:
+            self.assertEqual(item.transaction_count, 12)
+            self.assertEqual(
+                len(item.transactions), summaries.SUMMARY_TRANSACTIONS
+            )
+            self.assertEqual(
+                {t.account_id for t in item.transactions},
+                {item.account.id},
+            )
+            expected = list(
+                item.account.transactions.order_by('-created_at', '-id')
+                .values_list('id', flat=True)[
+                    :summaries.SUMMARY_TRANSACTIONS
+                ]
+            )
+            self.assertEqual([t.id for t in item.transactions], expected)
+        for account in self.accounts:
+            self.assertContains(response, account.account_number)
+
+    def test_query_count_does_not_depend_on_accounts(self, mock_sleep):
+        """Проверка постоянного числа запросов при промахе кэша."""
+        # Первый запрос записывает клиента в сессию.
+        self._get()
+        before = self._rebuild_queries()
+        for i in range(3):
+            self._open_account(f'4081781000000000010{i}')
+        self.assertEqual(self._rebuild_queries(), before)
+        self.assertEqual(len(self._get().context['accounts']), 5)
+
+    def test_switcher_selects_account(self, mock_sleep):
+        """Проверка выбора счёта параметром account."""
+        self._get()
+        response = self._get(account=self.accounts[1].id)
+        self.assertEqual(response.context['account'], self.accounts[1])
+        self.assertContains(
+            response,
+            f'name="account" value="{self.accounts[1].id}"',
+            count=3,
+        )
+
+    def test_foreign_account_falls_back_to_first(self, mock_sleep):
+        """Проверка, что чужой счёт не выбирается."""
+        other = ClientProfile.objects.create(
+            user=User.objects.create(username='other'),
+            full_name='Другой Клиент',
+        )
+        foreign = Account.objects.create(
+            client=other, account_number='40817810000000000099'
+        )
+        for account_id in (foreign.id, 'abc'):
+            response = self._get(account=account_id)
+            self.assertEqual(response.context['account'], self.accounts[0])
+        response = self.client.post(
+            reverse('banking:client_dashboard'),
+            {
+                'form_type': 'deposit',
+                'account': foreign.id,
+                'amount': '50.00',
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.balance, Decimal('0.00'))
+
+    def test_non_ascii_digits_fall_back_to_first(self, mock_sleep):
+        """Проверка надстрочных и арабских цифр в параметре account."""
+        for account_id in ('²', '٣'):
+            with self.subTest(account=account_id):
+                response = self._get(account=account_id)
+                self.assertEqual(
+                    response.context['account'], self.accounts[0]
+                )
+                response = self.client.post(
+                    reverse('banking:client_dashboard'),
+                    {
+                        'form_type': 'deposit',
+                        'account': account_id,
+                        'amount': '50.00',
+                    },
+                )
+                self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Account.objects.get(pk=self.accounts[0].pk).balance,
+            Decimal('1100.00'),
+        )
+
+    def test_operation_uses_selected_account(self, mock_sleep):
+        """Проверка операции по выбранному счёту."""
+        response = self.client.post(
+            reverse('banking:client_dashboard'),
+            {
+                'form_type': 'deposit',
+                'account': self.accounts[1].id,
+                'amount': '50.00',
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        balances = [
+            Account.objects.get(pk=account.pk).balance
+            for account in self.accounts
+        ]
+        self.assertEqual(balances, [Decimal('1000.00'), Decimal('1050.00')])
@@ -0,0 +1,128 @@
+"""
+Тесты фильтрации операций по датам и команды explain_transaction_queries.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from banking.models import Account, ClientProfile, Transaction
+from banking.utils import day_range
+
+
+User = get_user_model()
+MOSCOW = ZoneInfo('Europe/Moscow')
+
+
+class DayRangeTests(TestCase):
+    """Тесты полуоткрытого интервала дат."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание операций на границах суток по московскому времени."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        profile = ClientProfile.objects.create(
+            user=User.objects.create(username='client'),
+            full_name='Иван Клиент',
+        )
+        account = Account.objects.create(
+            client=profile,
+            account_number='40817810000000000001',
+        )
+        cls.moments = {
+            'before': datetime(2025, 3, 9, 23, 59, 59, tzinfo=MOSCOW),
+            'first': datetime(2025, 3, 10, 0, 0, tzinfo=MOSCOW),
+            'last': datetime(2025, 3, 11, 23, 59, 59, tzinfo=MOSCOW),
+            'after': datetime(2025, 3, 12, 0, 0, tzinfo=MOSCOW),
+        }
+        cls.ids = {}
+        for name, moment in cls.moments.items():
+            transaction = Transaction.objects.create(
+                account=account,
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+                amount=Decimal('10.00'),
+            )
+            Transaction.objects.filter(pk=transaction.pk).update(
+                created_at=moment
+            )
+            cls.ids[name] = transaction.id
+
+    def test_range_includes_whole_days_in_time_zone(self):
+        """Проверка границ интервала в TIME_ZONE."""
+        lookups = day_range(date(2025, 3, 10), date(2025, 3, 11))
+        self.assertEqual(lookups['created_at__gte'], self.moments['first'])
+        self.assertEqual(lookups['created_at__lt'], self.moments['after'])
+        found = set(
+            Transaction.objects.filter(**lookups).values_list(
+                'id', flat=True
+            )
+        )
+        self.assertEqual(found, {self.ids['first'], self.ids['last']})
+
+    def test_open_ends(self):
+        """Проверка интервала без одной из границ."""
+        self.assertEqual(day_range(None, None), {})
+        self.assertEqual(
+            list(day_range(date(2025, 3, 10), None)), ['created_at__gte']
+        )
+
+    def test_dashboard_filter_does_not_wrap_column(self):
+        """Проверка, что фильтр админ-панели сравнивает сам столбец."""
+        self.client.login(username='admin', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('banking:admin_dashboard'),
+                {'date_from': '2025-03-10', 'date_to': '2025-03-11'},
+            )
+        self.assertEqual(
+            {t.id for t in response.context['transactions']},
+            {self.ids['first'], self.ids['last']},
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_datetime_cast_date', sql)
+
+
+class ExplainCommandTests(TestCase):
+    """Тесты команды explain_transaction_queries."""
+
+    def test_seeded_rows_are_rolled_back(self):
+        """Проверка отката синтетических операций."""
+        out = StringIO()
+        call_command(
+            'explain_transaction_queries',
+            '--seed',
+            '30',
+            '--i-know',
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('Операций в таблице: 30', output)
+        self.assertIn('transaction_status_time_idx', output)
+        self.assertIn('без индексов', output)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(Account.objects.exists())
+
+    def test_requires_confirmation(self):
+        """Проверка отказа без --i-know."""
+        with self.assertRaisesMessage(CommandError, '--i-know'):
+            call_command('explain_transaction_queries', stdout=StringIO())
+
+    def test_refuses_without_transactional_ddl(self):
+        """Проверка отказа на базе, которая не откатывает DDL."""
+        with patch.object(connection.features, 'can_rollback_ddl', False):
+            with self.assertRaisesMessage(CommandError, 'не откатывает DDL'):
+                call_command(
+                    'explain_transaction_queries',
+                    '--i-know',
+                    stdout=StringIO(),
+                )
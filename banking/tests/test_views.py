@@ -8,7 +8,9 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from banking.models import Account, ClientProfile, Transaction
@@ -392,6 +394,97 @@ class AdminDashboardViewTests(TestCase):
         self.assertLessEqual(len(clients), 12)
 
 
+class AdminDashboardSectionsTests(TestCase):
+    """Тесты отдельных разделов админ-панели."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание сотрудника, клиента, счёта и операции."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        profile = ClientProfile.objects.create(
+            user=User.objects.create_user(
+                username='client', password='testpass123'
+            ),
+            full_name='Тестовый Клиент',
+        )
+        cls.account = Account.objects.create(
+            client=profile, account_number='40817810000000000001'
+        )
+        cls.transaction = Transaction.objects.create(
+            account=cls.account,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            amount=Decimal('100.00'),
+        )
+
+    def _get(self, name, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), params or {})
+        return response, [query['sql'] for query in queries]
+
+    def test_clients_section(self):
+        """Проверка раздела клиентов без запросов к операциям."""
+        self.client.login(username='admin', password='testpass123')
+        response, queries = self._get(
+            'banking:admin_dashboard_clients', {'is_blocked': 'false'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.account.account_number)
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, self.transaction.reference)
+        sql = ' '.join(queries)
+        self.assertNotIn('banking_transaction', sql)
+        self.assertNotIn('banking_dashboardcounter', sql)
+
+    def test_transactions_section(self):
+        """Проверка раздела операций без запросов к списку клиентов."""
+        self.client.login(username='admin', password='testpass123')
+        response, queries = self._get(
+            'banking:admin_dashboard_transactions',
+            {'status': Transaction.Status.PENDING},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.transaction.reference)
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'admin-client-card')
+        self.assertFalse(
+            any(
+                sql.startswith('SELECT COUNT')
+                or '"banking_account"."client_id" IN' in sql
+                for sql in queries
+            )
+        )
+        _, page_queries = self._get(
+            'banking:admin_dashboard', {'status': Transaction.Status.PENDING}
+        )
+        self.assertLess(len(queries), len(page_queries))
+
+    def test_dashboard_embeds_sections(self):
+        """Проверка, что панель содержит адреса разделов."""
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(reverse('banking:admin_dashboard'))
+        self.assertContains(
+            response,
+            f'data-section-url="{reverse("banking:admin_dashboard_clients")}"',
+        )
+        self.assertContains(response, self.transaction.reference)
+
+    def test_sections_require_staff(self):
+        """Проверка доступа к разделам только для сотрудников."""
+        self.client.login(username='client', password='testpass123')
+        for name in (
+            'banking:admin_dashboard_clients',
+            'banking:admin_dashboard_transactions',
+        ):
+            response = self.client.get(reverse(name))
+            self.assertRedirects(
+                response,
+                reverse('banking:client_dashboard'),
+                fetch_redirect_response=False,
+            )
+
+
 class TransactionReceiptViewTests(TestCase):
     """Тесты для страницы чека транзакции."""
 
@@ -672,3 +765,65 @@ class AdminCancelTransactionTests(TestCase):
             reverse('banking:admin_dashboard'),
             status_code=302
         )
+
+
+class AdminClientAutocompleteTests(TestCase):
+    """Тесты JSON-эндпоинта выбора клиента."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание сотрудника и клиентов."""
+        User.objects.create_user(
+            username='admin', password='testpass123', is_staff=True
+        )
+        User.objects.create_user(username='client', password='testpass123')
+        cls.profiles = [
+            ClientProfile.objects.create(
+                user=User.objects.create(username=f'user{i}'),
+                full_name=f'Иван Клиент {i}',
+            )
+            for i in range(25)
+        ]
+        cls.petr = ClientProfile.objects.create(
+            user=User.objects.create(username='petr'),
+            full_name='Пётр Сидоров',
+        )
+        cls.url = reverse('banking:admin_client_autocomplete')
+
+    def test_pages_without_query(self):
+        """Проверка постраничной выдачи клиентов."""
+        self.client.login(username='admin', password='testpass123')
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['pagination']['more'])
+        self.assertEqual(data['results'][0], {
+            'id': self.profiles[0].id,
+            'text': f'Иван Клиент 0 (ID {self.profiles[0].id})',
+        })
+        data = self.client.get(self.url, {'page': 2}).json()
+        self.assertEqual(len(data['results']), 6)
+        self.assertFalse(data['pagination']['more'])
+
+    def test_query_uses_client_search(self):
+        """Проверка поиска клиентов по запросу."""
+        self.client.login(username='admin', password='testpass123')
+        data = self.client.get(self.url, {'q': 'сидор'}).json()
+        self.assertEqual(
+            [item['id'] for item in data['results']], [self.petr.id]
+        )
+        self.assertFalse(data['pagination']['more'])
+
+    def test_requires_staff(self):
+        """Проверка доступа только для сотрудников."""
+        self.client.login(username='client', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_dashboard_does_not_list_all_clients(self):
+        """Проверка, что админ-панель не выводит всех клиентов в фильтр."""
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(
+            reverse('banking:admin_dashboard'), {'client': self.petr.id}
+        )
+        self.assertContains(response, f'Пётр Сидоров (ID {self.petr.id})')
+        self.assertNotContains(response, 'Иван Клиент 24 (ID')
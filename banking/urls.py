@@ -16,17 +16,74 @@ urlpatterns = [
         views.AdminDashboardView.as_view(),
         name="admin_dashboard",
     ),
+    path(
+        "admin-dashboard/sections/clients/",
+        views.AdminDashboardView.as_view(section=views.SECTION_CLIENTS),
+        name="admin_dashboard_clients",
+    ),
+    path(
+        "admin-dashboard/sections/transactions/",
+        views.AdminDashboardView.as_view(
+            section=views.SECTION_TRANSACTIONS
+        ),
+        name="admin_dashboard_transactions",
+    ),
+    path(
+        "dashboard/history/",
+        views.client_history,
+        name="client_history",
+    ),
+    path(
+        "dashboard/statement/",
+        views.client_statement,
+        name="client_statement",
+    ),
     path("post-login/", views.post_login_redirect, name="post_login_redirect"),
     path(
         "transactions/<int:pk>/receipt/",
         views.TransactionReceiptView.as_view(),
         name="transaction_receipt",
     ),
+    path(
+        "async/dashboard/",
+        views.AsyncClientDashboardView.as_view(),
+        name="async_client_dashboard",
+    ),
+    path(
+        "async/transactions/<int:pk>/receipt/",
+        views.AsyncTransactionReceiptView.as_view(),
+        name="async_transaction_receipt",
+    ),
+    path(
+        "admin-dashboard/clients/autocomplete/",
+        views.admin_client_autocomplete,
+        name="admin_client_autocomplete",
+    ),
+    path(
+        "admin-dashboard/events/",
+        views.admin_events,
+        name="admin_events",
+    ),
+    path(
+        "admin-dashboard/statement/",
+        views.admin_statement,
+        name="admin_statement",
+    ),
+    path(
+        "admin-dashboard/analytics/",
+        views.admin_analytics,
+        name="admin_analytics",
+    ),
     path(
         "admin-dashboard/accounts/<int:pk>/toggle-block/",
         views.admin_toggle_account_block,
         name="toggle_account_block",
     ),
+    path(
+        "admin-dashboard/bulk-payout/",
+        views.admin_bulk_payout,
+        name="admin_bulk_payout",
+    ),
     path(
         "admin-dashboard/transactions/<int:pk>/cancel/",
         views.admin_cancel_transaction,
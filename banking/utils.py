@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import random
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 
+from django.utils import timezone
+
 SUSPECT_CHARS = {
     'Ð',
     'Ñ',
@@ -109,3 +112,23 @@ def random_target_balance() -> Decimal:
     cents = random.randint(0, 99)
 
     return Decimal(f"{value}.{cents:02d}")
+
+
+def day_start(day: date) -> datetime:
+    """Начало суток day в текущем часовом поясе (TIME_ZONE)."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(date_from: date | None, date_to: date | None) -> dict:
+    """
+    Фильтр created_at по дням [date_from, date_to] в виде полуоткрытого
+    интервала [начало date_from, начало дня после date_to). В отличие от
+    created_at__date столбец не оборачивается в функцию, и запрос может
+    читать диапазон индекса.
+    """
+    lookups = {}
+    if date_from:
+        lookups['created_at__gte'] = day_start(date_from)
+    if date_to:
+        lookups['created_at__lt'] = day_start(date_to + timedelta(days=1))
+    return lookups
@@ -1,36 +1,95 @@
-from functools import wraps
+import json
+import uuid
+from functools import partial, wraps
 
 from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q
-from django.http import JsonResponse
+from django.contrib.auth.views import redirect_to_login
+from django.http import (
+    Http404,
+    HttpResponseBase,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
+from django.template.defaultfilters import date as date_filter, floatformat
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import DetailView, TemplateView
 
+from . import (
+    aggregates,
+    analytics,
+    cards,
+    events,
+    idempotency,
+    receipts,
+    rollups,
+    statements,
+    summaries,
+)
+from .async_services import (
+    acreate_and_process_transaction,
+    acreate_and_process_transfer,
+    run_db,
+)
 from .forms import (
+    AdminStatementForm,
+    AnalyticsForm,
     ClientFilterForm,
     DepositForm,
+    StatementForm,
     TransactionFilterForm,
     TransferForm,
     WithdrawalForm,
+    client_label,
 )
-from .models import Account, ClientProfile, Transaction
+from .models import (
+    Account,
+    ClientProfile,
+    Transaction,
+    resolve_counterparties,
+)
+from .pagination import InvalidCursor, KeysetPaginator, estimate_count
+from .search import search_clients
 from .services import (
+    DEBIT_TYPES,
     TransactionResult,
     cancel_transaction,
     create_and_process_transaction,
     create_and_process_transfer,
+    create_and_process_transfers_bulk,
+    payout_items,
     toggle_account_block,
 )
+from .utils import day_range
 
 SECURITY_MESSAGE = _(
     "Вы вошли в защищённую зону. Никому не сообщайте свой пароль."
 )
 
+OPERATION_TRANSACTION = "transaction"
+OPERATION_TRANSFER = "transfer"
+
+SUMMARY_SESSION_KEY = "dashboard_client_id"
+
+TRANSACTIONS_PER_PAGE = 25
+TRANSACTION_CURSOR_PARAM = "transaction_cursor"
+CLIENT_AUTOCOMPLETE_PER_PAGE = 20
+
+SECTION_CLIENTS = "clients"
+SECTION_TRANSACTIONS = "transactions"
+ADMIN_SECTION_TEMPLATES = {
+    SECTION_CLIENTS: "banking/admin/sections/clients.html",
+    SECTION_TRANSACTIONS: "banking/admin/sections/transactions.html",
+}
+
 
 def landing(request):
     if request.user.is_authenticated:
@@ -53,23 +112,220 @@ def post_login_redirect(request):
     return redirect("banking:client_dashboard")
 
 
+def filter_transactions(transactions, data: dict):
+    """Сужает операции по полям TransactionFilterForm."""
+    transactions = transactions.filter(
+        **day_range(data.get("date_from"), data.get("date_to"))
+    )
+    if data.get("transaction_type"):
+        transactions = transactions.filter(
+            transaction_type=data["transaction_type"]
+        )
+    if data.get("status"):
+        transactions = transactions.filter(status=data["status"])
+    if data.get("client"):
+        transactions = transactions.filter(account__client=data["client"])
+    return transactions
+
+
+def statement_response(request, transactions, data: dict):
+    """
+    Потоковая выписка по операциям transactions (banking/statements.py)
+    в формате data["format"]. Под ASGI — асинхронным итератором, чтобы
+    выписка не собиралась в памяти целиком.
+    """
+    fmt = data["format"]
+    if isinstance(request, ASGIRequest):
+        content = statements.astream(transactions, fmt)
+    else:
+        content = statements.stream(transactions, fmt)
+    response = StreamingHttpResponse(
+        content, content_type=statements.CONTENT_TYPES[fmt]
+    )
+    name = statements.filename(fmt, data.get("date_from"), data.get("date_to"))
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def form_errors(form, message: str):
+    return JsonResponse(
+        {
+            "success": False,
+            "message": message,
+            "errors": form.errors.get_json_data(),
+        },
+        status=400,
+    )
+
+
+def statement_errors(form):
+    return form_errors(form, "Некорректные параметры выписки.")
+
+
+@login_required
+def client_statement(request):
+    """
+    Выписка клиента по своим счетам: GET date_from, date_to (ГГГГ-ММ-ДД),
+    account — id счёта (по умолчанию все счета клиента), format — csv
+    или jsonl.
+    """
+    if request.user.is_staff:
+        return redirect("banking:admin_dashboard")
+    client = _ensure_client_profile(request.user)
+    if not client:
+        raise Http404("Клиентский профиль не найден.")
+    form = StatementForm(request.GET)
+    if not form.is_valid():
+        return statement_errors(form)
+    data = form.cleaned_data
+    transactions = Transaction.objects.filter(account__client=client)
+    if data.get("account"):
+        account = get_object_or_404(client.accounts, pk=data["account"])
+        transactions = transactions.filter(account=account)
+    transactions = transactions.filter(
+        **day_range(data.get("date_from"), data.get("date_to"))
+    )
+    return statement_response(request, transactions, data)
+
+
+HISTORY_TYPE_LABELS = {
+    Transaction.TransactionType.DEPOSIT: "Пополнение",
+    Transaction.TransactionType.WITHDRAWAL: "Снятие",
+    Transaction.TransactionType.TRANSFER_OUT: "Перевод отправлен",
+    Transaction.TransactionType.TRANSFER_IN: "Перевод получен",
+}
+
+
+def history_item(transaction: Transaction) -> dict:
+    """Строка истории кабинета клиента для «Показать ещё»."""
+    debit = transaction.transaction_type in DEBIT_TYPES
+    amount = floatformat(transaction.amount, 2)
+    counterparty = transaction.counterparty_account
+    created_at = timezone.localtime(transaction.created_at)
+    return {
+        "id": transaction.pk,
+        "reference": transaction.reference,
+        "created_at": created_at.isoformat(),
+        "date": date_filter(created_at, "d.m.Y"),
+        "time": date_filter(created_at, "H:i"),
+        "transaction_type": transaction.transaction_type,
+        "type_label": HISTORY_TYPE_LABELS.get(
+            transaction.transaction_type, "—"
+        ),
+        "status": transaction.status,
+        "status_label": transaction.get_status_display(),
+        "amount": f"{-transaction.amount if debit else transaction.amount}",
+        "amount_display": f"{'−' if debit else '+'}{amount} ₽",
+        "debit": debit,
+        "counterparty": counterparty.account_number if counterparty else None,
+        "receipt_url": reverse(
+            "banking:transaction_receipt", args=[transaction.pk]
+        ),
+    }
+
+
+@login_required
+def client_history(request):
+    """
+    Следующая страница истории счёта клиента: GET account — id счёта,
+    cursor — курсор из сводки кабинета или предыдущего ответа. Ответ:
+    {"results": [...], "next_cursor": ..., "has_more": ...}. Страницы
+    читаются по ключу (created_at, id) без COUNT(*).
+    """
+    if request.user.is_staff:
+        return redirect("banking:admin_dashboard")
+    client = _ensure_client_profile(request.user)
+    if not client:
+        raise Http404("Клиентский профиль не найден.")
+    account_id = request.GET.get("account", "")
+    # isdigit() пропускает «²» и «٣», которые int() не разбирает.
+    if not (account_id.isascii() and account_id.isdecimal()):
+        raise Http404("Счёт не найден.")
+    account = get_object_or_404(client.accounts, pk=account_id)
+    paginator = summaries.history_paginator(account)
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        return JsonResponse(
+            {"success": False, "message": "Некорректный курсор."},
+            status=400,
+        )
+    resolve_counterparties(page.object_list)
+    return JsonResponse(
+        {
+            "results": [history_item(transaction) for transaction in page],
+            "next_cursor": page.next_cursor,
+            "has_more": page.has_next,
+        }
+    )
+
+
 class ClientDashboardView(LoginRequiredMixin, TemplateView):
     template_name = "banking/client_dashboard.html"
+    receipt_url_name = "banking:transaction_receipt"
 
     def dispatch(self, request, *args, **kwargs):
-        if request.user.is_staff:
+        response = self.load_client()
+        if response is not None:
+            return response
+        return super().dispatch(request, *args, **kwargs)
+
+    def load_client(self):
+        """
+        Находит профиль клиента и выбранный счёт. Возвращает редирект,
+        если кабинет пользователю недоступен.
+        """
+        if self.request.user.is_staff:
             return redirect("banking:admin_dashboard")
-        self.client_profile = _ensure_client_profile(request.user)
+        self.summary = None
+        account_id = self.requested_account_id()
+        # Просмотр кабинета берёт профиль и счета из сводки в кэше;
+        # операции (POST) всегда читают их из базы.
+        if self.request.method == "GET":
+            client_id = self.request.session.get(SUMMARY_SESSION_KEY)
+            summary = summaries.get_summary(client_id) if client_id else None
+            if (
+                summary
+                and summary.accounts
+                and summary.user_id == self.request.user.pk
+            ):
+                self.summary = summary
+                self.client_profile = summary.client
+                selected = summary.for_account(account_id)
+                self.account = (selected or summary.accounts[0]).account
+                return None
+        self.client_profile = _ensure_client_profile(self.request.user)
         if not self.client_profile:
             messages.error(
-                request, "Для пользователя не настроен клиентский профиль."
+                self.request,
+                "Для пользователя не настроен клиентский профиль.",
             )
             return redirect("logout")
-        self.account = self.client_profile.accounts.first()
+        accounts = self.client_profile.accounts.order_by("id")
+        self.account = None
+        if account_id is not None:
+            self.account = accounts.filter(pk=account_id).first()
+        if self.account is None:
+            self.account = accounts.first()
         if not self.account:
-            messages.error(request, "Для клиента не создан счёт.")
+            messages.error(self.request, "Для клиента не создан счёт.")
             return redirect("logout")
-        return super().dispatch(request, *args, **kwargs)
+        return None
+
+    def requested_account_id(self):
+        """
+        Счёт, выбранный переключателем: параметр account в адресе
+        или скрытое поле формы операции. Чужие и несуществующие счета
+        заменяются первым счётом клиента.
+        """
+        if self.request.method == "POST":
+            raw = self.request.POST.get("account", "")
+        else:
+            raw = self.request.GET.get("account", "")
+        if raw.isascii() and raw.isdecimal():
+            return int(raw)
+        return None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -82,54 +338,118 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
         context["transfer_form"] = kwargs.get("transfer_form") or TransferForm(
             account=self.account
         )
-        transactions_queryset = self.account.transactions.select_related(
-            "performed_by",
-            "related_transaction",
-            "related_transaction__account",
-        ).order_by("-created_at")
-        context["total_transactions_count"] = transactions_queryset.count()
-        context["transactions"] = transactions_queryset[:10]
+        summary = self.summary or self.load_summary()
+        selected = summary.for_account(self.account.id)
+        context["accounts"] = summary.accounts
+        context["summary_month"] = summary.month
+        context["total_transactions_count"] = selected.transaction_count
+        context["transactions"] = selected.transactions
         context["security_message"] = SECURITY_MESSAGE
+        context["idempotency_key"] = uuid.uuid4().hex
         return context
 
-    def post(self, request, *args, **kwargs):
-        form_type = request.POST.get("form_type")
+    def load_summary(self):
+        """Строит сводку клиента, кладёт её в кэш и запоминает клиента."""
+        self.summary = summaries.load_summary(self.client_profile)
+        client_id = self.client_profile.pk
+        if self.request.session.get(SUMMARY_SESSION_KEY) != client_id:
+            self.request.session[SUMMARY_SESSION_KEY] = client_id
+        return self.summary
+
+    def _idempotency_key(self):
+        """
+        Ключ берётся из заголовка Idempotency-Key (кассы, API-клиенты)
+        или из скрытого поля формы, которое повторная отправка той же
+        страницы сохраняет.
+        """
+        raw_key = self.request.headers.get(
+            "Idempotency-Key"
+        ) or self.request.POST.get("idempotency_key")
+        scope = f"{self.request.user.pk}:{self.request.POST.get('form_type')}"
+        return idempotency.make_key(scope, raw_key)
+
+    def resolve_operation(self):
+        """
+        Проверяет отправленную форму. Возвращает пару (вид операции,
+        параметры сервиса) либо ответ с ошибками формы.
+        """
+        form_type = self.request.POST.get("form_type")
         if form_type == "deposit":
-            form = DepositForm(request.POST)
+            form = DepositForm(self.request.POST)
+            self.operation_form = form
             if form.is_valid():
-                return self._process_client_transaction(
-                    form.execute(self.account, self.client_profile)
+                return OPERATION_TRANSACTION, form.execute(
+                    self.account, self.client_profile
                 )
             return self.render_to_response(
                 self.get_context_data(deposit_form=form)
             )
 
         if form_type == "withdrawal":
-            form = WithdrawalForm(request.POST, account=self.account)
+            form = WithdrawalForm(self.request.POST, account=self.account)
+            self.operation_form = form
             if form.is_valid():
-                return self._process_client_transaction(
-                    form.execute(self.client_profile)
+                return OPERATION_TRANSACTION, form.execute(
+                    self.client_profile
                 )
             return self.render_to_response(
                 self.get_context_data(withdrawal_form=form)
             )
 
         if form_type == "transfer":
-            form = TransferForm(request.POST, account=self.account)
+            form = TransferForm(self.request.POST, account=self.account)
+            self.operation_form = form
             if form.is_valid():
-                return self._process_transfer(
-                    form.execute(self.client_profile)
-                )
+                return OPERATION_TRANSFER, form.execute(self.client_profile)
             return self.render_to_response(
                 self.get_context_data(transfer_form=form)
             )
 
-        messages.error(request, "Неизвестный тип операции.")
+        messages.error(self.request, "Неизвестный тип операции.")
         return redirect("banking:client_dashboard")
 
-    def _process_client_transaction(self, payload: dict):
-        result: TransactionResult = create_and_process_transaction(**payload)
-        if result.completed:
+    def post(self, request, *args, **kwargs):
+        operation = self.resolve_operation()
+        if isinstance(operation, HttpResponseBase):
+            return operation
+        kind, payload = operation
+        payload["idempotency_key"] = self._idempotency_key()
+        try:
+            if kind == OPERATION_TRANSFER:
+                result = create_and_process_transfer(**payload)
+                return self._transfer_response(result, payload)
+            result = create_and_process_transaction(**payload)
+        except idempotency.KeyReused:
+            return self._key_reused_response()
+        return self._transaction_response(result)
+
+    def _key_reused_response(self):
+        """
+        Ответ 422 на ключ, уже использованный операцией с другими
+        параметрами: это не повтор, и новая операция не создаётся.
+        Форма показывается снова с ошибкой и новым ключом.
+        """
+        form = self.operation_form
+        form.add_error(
+            "amount",
+            "Форма уже отправлена с другими данными. Проверьте их "
+            "и отправьте форму ещё раз.",
+        )
+        form_type = self.request.POST.get("form_type")
+        response = self.render_to_response(
+            self.get_context_data(**{f"{form_type}_form": form})
+        )
+        response.status_code = 422
+        return response
+
+    def _transaction_response(self, result: TransactionResult):
+        if result.pending:
+            messages.info(
+                self.request,
+                f"Операция {result.transaction.reference} "
+                f"принята в обработку.",
+            )
+        elif result.completed:
             message = (
                 f"Операция {result.transaction.reference} завершена. "
                 f"Текущий баланс: {result.transaction.account.balance:.2f} ₽"
@@ -140,18 +460,21 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
             )
         else:
             messages.error(self.request, result.message)
-        return redirect(
-            "banking:transaction_receipt", pk=result.transaction.pk
-        )
+        return redirect(self.receipt_url_name, pk=result.transaction.pk)
 
-    def _process_transfer(self, payload: dict):
-        result: TransactionResult = create_and_process_transfer(**payload)
+    def _transfer_response(self, result: TransactionResult, payload: dict):
         counterparty = (
             payload["target_account"].account_number
             if "target_account" in payload
             else ""
         )
-        if result.completed:
+        if result.pending:
+            messages.info(
+                self.request,
+                f"Перевод {result.transaction.reference} "
+                f"принят в обработку. Получатель: {counterparty}.",
+            )
+        elif result.completed:
             message = (
                 f"Перевод {result.transaction.reference} завершён. "
                 f"Получатель: {counterparty}. "
@@ -163,9 +486,7 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
             )
         else:
             messages.error(self.request, result.message)
-        return redirect(
-            "banking:transaction_receipt", pk=result.transaction.pk
-        )
+        return redirect(self.receipt_url_name, pk=result.transaction.pk)
 
 
 class TransactionReceiptView(LoginRequiredMixin, DetailView):
@@ -191,11 +512,126 @@ class TransactionReceiptView(LoginRequiredMixin, DetailView):
             return qs.none()
         return qs.filter(account__client=client)
 
+    def get(self, request, *args, **kwargs):
+        # Статус и номер операции — лёгким запросом с проверкой прав;
+        # квитанции завершённых и отменённых операций не меняются и
+        # берутся из кэша (receipts.py).
+        header = get_object_or_404(
+            self.get_queryset().values("pk", "reference", "status"),
+            pk=kwargs["pk"],
+        )
+        if not receipts.is_final(header["status"]):
+            return super().get(request, *args, **kwargs)
+
+        key = (header["pk"], header["reference"], header["status"])
+        etag = receipts.receipt_etag(*key, request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            receipt_html = receipts.get_details(
+                *key, lambda: self.get_queryset().get(pk=header["pk"])
+            )
+            response = self.render_to_response(
+                {
+                    "transaction": header,
+                    "receipt_html": mark_safe(receipt_html),
+                }
+            )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["balance_after"] = receipts.balance_after(self.object)
+        return context
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    Асинхронный dispatch для представлений под ASGI. Синхронная работа
+    (ORM, сессии, сообщения, шаблоны) выполняется через run_db, чтобы
+    не блокировать event loop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(
+                request.get_full_path(),
+                self.get_login_url(),
+                self.get_redirect_field_name(),
+            )
+        response = await self.aprepare()
+        if response is not None:
+            return response
+        method = request.method.lower()
+        if method in self.http_method_names:
+            handler = getattr(self, method, self.http_method_not_allowed)
+        else:
+            handler = self.http_method_not_allowed
+        return await handler(request, *args, **kwargs)
+
+    async def aprepare(self):
+        return None
+
+    async def run_sync(self, method, *args, **kwargs):
+        def call():
+            response = method(*args, **kwargs)
+            # TemplateResponse отрисовывается лениво — делаем это здесь,
+            # пока мы в потоке, где разрешены запросы к базе.
+            if getattr(response, "is_rendered", True) is False:
+                response.render()
+            return response
+
+        return await run_db(call)
+
+
+class AsyncClientDashboardView(AsyncLoginRequiredMixin, ClientDashboardView):
+    """
+    Кабинет клиента для ASGI: выдержка перед проведением операции
+    выполняется через asyncio.sleep и не занимает поток.
+    """
+
+    receipt_url_name = "banking:async_transaction_receipt"
+
+    async def aprepare(self):
+        return await self.run_sync(self.load_client)
+
+    async def get(self, request, *args, **kwargs):
+        return await self.run_sync(super().get, request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        operation = await self.run_sync(self.resolve_operation)
+        if isinstance(operation, HttpResponseBase):
+            return operation
+        kind, payload = operation
+        payload["idempotency_key"] = self._idempotency_key()
+        try:
+            if kind == OPERATION_TRANSFER:
+                result = await acreate_and_process_transfer(**payload)
+                return await self.run_sync(
+                    self._transfer_response, result, payload
+                )
+            result = await acreate_and_process_transaction(**payload)
+        except idempotency.KeyReused:
+            return await self.run_sync(self._key_reused_response)
+        return await self.run_sync(self._transaction_response, result)
+
+
+class AsyncTransactionReceiptView(
+    AsyncLoginRequiredMixin, TransactionReceiptView
+):
+    async def get(self, request, *args, **kwargs):
+        return await self.run_sync(super().get, request, *args, **kwargs)
+
 
 class AdminDashboardView(
     LoginRequiredMixin, UserPassesTestMixin, TemplateView
 ):
     template_name = "banking/admin/dashboard.html"
+    # Раздел для обновления без перезагрузки страницы (см.
+    # ADMIN_SECTION_TEMPLATES); None — вся панель.
+    section = None
 
     def test_func(self):
         return self.request.user.is_staff
@@ -210,35 +646,44 @@ class AdminDashboardView(
         login_url = f"{reverse('login')}?next={self.request.path}"
         return redirect(login_url)
 
+    def get_template_names(self):
+        if self.section:
+            return [ADMIN_SECTION_TEMPLATES[self.section]]
+        return super().get_template_names()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        clients = ClientProfile.objects.select_related(
-            "user"
-        ).prefetch_related("accounts")
-        accounts = Account.objects.select_related("client")
-        transactions = Transaction.objects.select_related(
-            "account__client",
-            "performed_by",
-            "related_transaction",
-            "related_transaction__account",
-        ).all()
+        if self.section == SECTION_CLIENTS:
+            context.update(self.clients_context())
+            return context
+
+        # Итоги читаются из счётчиков (banking/aggregates.py) — несколько
+        # строк вместо прохода по всем счетам и операциям.
+        totals = aggregates.read_totals()
+        context.update(self.transactions_context(totals))
+        if self.section == SECTION_TRANSACTIONS:
+            return context
+
+        context.update(self.clients_context())
+        context["total_balance"] = totals.balance
+        context["total_clients_count"] = totals.clients
+        context["total_accounts_count"] = totals.accounts
+        context["total_transactions_count"] = totals.transactions
+        context["transaction_status_counts"] = totals.transactions_by_status
+        # Обороты месяца — из итогов счетов по месяцам (rollups.py).
+        context["month"] = rollups.current_month()
+        context["month_totals"] = rollups.month_totals(context["month"])
+        return context
+
+    def clients_context(self) -> dict:
+        # Счета нужны только карточкам, которых нет в кэше (cards.py).
+        clients = ClientProfile.objects.select_related("user")
 
         client_filter_form = ClientFilterForm(self.request.GET or None)
+        search = ""
         if client_filter_form.is_valid():
             data = client_filter_form.cleaned_data
             search = data.get("search", "").strip()
-            if search:
-                search_filters = (
-                    Q(full_name__icontains=search)
-                    | Q(user__username__icontains=search)
-                    | Q(accounts__account_number__icontains=search)
-                )
-                try:
-                    search_id = int(search)
-                    search_filters |= Q(id=search_id)
-                except ValueError:
-                    pass
-                clients = clients.filter(search_filters).distinct()
 
             is_blocked = data.get("is_blocked")
             if is_blocked == "true":
@@ -246,52 +691,72 @@ class AdminDashboardView(
             elif is_blocked == "false":
                 clients = clients.filter(is_blocked=False)
 
-        clients = clients.order_by("id")
+        if search:
+            # Индекс префиксов (banking/search.py): лучшие совпадения
+            # первыми.
+            clients = search_clients(clients, search)
+        else:
+            clients = clients.order_by("id")
         paginator = Paginator(clients, 12)
         page_number = self.request.GET.get("client_page", 1)
         clients_page = paginator.get_page(page_number)
+        cards.attach_cards(self.request, list(clients_page))
+        return {
+            "clients": clients_page,
+            "client_filter_form": client_filter_form,
+        }
+
+    def transactions_context(self, totals) -> dict:
+        transactions = Transaction.objects.select_related(
+            "account__client",
+            "performed_by",
+            "related_transaction",
+            "related_transaction__account",
+        )
+        # Число операций по списку известно из счётчиков, пока список
+        # не сужен ничем, кроме статуса.
+        known_count = totals.transactions
 
         filter_form = TransactionFilterForm(self.request.GET or None)
         if filter_form.is_valid():
             data = filter_form.cleaned_data
-            if data.get("date_from"):
-                transactions = transactions.filter(
-                    created_at__date__gte=data["date_from"]
-                )
-            if data.get("date_to"):
-                transactions = transactions.filter(
-                    created_at__date__lte=data["date_to"]
+            if any(
+                data.get(field)
+                for field in (
+                    "date_from",
+                    "date_to",
+                    "transaction_type",
+                    "client",
                 )
-            if data.get("transaction_type"):
-                transactions = transactions.filter(
-                    transaction_type=data["transaction_type"]
+            ):
+                known_count = None
+            elif data.get("status"):
+                known_count = totals.transactions_by_status.get(
+                    data["status"], 0
                 )
-            if data.get("status"):
-                transactions = transactions.filter(status=data["status"])
-            if data.get("client"):
-                transactions = transactions.filter(
-                    account__client=data["client"]
-                )
-
-        transactions = transactions.order_by("-created_at")
-        transactions_paginator = Paginator(transactions, 25)
-        transaction_page_number = self.request.GET.get("transaction_page", 1)
+            transactions = filter_transactions(transactions, data)
+
+        # Страницы по ключу (created_at, id): глубина списка не влияет
+        # на запрос, а общее число — из счётчиков или оценка СУБД,
+        # только если шаблон выводит transactions.total.
+        transactions_paginator = KeysetPaginator(
+            transactions,
+            TRANSACTIONS_PER_PAGE,
+            total=(
+                known_count
+                if known_count is not None
+                else partial(estimate_count, transactions)
+            ),
+        )
         transactions_page = transactions_paginator.get_page(
-            transaction_page_number
+            self.request.GET.get(TRANSACTION_CURSOR_PARAM)
         )
-
-        total_balance = sum(account.balance for account in accounts)
-        total_clients_count = ClientProfile.objects.count()
-        total_transactions_count = transactions.count()
-        context["clients"] = clients_page
-        context["client_filter_form"] = client_filter_form
-        context["accounts"] = accounts
-        context["transactions"] = transactions_page
-        context["filter_form"] = filter_form
-        context["total_balance"] = total_balance
-        context["total_clients_count"] = total_clients_count
-        context["total_transactions_count"] = total_transactions_count
-        return context
+        resolve_counterparties(transactions_page.object_list)
+        return {
+            "transactions": transactions_page,
+            "filter_form": filter_form,
+            "transaction_cursor_param": TRANSACTION_CURSOR_PARAM,
+        }
 
 
 def staff_required(function):
@@ -310,6 +775,108 @@ def staff_required(function):
     return wrapper
 
 
+@staff_required
+def admin_client_autocomplete(request):
+    """
+    Клиенты для выбора в фильтре операций: GET q — запрос (как поиск
+    клиентов), page — номер страницы. Ответ: {"results": [{"id": ...,
+    "text": ...}], "pagination": {"more": ...}}.
+    """
+    query = request.GET.get("q", "").strip()
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
+    clients = ClientProfile.objects.only("id", "full_name")
+    if query:
+        clients = search_clients(clients, query)
+    else:
+        clients = clients.order_by("id")
+    start = (page - 1) * CLIENT_AUTOCOMPLETE_PER_PAGE
+    end = start + CLIENT_AUTOCOMPLETE_PER_PAGE
+    # Лишняя строка показывает, есть ли следующая страница, без COUNT.
+    rows = list(clients[start:end + 1])
+    return JsonResponse(
+        {
+            "results": [
+                {"id": client.pk, "text": client_label(client)}
+                for client in rows[:CLIENT_AUTOCOMPLETE_PER_PAGE]
+            ],
+            "pagination": {"more": len(rows) > CLIENT_AUTOCOMPLETE_PER_PAGE},
+        }
+    )
+
+
+@staff_required
+def admin_events(request):
+    """
+    Лента созданных и проведённых операций (text/event-stream, события
+    transaction и resync, см. banking/events.py). Продолжить с места
+    обрыва: заголовок Last-Event-ID или параметр last_id. Под ASGI поток
+    асинхронный и не занимает поток обработки запросов.
+    """
+    last_id = request.GET.get("last_id") or request.headers.get(
+        "Last-Event-ID"
+    )
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    if isinstance(request, ASGIRequest):
+        content = events.astream(last_id)
+    else:
+        content = events.stream(last_id)
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx не должен буферизовать поток.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@staff_required
+def admin_statement(request):
+    """
+    Выписка сотрудника: параметры выписки клиента (account — любой
+    счёт) и фильтры списка операций (transaction_type, status, client).
+    """
+    form = AdminStatementForm(request.GET)
+    if not form.is_valid():
+        return statement_errors(form)
+    data = form.cleaned_data
+    transactions = filter_transactions(Transaction.objects.all(), data)
+    if data.get("account"):
+        transactions = transactions.filter(account_id=data["account"])
+    return statement_response(request, transactions, data)
+
+
+@staff_required
+def admin_analytics(request):
+    """
+    Аналитика трат (banking/analytics.py): GET date_from, date_to
+    (ГГГГ-ММ-ДД, по умолчанию последние 90 дней), account или client —
+    id счёта или клиента (по умолчанию все операции), top — число
+    получателей в ответе.
+    """
+    form = AnalyticsForm(request.GET)
+    if not form.is_valid():
+        return form_errors(form, "Некорректные параметры аналитики.")
+    data = form.cleaned_data
+    transactions = Transaction.objects.all()
+    if data.get("account"):
+        transactions = transactions.filter(account_id=data["account"])
+    if data.get("client"):
+        transactions = transactions.filter(account__client_id=data["client"])
+    try:
+        result = analytics.spending_analytics(
+            transactions, data["date_from"], data["date_to"], data["top"]
+        )
+    except analytics.AnalyticsUnavailable as exc:
+        return JsonResponse(
+            {"success": False, "message": str(exc)}, status=503
+        )
+    return JsonResponse({"success": True, "analytics": result.as_dict()})
+
+
 @staff_required
 def admin_toggle_account_block(request, pk):
     if request.method != "POST":
@@ -333,7 +900,7 @@ def admin_toggle_account_block(request, pk):
         return JsonResponse(
             {
                 "success": True,
-                "section": "clients",
+                "section": SECTION_CLIENTS,
                 "message": (
                     f"Счёт {account.account_number} {state_text}."
                 ),
@@ -362,7 +929,7 @@ def admin_cancel_transaction(request, pk):
         return JsonResponse(
             {
                 "success": True,
-                "section": "transactions",
+                "section": SECTION_TRANSACTIONS,
                 "message": (
                     f"Транзакция {transaction.reference} "
                     f"помечена как отменённая."
@@ -371,3 +938,59 @@ def admin_cancel_transaction(request, pk):
         )
 
     return redirect("banking:admin_dashboard")
+
+
+@staff_required
+def admin_bulk_payout(request):
+    """
+    Выплаты с одного счёта на многие. Принимает JSON:
+    {"source_account": "...", "items": [{"account_number": "...",
+    "amount": "100.00", "note": "..."}, ...]}.
+    """
+    if request.method != "POST":
+        return JsonResponse(
+            {"success": False, "message": "Ожидается POST-запрос."},
+            status=405,
+        )
+    invalid_request = JsonResponse(
+        {"success": False, "message": "Некорректный формат запроса."},
+        status=400,
+    )
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        # Текст ошибки парсера не показывается клиенту.
+        return invalid_request
+    try:
+        source = Account.objects.get(account_number=data["source_account"])
+        items = payout_items(
+            (item.get("account_number"), item.get("amount"), item.get("note"))
+            for item in data["items"]
+        )
+        result = create_and_process_transfers_bulk(
+            source, items, processed_by=request.user
+        )
+    except Account.DoesNotExist:
+        return JsonResponse(
+            {"success": False, "message": "Счёт списания не найден."},
+            status=404,
+        )
+    except ValueError as exc:
+        # payout_items и create_and_process_transfers_bulk сообщают
+        # об ошибках данных через ValueError с текстом для пользователя.
+        return JsonResponse(
+            {"success": False, "message": str(exc)}, status=400
+        )
+    except (KeyError, TypeError, AttributeError):
+        return invalid_request
+
+    return JsonResponse(
+        {
+            "success": result.completed or result.pending,
+            "pending": result.pending,
+            "message": result.message,
+            "completed": result.completed_count,
+            "cancelled": result.cancelled_count,
+            "references": [item.reference for item in result.transactions],
+        }
+    )
@@ -53,6 +53,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Тестовая база в файле: нагрузочные тесты ходят в неё из потоков
+        # со своими соединениями, как рабочие процессы сервера.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -99,3 +102,78 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_REDIRECT_URL = "banking:post_login_redirect"
 LOGOUT_REDIRECT_URL = "login"
 LOGIN_URL = "login"
+
+# Проведение операций: "inline" — в потоке запроса, "background" —
+# воркерами команды run_settlement_worker.
+BANKING_SETTLEMENT_MODE = "inline"
+BANKING_SETTLEMENT_LEASE_SECONDS = 60
+
+# Изменение балансов: "locking" — SELECT ... FOR UPDATE и пересчёт в
+# Python, "conditional" — один условный UPDATE на каждое изменение.
+BANKING_LEDGER_MODE = "locking"
+
+# Идемпотентность клиентских операций: размер кэша результатов в памяти
+# процесса (источник истины — таблица ключей) и время жизни ключей
+# в кэше и в таблице.
+BANKING_IDEMPOTENCY_CACHE_SIZE = 10000
+BANKING_IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+
+# Размер пула потоков для запросов к базе из асинхронных представлений
+# (0 — общий поток Django через sync_to_async).
+BANKING_ASYNC_DB_WORKERS = 16
+
+# Номер узла (0–1295) в номерах операций; задайте свой каждому серверу
+# или контейнеру. None — вычислить по имени хоста (только для одного
+# хоста: процесс пишет предупреждение, check --deploy — banking.W001).
+BANKING_REFERENCE_NODE_ID = None
+
+# Число частей каждого счётчика итогов админ-панели: больше частей —
+# меньше ожидания блокировок при параллельном проведении операций.
+# После изменения выполните rebuild_dashboard_counters.
+BANKING_AGGREGATE_SHARDS = 8
+
+# Кэш карточек клиентов админ-панели (banking/cards.py): бэкенд и
+# число карточек задаются в CACHES["client-cards"]. Для нескольких
+# процессов сервера можно указать общий кэш (Redis, Memcached).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "client-cards": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "client-cards",
+        "TIMEOUT": 24 * 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "receipts": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "receipts",
+        "TIMEOUT": 24 * 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+BANKING_CARD_CACHE = "client-cards"
+# Квитанции завершённых и отменённых операций (banking/receipts.py).
+BANKING_RECEIPT_CACHE = "receipts"
+
+# Сводка кабинета клиента (banking/summaries.py): кэш и время жизни
+# записи в секундах.
+BANKING_SUMMARY_CACHE = "default"
+BANKING_SUMMARY_TIMEOUT = 300
+
+# Лента операций для сотрудников (server-sent events): сколько последних
+# событий хранить для переподключения, сколько событий за один опрос
+# отдавать до resync, длительность одного потока, интервал keep-alive
+# и интервал опроса таблицы событий в секундах.
+BANKING_EVENTS_HISTORY = 1000
+BANKING_EVENTS_BUFFER = 100
+BANKING_EVENTS_STREAM_SECONDS = 300
+BANKING_EVENTS_HEARTBEAT_SECONDS = 15
+BANKING_EVENTS_POLL_SECONDS = 1
+
+# Выписки (CSV, JSON Lines) читают операции пачками такого размера.
+BANKING_STATEMENT_CHUNK_SIZE = 2000
+
+# Аналитика трат (banking/analytics.py) читает операции в массивы NumPy
+# пачками такого размера.
+BANKING_ANALYTICS_CHUNK_SIZE = 10000